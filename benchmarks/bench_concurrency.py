@@ -0,0 +1,78 @@
+"""Benchmark concurrent retrieve() throughput under each FAISS execution policy.
+
+Each configuration runs in a fresh process, since the OpenMP thread count
+is process-wide:
+
+    default    FAISS's default OpenMP team for every search
+    per_query  one OpenMP thread per search, callers run in parallel
+    batch      concurrent searches coalesced into one multi-threaded search
+
+Usage:
+    python benchmarks/bench_concurrency.py --count 100000 --dimension 384 --concurrency 16
+"""
+
+import argparse
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import numpy as np
+from neuromind.core.memory import ExecutionPolicy, HybridMemoryStorage
+
+CONFIGS = {
+    "default": None,
+    "per_query": ExecutionPolicy("per_query"),
+    "batch": ExecutionPolicy("batch"),
+}
+
+def run_config(name: str, count: int, dimension: int, concurrency: int, queries: int, k: int) -> float:
+    rng = np.random.default_rng(0)
+    embeddings = rng.random((count, dimension), dtype=np.float32)
+    query_embeddings = rng.random((concurrency, queries, dimension), dtype=np.float32)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = HybridMemoryStorage(os.path.join(tmp, "memories.db"), dimension, persist_index=False,
+                                      execution_policy=CONFIGS[name])
+        for i in range(0, count, 10_000):
+            batch = embeddings[i:i + 10_000]
+            storage.store_many([f"benchmark memory {i + j}" for j in range(len(batch))], batch)
+
+        def client(n: int):
+            for query in query_embeddings[n]:
+                storage.retrieve(query, k=k)
+
+        threads = [threading.Thread(target=client, args=(n,)) for n in range(concurrency)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        storage.close()
+    return concurrency * queries / elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=100_000)
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--queries", type=int, default=50, help="queries per client thread")
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--configs", nargs="+", choices=list(CONFIGS), default=list(CONFIGS))
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context("spawn")
+    results = {}
+    for name in args.configs:
+        with ctx.Pool(1) as pool:
+            results[name] = pool.apply(
+                run_config, (name, args.count, args.dimension, args.concurrency, args.queries, args.k)
+            )
+        print(f"{name + ':':11} {results[name]:10,.0f} queries/s")
+
+    best = max(results, key=results.get)
+    print(f"best at concurrency {args.concurrency}: {best}")
+
+if __name__ == "__main__":
+    main()
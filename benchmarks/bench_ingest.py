@@ -0,0 +1,60 @@
+"""Benchmark memory ingestion: per-memory store() versus batched store_many().
+
+Usage:
+    python benchmarks/bench_ingest.py --count 5000 --dimension 384
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+from neuromind.core.memory import HybridMemoryStorage
+
+def make_batch(count: int, dimension: int):
+    rng = np.random.default_rng(0)
+    embeddings = rng.random((count, dimension), dtype=np.float32)
+    contents = [f"benchmark memory {i}" for i in range(count)]
+    metadatas = [{"source": "benchmark", "n": i} for i in range(count)]
+    return contents, embeddings, metadatas
+
+def bench_store(storage, contents, embeddings, metadatas) -> float:
+    start = time.perf_counter()
+    for content, embedding, metadata in zip(contents, embeddings, metadatas):
+        storage.store(content, embedding, metadata, memory_type="document")
+    return time.perf_counter() - start
+
+def bench_store_many(storage, contents, embeddings, metadatas, batch_size: int) -> float:
+    start = time.perf_counter()
+    for i in range(0, len(contents), batch_size):
+        storage.store_many(
+            contents[i:i + batch_size],
+            embeddings[i:i + batch_size],
+            metadatas[i:i + batch_size],
+            memory_types="document"
+        )
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=5000)
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    contents, embeddings, metadatas = make_batch(args.count, args.dimension)
+    with tempfile.TemporaryDirectory() as tmp:
+        single = HybridMemoryStorage(os.path.join(tmp, "single.db"), args.dimension, persist_index=False)
+        single_time = bench_store(single, contents, embeddings, metadatas)
+        single.close()
+
+        batched = HybridMemoryStorage(os.path.join(tmp, "batched.db"), args.dimension, persist_index=False)
+        batched_time = bench_store_many(batched, contents, embeddings, metadatas, args.batch_size)
+        batched.close()
+
+    print(f"store():      {args.count / single_time:12,.0f} memories/s ({single_time:.2f}s)")
+    print(f"store_many(): {args.count / batched_time:12,.0f} memories/s ({batched_time:.2f}s)")
+    print(f"speedup:      {single_time / batched_time:12.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,4 @@
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Union
 import numpy as np
 from neuromind.core.memory.hybrid_storage import HybridMemoryStorage
 from neuromind.utils.logging import logger
@@ -6,14 +6,16 @@ from neuromind.utils.logging import logger
 class MemoryAgent:
     """Agent responsible for managing and retrieving contextual memory."""
     
-    def __init__(self, db_path: str = "neuromind.db", embedding_dim: int = 1536):
+    def __init__(self, db_path: str = "neuromind.db", embedding_dim: int = 1536,
+                 half_life_days: Optional[Dict[str, float]] = None):
         """Initialize the memory agent.
         
         Args:
             db_path: Path to SQLite database
             embedding_dim: Dimension of vector embeddings
+            half_life_days: Optional importance half-life in days per memory type
         """
-        self.storage = HybridMemoryStorage(db_path, embedding_dim)
+        self.storage = HybridMemoryStorage(db_path, embedding_dim, half_life_days=half_life_days)
         logger.info("Initialized MemoryAgent")
     
     def store_memory(self, content: str, embedding: np.ndarray, 
@@ -46,6 +48,36 @@ class MemoryAgent:
             logger.error("Error storing memory", exc_info=e)
             raise
     
+    def store_memories(self, contents: List[str], embeddings: np.ndarray,
+                       metadatas: Optional[List[Dict]] = None,
+                       memory_types: Union[str, List[str]] = "general",
+                       importances: Union[float, List[float]] = 1.0) -> List[int]:
+        """Store a batch of memories at once.
+        
+        Args:
+            contents: Memory contents
+            embeddings: Matrix of vector embeddings, one row per memory
+            metadatas: Optional metadata for each memory
+            memory_types: Type of every memory, or one type per memory
+            importances: Importance of every memory, or one score per memory
+            
+        Returns:
+            Memory IDs, in input order
+        """
+        try:
+            memory_ids = self.storage.store_many(
+                contents=contents,
+                embeddings=embeddings,
+                metadatas=metadatas,
+                memory_types=memory_types,
+                importances=importances
+            )
+            logger.debug(f"Stored {len(memory_ids)} memories")
+            return memory_ids
+        except Exception as e:
+            logger.error("Error storing memories", exc_info=e)
+            raise
+    
     def retrieve_context(self, query_embedding: np.ndarray, k: int = 5,
                         memory_types: Optional[List[str]] = None) -> List[Dict]:
         """Retrieve relevant context for a query.
@@ -56,29 +88,25 @@ class MemoryAgent:
             memory_types: Optional list of memory types to filter by
             
         Returns:
-            List of relevant memories
+            List of relevant memories, each with its decayed "effective_importance"
         """
         try:
-            memories = []
-            if memory_types:
-                for memory_type in memory_types:
-                    type_memories = self.storage.retrieve(
-                        query_embedding=query_embedding,
-                        k=k,
-                        memory_type=memory_type
-                    )
-                    memories.extend(type_memories)
-            else:
-                memories = self.storage.retrieve(
-                    query_embedding=query_embedding,
-                    k=k
-                )
+            # A single filtered search covers every requested type
+            memories = self.storage.retrieve(
+                query_embedding=query_embedding,
+                k=k,
+                memory_type=memory_types
+            )
             
-            # Sort by importance and recency
-            memories.sort(key=lambda x: (
-                x["importance"],
-                x["last_accessed"]
-            ), reverse=True)
+            # Sort by decayed importance, then recency, in one vectorized pass
+            effective = self.storage.decay.effective(
+                [m["importance"] for m in memories],
+                [m["last_accessed"] for m in memories],
+                [m["type"] for m in memories]
+            )
+            last_accessed = [m["last_accessed"] or "" for m in memories]
+            order = np.lexsort((last_accessed, effective))[::-1]
+            memories = [{**memories[i], "effective_importance": float(effective[i])} for i in order]
             
             logger.debug(f"Retrieved {len(memories)} context memories")
             return memories[:k]
@@ -104,24 +132,39 @@ class MemoryAgent:
             """, (importance, memory_id))
             
             conn.commit()
+            self.storage.invalidate_cache()
             logger.debug(f"Updated importance for memory {memory_id}")
         except Exception as e:
             logger.error(f"Error updating importance for memory {memory_id}", exc_info=e)
             raise
     
-    def compress_memories(self, threshold: float = 0.8) -> None:
+    def compress_memories(self, threshold: float = 0.8, dry_run: bool = False) -> Dict[str, int]:
         """Compress low-importance or inactive memories.
         
         Args:
             threshold: Importance threshold for compression
+            dry_run: Only count the memories that would be compressed
+            
+        Returns:
+            Counts of compressed memories by reason, plus the total
         """
         try:
-            self.storage.compress(threshold)
+            counts = self.storage.compress(threshold, dry_run=dry_run)
             logger.info("Completed memory compression")
+            return counts
         except Exception as e:
             logger.error("Error compressing memories", exc_info=e)
             raise
             
+    def close(self) -> None:
+        """Flush pending writes and release the underlying storage."""
+        try:
+            self.storage.close()
+            logger.info("Closed MemoryAgent")
+        except Exception as e:
+            logger.error("Error closing memory storage", exc_info=e)
+            raise
+    
     def list_memories(self) -> List[Dict]:
         """List all existing memories.
         
@@ -111,15 +111,20 @@ class NeuromindAgent:
             logger.error(f"Error updating memory importance", exc_info=e)
             raise
     
-    def compress_memories(self, threshold: float = 0.8) -> None:
+    def compress_memories(self, threshold: float = 0.8, dry_run: bool = False) -> Dict[str, int]:
         """Compress low-importance or inactive memories.
         
         Args:
             threshold: Importance threshold for compression
+            dry_run: Only count the memories that would be compressed
+            
+        Returns:
+            Counts of compressed memories by reason, plus the total
         """
         try:
-            self.memory_agent.compress_memories(threshold)
+            counts = self.memory_agent.compress_memories(threshold, dry_run=dry_run)
             logger.info("Completed memory compression")
+            return counts
         except Exception as e:
             logger.error("Error compressing memories", exc_info=e)
             raise
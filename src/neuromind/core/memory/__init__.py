@@ -1,5 +1,8 @@
 """Memory management components of the Neuromind framework."""
 
+from .base import Memory, MemorySystem
+from .execution import ExecutionPolicy
 from .hybrid_storage import HybridMemoryStorage
+from .sharding import ShardedMemoryStorage
 
-__all__ = ['HybridMemoryStorage'] 
\ No newline at end of file
+__all__ = ['Memory', 'MemorySystem', 'ExecutionPolicy', 'HybridMemoryStorage', 'ShardedMemoryStorage'] 
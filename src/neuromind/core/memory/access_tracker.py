@@ -0,0 +1,146 @@
+import atexit
+import threading
+import weakref
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List
+from neuromind.utils.logging import logger
+from .connection import ConnectionManager
+
+# Trackers not closed yet; weak, so an abandoned tracker is not kept alive
+_open_trackers: "weakref.WeakSet[AccessTracker]" = weakref.WeakSet()
+
+
+class AccessTracker:
+    """Write-behind buffer for memory access timestamps and counts.
+
+    Retrievals record which memories they returned here instead of updating
+    SQLite directly. Accesses to the same memory coalesce into one pending
+    entry, and a background thread flushes the buffer in a single batched
+    UPDATE every flush_interval seconds or once max_pending entries build up.
+    """
+
+    def __init__(self, connections: ConnectionManager, flush_interval: float = 5.0,
+                 max_pending: int = 1000):
+        """Initialize the tracker and start its flush thread.
+
+        Args:
+            connections: Connection manager of the storage being tracked
+            flush_interval: Seconds between background flushes
+            max_pending: Number of pending memories that triggers an early flush
+        """
+        self._connections = connections
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+
+        self._pending: Dict[int, List] = {}  # memory ID -> [last_accessed, access count]
+        self._lock = threading.Lock()
+        self._flush_requested = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(
+            target=_run, args=(weakref.ref(self), self._stopped, self._flush_requested),
+            name="neuromind-access-flush", daemon=True
+        )
+        self._thread.start()
+        # A tracker dropped without close() stops its thread; its buffer is lost
+        finalizer = weakref.finalize(self, _stop, self._stopped, self._flush_requested)
+        finalizer.atexit = False
+        _open_trackers.add(self)
+        # Registered last, so at exit it flushes before finalizers close the connections
+        atexit.unregister(_close_open_trackers)
+        atexit.register(_close_open_trackers)
+
+    def record(self, memory_ids: Iterable[int]) -> None:
+        """Record an access to each of the given memories.
+
+        Args:
+            memory_ids: IDs of the memories that were accessed
+        """
+        # Same format as SQLite's CURRENT_TIMESTAMP so comparisons stay valid
+        now = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+        with self._lock:
+            for memory_id in memory_ids:
+                entry = self._pending.get(memory_id)
+                if entry is None:
+                    self._pending[memory_id] = [now, 1]
+                else:
+                    entry[0] = now
+                    entry[1] += 1
+            if len(self._pending) >= self.max_pending:
+                self._flush_requested.set()
+
+    def flush(self) -> int:
+        """Write all pending accesses to SQLite in one transaction.
+
+        Returns:
+            Number of memories updated
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        try:
+            with self._connections.transaction() as conn:
+                conn.executemany("""
+                    UPDATE memories
+                    SET last_accessed = ?,
+                        access_count = COALESCE(access_count, 0) + ?
+                    WHERE id = ?
+                """, ((ts, count, memory_id) for memory_id, (ts, count) in pending.items()))
+        except Exception as e:
+            # Put the accesses back so the next flush retries them
+            with self._lock:
+                for memory_id, (ts, count) in pending.items():
+                    entry = self._pending.setdefault(memory_id, [ts, 0])
+                    entry[1] += count
+            logger.error("Error flushing memory accesses", exc_info=e)
+            raise
+
+        logger.debug(f"Flushed accesses for {len(pending)} memories")
+        return len(pending)
+
+    def close(self) -> None:
+        """Stop the flush thread and write any remaining accesses."""
+        if self._stopped.is_set():
+            return
+        _open_trackers.discard(self)
+        _stop(self._stopped, self._flush_requested)
+        self._thread.join()
+        self.flush()
+
+
+def _run(tracker_ref: "weakref.ref[AccessTracker]", stopped: threading.Event,
+         flush_requested: threading.Event) -> None:
+    """Background loop flushing on a timer or when the buffer fills up.
+
+    Holds the tracker only while flushing, so the thread does not keep an
+    unclosed tracker (and its storage's connections) alive.
+    """
+    while not stopped.is_set():
+        tracker = tracker_ref()
+        if tracker is None:
+            break
+        interval = tracker.flush_interval
+        del tracker
+        flush_requested.wait(interval)
+        flush_requested.clear()
+        tracker = tracker_ref()
+        if tracker is None or stopped.is_set():
+            break
+        try:
+            tracker.flush()
+        except Exception:
+            pass  # Already logged; retried on the next cycle
+        del tracker
+
+
+def _stop(stopped: threading.Event, flush_requested: threading.Event) -> None:
+    """Tell a tracker's flush thread to exit and wake it up."""
+    stopped.set()
+    flush_requested.set()
+
+
+def _close_open_trackers() -> None:
+    """Flush the accesses of trackers still open at interpreter exit."""
+    for tracker in list(_open_trackers):
+        tracker.close()
@@ -0,0 +1,161 @@
+import os
+import struct
+import threading
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator, Optional, Sequence
+import numpy as np
+from neuromind.utils.logging import logger
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends are only serialized within the process
+    fcntl = None
+
+# Header: magic, dimension, padding to keep the vector payload 16-byte aligned
+_HEADER = struct.Struct("<8sI4x")
+_MAGIC = b"NMARENA1"
+
+
+class EmbeddingArena:
+    """Append-only, fixed-stride file of float32 embeddings.
+
+    Vectors are addressed by slot number (row offset), so SQLite only needs
+    to store an integer per memory, and the whole file can be read as a
+    single zero-copy np.memmap matrix. Slots are never rewritten in place;
+    dead slots left behind by compression are reclaimed by compact().
+    Appends hold an exclusive file lock, so processes sharing the arena
+    never hand out the same slot twice.
+    """
+
+    def __init__(self, path: str, dimension: int):
+        """Open (or create) an arena file.
+
+        Args:
+            path: Path of the arena file
+            dimension: Dimension of the stored embeddings
+
+        Raises:
+            ValueError: If an existing file has a different dimension
+        """
+        self.path = path
+        self.dimension = dimension
+        self.stride = dimension * 4
+        self._lock = threading.Lock()
+        self._memmap: Optional[np.memmap] = None
+
+        if not os.path.exists(path) or os.path.getsize(path) < _HEADER.size:
+            with open(path, "wb") as f:
+                f.write(_HEADER.pack(_MAGIC, dimension))
+        else:
+            with open(path, "rb") as f:
+                magic, file_dimension = _HEADER.unpack(f.read(_HEADER.size))
+            if magic != _MAGIC:
+                raise ValueError(f"{path} is not an embedding arena")
+            if file_dimension != dimension:
+                raise ValueError(f"Arena dimension {file_dimension} != {dimension}")
+
+        # Drop a partially written trailing vector left by a crash mid-append
+        with open(path, "ab") as f, _locked(f):
+            self._truncate_torn(f)
+
+    def __len__(self) -> int:
+        """Number of slots in the arena, including dead ones."""
+        return (os.path.getsize(self.path) - _HEADER.size) // self.stride
+
+    def append(self, embeddings: np.ndarray) -> np.ndarray:
+        """Append embeddings to the end of the arena.
+
+        Args:
+            embeddings: Matrix with one embedding per row
+
+        Returns:
+            Slot number of each appended row
+        """
+        embeddings = np.ascontiguousarray(embeddings, dtype="<f4").reshape(-1, self.dimension)
+        with self._lock, open(self.path, "ab") as f, _locked(f):
+            # The end of file is only stable while the lock is held
+            start = (self._truncate_torn(f) - _HEADER.size) // self.stride
+            f.write(embeddings.tobytes())
+            f.flush()
+        return np.arange(start, start + len(embeddings), dtype=np.int64)
+
+    def _truncate_torn(self, f: BinaryIO) -> int:
+        """Cut a torn trailing vector from a locked append handle.
+
+        Returns:
+            File size after truncation
+        """
+        size = os.fstat(f.fileno()).st_size
+        torn = (size - _HEADER.size) % self.stride
+        if torn:
+            size -= torn
+            f.truncate(size)
+            logger.warning(f"Truncated torn trailing vector in {self.path}")
+        return size
+
+    def matrix(self) -> np.ndarray:
+        """Read-only, memory-mapped view of every slot.
+
+        Returns:
+            float32 matrix of shape (len(arena), dimension)
+        """
+        with self._lock:
+            n = len(self)
+            if self._memmap is None or len(self._memmap) != n:
+                if n == 0:
+                    return np.empty((0, self.dimension), dtype=np.float32)
+                self._memmap = np.memmap(self.path, dtype="<f4", mode="r",
+                                         offset=_HEADER.size, shape=(n, self.dimension))
+            return self._memmap
+
+    def read(self, slots: Sequence[int]) -> np.ndarray:
+        """Copy the embeddings stored in the given slots.
+
+        Args:
+            slots: Slot numbers to read
+
+        Returns:
+            float32 matrix with one row per slot
+        """
+        return np.asarray(self.matrix()[np.asarray(slots, dtype=np.int64)], dtype=np.float32)
+
+    def compact(self, live_slots: Sequence[int], path: str) -> "EmbeddingArena":
+        """Copy live slots, in the given order, into a new arena file.
+
+        The current file is left untouched, so callers can switch to the new
+        arena (whose slot i holds live_slots[i]) only after recording the new
+        offsets.
+
+        Args:
+            live_slots: Slots to keep
+            path: Path of the new arena file
+
+        Returns:
+            The compacted arena
+        """
+        if os.path.exists(path):
+            os.remove(path)
+        compacted = EmbeddingArena(path, self.dimension)
+        live_slots = np.asarray(live_slots, dtype=np.int64)
+        source = self.matrix()
+        for start in range(0, len(live_slots), 65536):
+            compacted.append(source[live_slots[start:start + 65536]])
+        return compacted
+
+    def close(self) -> None:
+        """Release the memory map."""
+        with self._lock:
+            self._memmap = None
+
+
+@contextmanager
+def _locked(f: BinaryIO) -> Iterator[None]:
+    """Hold an exclusive advisory lock on an open file (no-op without fcntl)."""
+    if fcntl is None:
+        yield
+        return
+    fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+    try:
+        yield
+    finally:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
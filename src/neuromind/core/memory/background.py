@@ -0,0 +1,46 @@
+import threading
+from typing import Callable
+from neuromind.utils.logging import logger
+
+
+class PeriodicWorker:
+    """Daemon thread that runs a task every interval seconds or on demand."""
+
+    def __init__(self, name: str, interval: float, task: Callable[[], object]):
+        """Initialize and start the worker.
+
+        Args:
+            name: Thread name, also used in log messages
+            interval: Seconds between runs
+            task: Callable to run; exceptions are logged and the loop continues
+        """
+        self.name = name
+        self.interval = interval
+        self.task = task
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def trigger(self) -> None:
+        """Run the task as soon as possible instead of waiting for the interval."""
+        self._wake.set()
+
+    def stop(self) -> None:
+        """Stop the worker and wait for a running task to finish."""
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def _run(self) -> None:
+        """Loop until stopped, running the task on each wake-up."""
+        while not self._stopped.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if self._stopped.is_set():
+                break
+            try:
+                self.task()
+            except Exception as e:
+                logger.error(f"Error in background task {self.name}", exc_info=e)
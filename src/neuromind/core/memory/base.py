@@ -2,8 +2,8 @@ from dataclasses import dataclass, field
 from datetime import datetime
 from typing import Dict, Any, Optional, List
 import numpy as np
-from .memory_types import MemoryType
-from ..utils.logging import logger
+from ..memory_types import MemoryType
+from ...utils.logging import logger
 
 @dataclass
 class Memory:
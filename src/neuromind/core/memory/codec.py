@@ -0,0 +1,194 @@
+import struct
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+
+# Header: magic, format version, dtype code, dimension
+_HEADER = struct.Struct("<2sBBI")
+_MAGIC = b"NM"
+_VERSION = 1
+_SCALE = struct.Struct("<f")
+
+_DTYPES: Dict[str, int] = {"float32": 0, "float16": 1, "int8": 2}
+_CODE_DTYPES = {0: np.dtype("<f4"), 1: np.dtype("<f2"), 2: np.dtype("i1")}
+
+
+class EmbeddingCodec:
+    """Encodes embeddings as compact, self-describing SQLite BLOBs.
+
+    Every BLOB starts with a small header recording the storage dtype and
+    dimension, so a database can mix codecs and still be decoded. Supported
+    codecs are "float32" (lossless), "float16" (half the size) and "int8"
+    (a quarter of the size, scalar-quantized with a per-vector scale).
+    Headerless BLOBs written before the codec existed are read as raw float32,
+    or as raw float64 when they are twice that size.
+    """
+
+    def __init__(self, name: str = "float32"):
+        """Initialize the codec.
+
+        Args:
+            name: Storage dtype, one of "float32", "float16" or "int8"
+
+        Raises:
+            ValueError: If the codec name is unknown
+        """
+        if name not in _DTYPES:
+            raise ValueError(f"Invalid embedding codec: {name}. Must be one of {list(_DTYPES)}")
+        self.name = name
+        self.code = _DTYPES[name]
+
+    def encode(self, embedding: np.ndarray) -> bytes:
+        """Encode a single embedding.
+
+        Args:
+            embedding: Vector embedding
+
+        Returns:
+            Encoded BLOB
+        """
+        return self.encode_many(np.asarray(embedding).reshape(1, -1))[0]
+
+    def encode_many(self, embeddings: np.ndarray) -> List[bytes]:
+        """Encode a matrix of embeddings in one vectorized pass.
+
+        Args:
+            embeddings: Matrix with one embedding per row
+
+        Returns:
+            One encoded BLOB per row
+        """
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        n, dimension = embeddings.shape
+        header = _HEADER.pack(_MAGIC, _VERSION, self.code, dimension)
+
+        if self.name == "int8":
+            scales = np.abs(embeddings).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            codes = np.rint(embeddings / scales[:, None]).astype(np.int8)
+            prefix = np.frombuffer(header, dtype=np.uint8)
+            rows = np.hstack([
+                np.broadcast_to(prefix, (n, len(prefix))),
+                scales.astype("<f4").view(np.uint8).reshape(n, 4),
+                codes.view(np.uint8)
+            ])
+        else:
+            payload = embeddings.astype(_CODE_DTYPES[self.code]).view(np.uint8)
+            prefix = np.frombuffer(header, dtype=np.uint8)
+            rows = np.hstack([np.broadcast_to(prefix, (n, len(prefix))), payload])
+        return [row.tobytes() for row in rows]
+
+    @staticmethod
+    def decode(blob: bytes, dimension: int) -> np.ndarray:
+        """Decode a single BLOB into a float32 vector.
+
+        Args:
+            blob: Encoded (or legacy raw float32/float64) embedding
+            dimension: Expected embedding dimension
+
+        Returns:
+            float32 vector
+        """
+        return EmbeddingCodec.decode_many([blob], dimension)[0]
+
+    @staticmethod
+    def decode_many(blobs: Sequence[bytes], dimension: int) -> np.ndarray:
+        """Decode BLOBs into a float32 matrix.
+
+        BLOBs of the same layout are decoded together with one frombuffer
+        call over their concatenation, so a uniformly encoded table decodes
+        without per-row Python work.
+
+        Args:
+            blobs: Encoded (or legacy raw float32/float64) embeddings
+            dimension: Expected embedding dimension
+
+        Returns:
+            float32 matrix with one row per BLOB
+
+        Raises:
+            ValueError: If any BLOB cannot be decoded (see decode_valid)
+        """
+        return _decode(blobs, dimension, None)
+
+    @staticmethod
+    def decode_valid(blobs: Sequence[bytes], dimension: int) -> Tuple[np.ndarray, List[int]]:
+        """Decode BLOBs, skipping the ones that cannot be decoded.
+
+        Well-formed batches take the same vectorized path as decode_many;
+        only a group of equally sized BLOBs that fails to decode is retried
+        one BLOB at a time, so a single corrupt row does not fail the batch.
+
+        Args:
+            blobs: Encoded (or legacy raw float32/float64) embeddings
+            dimension: Expected embedding dimension
+
+        Returns:
+            float32 matrix with one row per decodable BLOB, in input order,
+            and the indices of the skipped BLOBs
+        """
+        bad: List[int] = []
+        result = _decode(blobs, dimension, bad)
+        if not bad:
+            return result, bad
+        return np.delete(result, bad, axis=0), bad
+
+
+def _decode(blobs: Sequence[bytes], dimension: int, bad: Optional[List[int]]) -> np.ndarray:
+    """Decode BLOBs grouped by length; collect undecodable indices in bad, or raise if it is None."""
+    result = np.empty((len(blobs), dimension), dtype=np.float32)
+    groups: Dict[int, List[int]] = {}
+    for i, blob in enumerate(blobs):
+        groups.setdefault(len(blob), []).append(i)
+
+    for length, rows in groups.items():
+        buf = np.frombuffer(b"".join(blobs[i] for i in rows), dtype=np.uint8).reshape(len(rows), length)
+        try:
+            result[rows] = _decode_group(buf, dimension)
+        except ValueError:
+            if bad is None:
+                raise
+            for i, row in zip(rows, buf):
+                try:
+                    result[i] = _decode_group(row[None, :], dimension)[0]
+                except ValueError:
+                    bad.append(i)
+    if bad:
+        bad.sort()
+    return result
+
+
+def _decode_group(buf: np.ndarray, dimension: int) -> np.ndarray:
+    """Decode a matrix of equally sized BLOBs, one per row."""
+    length = buf.shape[1]
+    if length == 4 * dimension and not _has_header(buf[0], dimension):
+        return buf.view("<f4")  # Legacy headerless float32
+    if length == 8 * dimension and not _has_header(buf[0], dimension):
+        return buf.view("<f8").astype(np.float32)  # Legacy headerless float64
+
+    if length < _HEADER.size:
+        raise ValueError("Embedding BLOB too short")
+    if not (buf[:, :_HEADER.size] == buf[0, :_HEADER.size]).all():
+        # Same length but different headers; decode each row on its own
+        return np.vstack([_decode_group(row[None, :], dimension) for row in buf])
+
+    magic, version, code, blob_dimension = _HEADER.unpack(buf[0, :_HEADER.size].tobytes())
+    if magic != _MAGIC or version != _VERSION or code not in _CODE_DTYPES:
+        raise ValueError("Unrecognized embedding BLOB header")
+    if blob_dimension != dimension:
+        raise ValueError(f"Embedding dimension {blob_dimension} != {dimension}")
+
+    offset = _HEADER.size
+    if code == _DTYPES["int8"]:
+        scales = buf[:, offset:offset + _SCALE.size].copy().view("<f4")
+        offset += _SCALE.size
+        codes = buf[:, offset:].copy().view(np.int8)
+        return codes.astype(np.float32) * scales
+    return buf[:, offset:].copy().view(_CODE_DTYPES[code]).astype(np.float32)
+
+
+def _has_header(row: np.ndarray, dimension: int) -> bool:
+    """Whether a BLOB starts with a valid codec header for this dimension."""
+    if len(row) < _HEADER.size:
+        return False
+    magic, version, code, blob_dimension = _HEADER.unpack(row[:_HEADER.size].tobytes())
+    return magic == _MAGIC and version == _VERSION and code in _CODE_DTYPES and blob_dimension == dimension
@@ -0,0 +1,169 @@
+import sqlite3
+import threading
+import weakref
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional
+from neuromind.utils.logging import logger
+
+# Pragmas applied to every connection opened by the manager. WAL lets readers
+# proceed while a writer holds the lock; NORMAL synchronous is durable across
+# application crashes in WAL mode and avoids an fsync per commit. Incremental
+# auto-vacuum only takes effect on databases created with it (or after a
+# VACUUM), so it comes first, before any table exists.
+DEFAULT_PRAGMAS: Dict[str, object] = {
+    "auto_vacuum": "INCREMENTAL",
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -65536,       # 64 MiB page cache (negative value is KiB)
+    "mmap_size": 268435456,     # 256 MiB memory-mapped I/O
+    "temp_store": "MEMORY",
+    "foreign_keys": "OFF",
+}
+
+
+def _release(conn: sqlite3.Connection, connections: List[sqlite3.Connection],
+             lock: threading.Lock) -> None:
+    """Close a thread's connection and forget it (finalizer of its _ThreadConnection)."""
+    with lock:
+        try:
+            connections.remove(conn)
+        except ValueError:
+            return  # Already closed by close_all
+    try:
+        conn.close()
+    except sqlite3.Error as e:
+        logger.warning("Error closing SQLite connection", exc_info=e)
+
+
+class _ThreadConnection:
+    """Holder stored in the thread-local; dropped (closing the connection) when its thread exits."""
+
+    __slots__ = ("conn", "__weakref__")
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+
+class ConnectionManager:
+    """Thread-local pool of persistent SQLite connections.
+
+    Each thread gets its own long-lived connection, so readers never wait on
+    a connection handoff and SQLite's per-connection statement cache keeps
+    prepared statements alive between calls. A thread's connection is closed
+    when the thread exits, so short-lived worker threads do not leak
+    connections or file descriptors.
+    """
+
+    def __init__(self, db_path: str, timeout: float = 30.0,
+                 cached_statements: int = 256,
+                 pragmas: Optional[Dict[str, object]] = None,
+                 detect_types: int = 0,
+                 on_connect: Optional[Callable[[sqlite3.Connection], None]] = None):
+        """Initialize the connection manager.
+
+        Args:
+            db_path: Path to SQLite database (":memory:" is shared across threads)
+            timeout: Seconds to wait on a locked database before failing
+            cached_statements: Size of each connection's prepared statement cache
+            pragmas: Overrides for the default connection pragmas
+            detect_types: sqlite3 type detection flags
+            on_connect: Optional setup run on every new connection, e.g. to
+                register SQL functions
+        """
+        self.db_path = db_path
+        self.timeout = timeout
+        self.cached_statements = cached_statements
+        self.detect_types = detect_types
+        self.on_connect = on_connect
+        self.pragmas = {**DEFAULT_PRAGMAS, **(pragmas or {})}
+
+        # A plain ":memory:" database is private to one connection, so use a
+        # named shared-cache database to let every thread see the same data.
+        if db_path == ":memory:":
+            self._database = f"file:neuromind-{id(self)}?mode=memory&cache=shared"
+            self._uri = True
+        else:
+            self._database = db_path
+            self._uri = False
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections: List[sqlite3.Connection] = []
+        self._closed = False
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open and configure a new connection."""
+        conn = sqlite3.connect(
+            self._database,
+            timeout=self.timeout,
+            detect_types=self.detect_types,
+            cached_statements=self.cached_statements,
+            check_same_thread=False,
+            uri=self._uri
+        )
+        for name, value in self.pragmas.items():
+            if name == "journal_mode" and self._uri:
+                continue  # In-memory databases cannot use WAL
+            conn.execute(f"PRAGMA {name} = {value}")
+        if self.on_connect is not None:
+            self.on_connect(conn)
+
+        with self._lock:
+            self._connections.append(conn)
+        logger.debug(f"Opened SQLite connection to {self.db_path} "
+                     f"for thread {threading.current_thread().name}")
+        return conn
+
+    def get(self) -> sqlite3.Connection:
+        """Get the calling thread's connection, opening it on first use.
+
+        Returns:
+            SQLite connection owned by the current thread
+
+        Raises:
+            sqlite3.ProgrammingError: If the manager has been closed
+        """
+        holder = getattr(self._local, "conn", None)
+        if holder is None:
+            if self._closed:
+                raise sqlite3.ProgrammingError(f"Connection manager for {self.db_path} is closed")
+            holder = _ThreadConnection(self._connect())
+            weakref.finalize(holder, _release, holder.conn, self._connections, self._lock)
+            self._local.conn = holder
+        return holder.conn
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Run a block inside a transaction on the thread's connection.
+
+        Commits on success and rolls back if the block raises.
+
+        Yields:
+            SQLite connection owned by the current thread
+        """
+        conn = self.get()
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+    def close_all(self) -> None:
+        """Close every connection opened by this manager.
+
+        The manager cannot be used afterwards; calling close_all again is a no-op.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            connections = list(self._connections)
+            self._connections.clear()
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error as e:
+                logger.warning("Error closing SQLite connection", exc_info=e)
+        self._local = threading.local()
+        logger.debug(f"Closed {len(connections)} SQLite connections to {self.db_path}")
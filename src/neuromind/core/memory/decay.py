@@ -0,0 +1,124 @@
+import sqlite3
+from datetime import datetime, timezone
+from typing import Dict, Optional, Sequence
+import numpy as np
+
+SQL_FUNCTION = "effective_importance"
+"""Name of the SQL function registered by ImportanceDecay.register."""
+
+_SECONDS_PER_DAY = 86400.0
+
+
+def utc_now() -> datetime:
+    """Current UTC time as a naive datetime, comparable with SQLite's CURRENT_TIMESTAMP."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def to_datetime64(timestamps: Sequence) -> np.ndarray:
+    """Parse timestamps (ISO strings, datetimes or None) into a datetime64 array.
+
+    Values that cannot be parsed become NaT instead of failing the batch.
+
+    Args:
+        timestamps: One timestamp per memory
+
+    Returns:
+        datetime64[us] array
+    """
+    try:
+        return np.array(timestamps, dtype="datetime64[us]")
+    except (TypeError, ValueError):
+        parsed = np.full(len(timestamps), np.datetime64("NaT"), dtype="datetime64[us]")
+        for i, value in enumerate(timestamps):
+            try:
+                parsed[i] = np.datetime64(value, "us")
+            except (TypeError, ValueError):
+                pass
+        return parsed
+
+
+def ages_in_days(timestamps: Sequence, now: Optional[datetime] = None) -> np.ndarray:
+    """Age of each timestamp in days, NaN where a timestamp is missing or invalid.
+
+    Args:
+        timestamps: One timestamp per memory
+        now: Reference time (default: current UTC time)
+
+    Returns:
+        float64 array of ages; timestamps in the future have age 0
+    """
+    now = np.datetime64(now or utc_now(), "us")
+    ages = (now - to_datetime64(timestamps)) / np.timedelta64(1, "s") / _SECONDS_PER_DAY
+    return np.maximum(ages, 0.0)
+
+
+class ImportanceDecay:
+    """Exponential decay of memory importance, evaluated when it is read.
+
+    The stored importance is the base value and never rewritten. A memory's
+    effective importance halves every half-life of its type since it was
+    last accessed (or created):
+
+        effective = importance * 0.5 ** (age_days / half_life_days)
+
+    Types without a half-life do not decay. The same formula is available
+    vectorized over numpy arrays for ranking, and as a SQL function
+    (see register) for filters such as compression thresholds.
+    """
+
+    def __init__(self, half_life_days: Optional[Dict[str, Optional[float]]] = None):
+        """Initialize the decay model.
+
+        Args:
+            half_life_days: Half-life in days per memory type, e.g.
+                {"conversation": 14}; types not listed (or None) do not decay
+        """
+        self.half_life_days = {t: days for t, days in (half_life_days or {}).items() if days}
+        if any(days <= 0 for days in self.half_life_days.values()):
+            raise ValueError("Half-lives must be positive")
+
+    @property
+    def enabled(self) -> bool:
+        """Whether any memory type decays."""
+        return bool(self.half_life_days)
+
+    def effective(self, importances: Sequence[float], timestamps: Sequence,
+                  memory_types: Sequence[str], now: Optional[datetime] = None) -> np.ndarray:
+        """Effective importance of a batch of memories.
+
+        Args:
+            importances: Stored (base) importance of each memory
+            timestamps: Last access (or creation) time of each memory
+            memory_types: Type of each memory
+            now: Reference time (default: current UTC time)
+
+        Returns:
+            float64 array of effective importances; memories with a missing
+            timestamp keep their base importance
+        """
+        importances = np.asarray(importances, dtype=np.float64)
+        if not self.enabled or not len(importances):
+            return importances
+        half_lives = np.array([self.half_life_days.get(t, np.inf) for t in memory_types], dtype=np.float64)
+        ages = np.nan_to_num(ages_in_days(timestamps, now), nan=0.0)
+        return importances * np.exp2(-ages / half_lives)
+
+    def register(self, conn: sqlite3.Connection) -> None:
+        """Register effective_importance(importance, type, last_accessed) on a connection.
+
+        Args:
+            conn: SQLite connection to add the function to
+        """
+        conn.create_function(SQL_FUNCTION, 3, self._effective_one)
+
+    def _effective_one(self, importance: Optional[float], memory_type: Optional[str],
+                       timestamp: Optional[str]) -> Optional[float]:
+        """Scalar effective importance for the SQL function (same formula as effective)."""
+        half_life = self.half_life_days.get(memory_type)
+        if importance is None or half_life is None or timestamp is None:
+            return importance
+        try:
+            age = (utc_now() - datetime.fromisoformat(timestamp)).total_seconds() / _SECONDS_PER_DAY
+        except (TypeError, ValueError):
+            return importance
+        return importance * 0.5 ** (max(age, 0.0) / half_life)
@@ -0,0 +1,145 @@
+import os
+import threading
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+import faiss
+import numpy as np
+from neuromind.utils.logging import logger
+
+EXECUTION_MODES = ("per_query", "batch")
+
+_process_policy: Optional["ExecutionPolicy"] = None
+_process_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class ExecutionPolicy:
+    """How FAISS searches share the CPU when queries arrive concurrently.
+
+    FAISS parallelizes each search with an OpenMP team. When many request
+    threads search at once, every search starting a full team oversubscribes
+    the cores and throughput drops below single-threaded. Two modes avoid it:
+
+    - "per_query": each caller thread runs its own search, and each search
+      uses omp_threads threads (default 1), so request concurrency is the
+      parallelism.
+    - "batch": concurrent retrieve() calls are coalesced for up to
+      batch_window seconds (or max_batch queries) into one search that
+      uses omp_threads threads (default: every core) and FAISS's BLAS path.
+
+    The OpenMP thread count is process-wide, so it is applied once per
+    process (see apply). BLAS libraries read their own thread counts
+    (OPENBLAS_NUM_THREADS, MKL_NUM_THREADS) from the environment at import
+    time; set them before starting the process. benchmarks/bench_concurrency.py
+    compares the modes at a given concurrency.
+    """
+
+    mode: str = "per_query"
+    omp_threads: Optional[int] = None
+    batch_window: float = 0.002
+    max_batch: int = 64
+
+    def __post_init__(self):
+        if self.mode not in EXECUTION_MODES:
+            raise ValueError(f"Invalid execution mode: {self.mode}. Must be one of {list(EXECUTION_MODES)}")
+        if self.omp_threads is not None and self.omp_threads < 1:
+            raise ValueError("omp_threads must be at least 1")
+        if self.max_batch < 1:
+            raise ValueError("max_batch must be at least 1")
+
+    @property
+    def threads(self) -> int:
+        """OpenMP threads used by each FAISS search under this policy."""
+        if self.omp_threads is not None:
+            return self.omp_threads
+        return 1 if self.mode == "per_query" else os.cpu_count() or 1
+
+    def apply(self) -> int:
+        """Pin this policy's OpenMP thread count for the process.
+
+        Applying the same policy again is a no-op. A different policy
+        replaces the previous one (the setting is process-wide), with a
+        warning, since storages sharing the process then share it too.
+
+        Returns:
+            OpenMP threads now used by FAISS searches
+        """
+        global _process_policy
+        with _process_lock:
+            if _process_policy == self:
+                return self.threads
+            if _process_policy is not None:
+                logger.warning(f"Replacing process execution policy {_process_policy} with {self}")
+            faiss.omp_set_num_threads(self.threads)
+            _process_policy = self
+        logger.info(f"FAISS searches use {self.threads} OpenMP threads ({self.mode} mode)")
+        return self.threads
+
+
+class MicroBatcher:
+    """Coalesces concurrent single-query searches into batched searches.
+
+    The first caller to arrive becomes the batch leader: it waits up to
+    window seconds for more queries (or until max_batch are queued), runs
+    one search per distinct key over the stacked query vectors, and hands
+    each caller its row of the results. No extra thread is needed; callers
+    block until their batch has run.
+    """
+
+    def __init__(self, run: Callable[[Hashable, np.ndarray], Sequence], window: float, max_batch: int):
+        """Initialize the batcher.
+
+        Args:
+            run: Search callable receiving a key and a query matrix, returning
+                one result per query row
+            window: Seconds the leader waits for more queries
+            max_batch: Queued queries that start the batch early
+        """
+        self.run = run
+        self.window = window
+        self.max_batch = max_batch
+        self._pending: List[Tuple[Hashable, np.ndarray, Future]] = []
+        self._cond = threading.Condition()
+
+    def submit(self, key: Hashable, query: np.ndarray):
+        """Search one query as part of the next batch.
+
+        Args:
+            key: Queries are only batched with others of an equal key
+                (e.g. the same k and filters)
+            query: Query vector
+
+        Returns:
+            This query's result from run
+        """
+        future: Future = Future()
+        with self._cond:
+            self._pending.append((key, query, future))
+            leader = len(self._pending) == 1
+            if len(self._pending) >= self.max_batch:
+                self._cond.notify_all()
+
+        if leader:
+            with self._cond:
+                self._cond.wait_for(lambda: len(self._pending) >= self.max_batch, timeout=self.window)
+                batch, self._pending = self._pending, []
+            self._run_batch(batch)
+        return future.result()
+
+    def _run_batch(self, batch: List[Tuple[Hashable, np.ndarray, Future]]) -> None:
+        """Run one search per key and resolve every caller's future."""
+        groups: Dict[Hashable, List[Tuple[np.ndarray, Future]]] = {}
+        for key, query, future in batch:
+            groups.setdefault(key, []).append((query, future))
+
+        for key, entries in groups.items():
+            try:
+                results = self.run(key, np.stack([query for query, _ in entries]))
+            except Exception as e:
+                for _, future in entries:
+                    future.set_exception(e)
+                continue
+            for (_, future), result in zip(entries, results):
+                future.set_result(result)
+        logger.debug(f"Ran {len(batch)} queries in {len(groups)} batched searches")
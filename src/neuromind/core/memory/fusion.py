@@ -0,0 +1,45 @@
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+RRF_K = 60
+"""Rank offset of reciprocal-rank fusion; damps the weight of the very top ranks."""
+
+
+def fts_query(text: str) -> Optional[str]:
+    """Turn free text into a safe FTS5 MATCH expression.
+
+    Each whitespace-separated word becomes a quoted phrase, so codes such
+    as "ERR-404" or "v2.1" match as written instead of being parsed as
+    FTS5 operators, and the phrases are ORed so BM25 ranks partial matches.
+
+    Args:
+        text: User query
+
+    Returns:
+        MATCH expression, or None if the text has no words
+    """
+    words = text.split()
+    if not words:
+        return None
+    return " OR ".join('"{}"'.format(word.replace('"', '""')) for word in words)
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[Hashable]],
+                           k: int = RRF_K) -> List[Tuple[Hashable, float]]:
+    """Fuse several rankings of the same items with reciprocal-rank fusion.
+
+    Every item scores the sum of 1 / (k + rank) over the rankings it
+    appears in (ranks start at 1). Only ranks are used, so rankings with
+    incomparable scores, such as BM25 and vector distances, fuse cleanly.
+
+    Args:
+        rankings: Item keys in rank order, best first, one sequence per ranker
+        k: Rank offset
+
+    Returns:
+        (key, fused score) pairs, best first
+    """
+    scores: Dict[Hashable, float] = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking, start=1):
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
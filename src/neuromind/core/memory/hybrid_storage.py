@@ -1,70 +1,256 @@
+import numbers
+import os
 import sqlite3
-from typing import Dict, List, Optional, Tuple
+import threading
+import time
+from typing import BinaryIO, Callable, Dict, List, Optional, Sequence, Tuple, Union
 import numpy as np
 import faiss
 from datetime import datetime
 import json
 from neuromind.utils.logging import logger
+from .access_tracker import AccessTracker
+from .arena import EmbeddingArena
+from .background import PeriodicWorker
+from .codec import EmbeddingCodec
+from .connection import ConnectionManager
+from .decay import SQL_FUNCTION, ImportanceDecay
+from .execution import ExecutionPolicy, MicroBatcher
+from .fusion import RRF_K, fts_query, reciprocal_rank_fusion
+from .index_factory import (
+    AUTO_INDEX_SPEC, DEFAULT_INDEX_SPEC, METRICS, build_index, choose_index_spec,
+    make_writable, min_training_size, remove_ids, search_parameters
+)
+from .migrations import STORAGE_MIGRATIONS, migrate
+from .query_cache import QueryCache
+from .transfer import ExportWriter, open_stream, read_export
+from .type_filter import TypeFilter
 
 class HybridMemoryStorage:
     """Hybrid memory storage combining FAISS for vector search and SQLite for structured storage."""
     
-    def __init__(self, db_path: str = "neuromind.db", dimension: int = 1536):
+    def __init__(self, db_path: str = "neuromind.db", dimension: int = 1536,
+                 sqlite_pragmas: Optional[Dict[str, object]] = None,
+                 index_path: Optional[str] = None, persist_index: bool = True,
+                 index_spec: str = DEFAULT_INDEX_SPEC,
+                 search_params: Optional[Dict] = None,
+                 train_sample_size: int = 100_000,
+                 access_flush_interval: float = 5.0,
+                 access_flush_size: int = 1000,
+                 embedding_codec: str = "float32",
+                 embedding_storage: str = "sqlite",
+                 hot_capacity: Optional[int] = None,
+                 hot_window_days: float = 7.0,
+                 hot_importance: float = 0.9,
+                 tier_interval: float = 300.0,
+                 refresh_interval: Optional[float] = None,
+                 metric: str = "l2",
+                 query_cache_size: int = 0,
+                 query_cache_ttl: float = 60.0,
+                 retention_days: Optional[Dict[str, float]] = None,
+                 retention_interval: float = 3600.0,
+                 retention_batch_size: int = 500,
+                 half_life_days: Optional[Dict[str, float]] = None,
+                 execution_policy: Optional[ExecutionPolicy] = None):
         """Initialize the hybrid storage system.
         
         Args:
             db_path: Path to SQLite database
             dimension: Dimension of vector embeddings
+            sqlite_pragmas: Optional overrides for the SQLite connection pragmas
+            index_path: Path of the FAISS index snapshot (defaults to "<db_path>.faiss")
+            persist_index: Whether to load and save the FAISS index snapshot
+            index_spec: FAISS index factory string (e.g. "HNSW32", "IVF4096,PQ64"),
+                or "auto" to pick one from the corpus size
+            search_params: Default search-time knobs such as {"nprobe": 32, "efSearch": 128}
+            train_sample_size: Maximum number of vectors used to train the index
+            access_flush_interval: Seconds between batched last_accessed writes
+            access_flush_size: Buffered accesses that trigger an early write
+            embedding_codec: On-disk embedding format: "float32", "float16" or "int8"
+            embedding_storage: Where embeddings live: "sqlite" BLOBs, or "arena" for an
+                append-only memory-mapped file with SQLite holding only the slot
+            hot_capacity: Maximum size of the in-memory hot tier, or None to keep
+                every vector in a single index
+            hot_window_days: Memories accessed within this many days are hot
+            hot_importance: Memories at least this important are hot
+            tier_interval: Seconds between background promotion/demotion passes
+            refresh_interval: If set, searches first pull in memories written or
+                compressed by other processes when this many seconds have passed
+                since the last refresh (0 refreshes before every search)
+            metric: Similarity metric: "l2" (squared Euclidean distance), "ip"
+                (inner product) or "cosine" (inner product over vectors
+                normalized as they are indexed)
+            query_cache_size: Number of retrieve() results to cache (0 disables caching)
+            query_cache_ttl: Seconds a cached result stays valid
+            retention_days: Age in days after which memories of a type are deleted,
+                e.g. {"conversation": 90}; types not listed are kept forever
+            retention_interval: Seconds between background retention sweeps
+            retention_batch_size: Memories deleted per sweep transaction
+            half_life_days: Importance half-life in days per memory type, e.g.
+                {"conversation": 14}; compress() and ranking use the decayed
+                value (see ImportanceDecay), types not listed do not decay
+            execution_policy: Optional FAISS threading policy, applied to the
+                whole process; in "batch" mode concurrent retrieve() calls are
+                coalesced into batched searches (see ExecutionPolicy)
         """
+        if embedding_storage not in ("sqlite", "arena"):
+            raise ValueError(f"Invalid embedding storage: {embedding_storage}. Must be 'sqlite' or 'arena'")
+        if embedding_storage == "arena" and db_path == ":memory:":
+            raise ValueError("Embedding arena requires an on-disk database")
+        if metric not in METRICS:
+            raise ValueError(f"Invalid metric: {metric}. Must be one of {list(METRICS)}")
         self.db_path = db_path
         self.dimension = dimension
+        self.persist_index = persist_index and db_path != ":memory:"
+        self.index_path = index_path or f"{db_path}.faiss"
+        self.index_spec = index_spec
+        self.search_params = search_params or {}
+        self.train_sample_size = train_sample_size
+        self.codec = EmbeddingCodec(embedding_codec)
+        self.embedding_storage = embedding_storage
+        self.hot_capacity = hot_capacity
+        self.hot_window_days = hot_window_days
+        self.hot_importance = hot_importance
+        self.refresh_interval = refresh_interval
+        self.metric = metric
         
-        # Initialize FAISS index
-        self.index = faiss.IndexFlatL2(dimension)
-        self.vector_ids = []  # Maps FAISS index to memory IDs
+        # Results of repeated queries; every write that changes the index invalidates it
+        self.query_cache = QueryCache(query_cache_size, query_cache_ttl) if query_cache_size else None
+        self.retention_days = retention_days or {}
+        self.retention_batch_size = retention_batch_size
+        self.decay = ImportanceDecay(half_life_days)
         
-        # Initialize SQLite connection
+        # Size FAISS's OpenMP team for the serving pattern, and coalesce
+        # concurrent single-query searches when batching
+        self.execution_policy = execution_policy
+        self._batcher = None
+        if execution_policy is not None:
+            execution_policy.apply()
+            if execution_policy.mode == "batch":
+                self._batcher = MicroBatcher(
+                    self._search_batch, execution_policy.batch_window, execution_policy.max_batch
+                )
+        
+        # Initialize FAISS index (vectors are keyed by their SQLite memory ID).
+        # Indexes that need training start out as exact search and switch over
+        # once enough vectors are stored to train them.
+        self.index = build_index(DEFAULT_INDEX_SPEC, dimension, metric)
+        self.active_spec = DEFAULT_INDEX_SPEC
+        # With tiering, self.index is the cold tier (configured spec, memory-mapped
+        # snapshot) and recent or important memories sit in an exact in-RAM index
+        self.hot_index = build_index(DEFAULT_INDEX_SPEC, dimension, metric) if hot_capacity else None
+        self._training_sizes: Dict[str, int] = {}
+        self._index_lock = threading.RLock()
+        self._write_lock = threading.Lock()  # Serializes inserts with arena compaction
+        self.type_filter = TypeFilter()
+        
+        # Highest memory and compression history IDs reflected in the index,
+        # plus IDs this process indexed above the watermark itself
+        self._watermark = 0
+        self._history_seen = 0
+        self._own_ids: set = set()
+        self._last_refresh = time.monotonic()
+        
+        # Initialize SQLite connections (one persistent connection per thread)
+        self._closed = False
+        self._connections = ConnectionManager(db_path, pragmas=sqlite_pragmas, on_connect=self.decay.register)
         self._init_db()
+        self.arena = self._open_arena()
+        self._load_index()
+        
+        # Buffer last_accessed updates so retrieval never writes to SQLite
+        self.access_tracker = AccessTracker(
+            self._connections, access_flush_interval, access_flush_size
+        )
+        
+        # Promote and demote between tiers in the background, starting right away
+        self._tier_worker = None
+        if self.hot_index is not None:
+            self._tier_worker = PeriodicWorker("neuromind-tiering", tier_interval, self.rebalance_tiers)
+            self._tier_worker.trigger()
+        
+        # Delete expired memories in the background
+        self._retention_worker = None
+        if self.retention_days:
+            self._retention_worker = PeriodicWorker("neuromind-retention", retention_interval, self.sweep_retention)
+            self._retention_worker.trigger()
         logger.info(f"Initialized hybrid memory storage with dimension {dimension}")
     
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """SQLite connection owned by the calling thread."""
+        return self._connections.get()
+    
+    def close(self) -> None:
+        """Flush buffered accesses, save the index snapshot and close all SQLite connections.
+        
+        Closing an already closed storage does nothing.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        if self._tier_worker is not None:
+            self._tier_worker.stop()
+        if self._retention_worker is not None:
+            self._retention_worker.stop()
+        self.access_tracker.close()
+        if self.persist_index:
+            self.save_index()
+        if self.arena is not None:
+            self.arena.close()
+        self._connections.close_all()
+        logger.info("Closed hybrid memory storage")
+    
     def _init_db(self) -> None:
-        """Initialize SQLite database with required tables."""
+        """Create the database tables and indexes, upgrading older databases in place."""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Create memories table
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS memories (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    content TEXT NOT NULL,
-                    embedding BLOB,
-                    metadata TEXT,
-                    type TEXT,
-                    importance FLOAT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    last_accessed TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            
-            # Create compression history table
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS compression_history (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    memory_id INTEGER,
-                    compression_type TEXT,
-                    compressed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (memory_id) REFERENCES memories (id)
-                )
-            """)
-            
-            conn.commit()
-            conn.close()
-            logger.info("Initialized SQLite database tables")
+            version = migrate(self.conn, STORAGE_MIGRATIONS)
+            self._reencode_legacy_embeddings()
+            logger.info(f"Initialized SQLite database at schema version {version}")
         except Exception as e:
             logger.error("Error initializing database", exc_info=e)
             raise
     
+    def _reencode_legacy_embeddings(self, batch_size: int = 1000) -> None:
+        """Rewrite headerless float64 BLOBs from the original storage with the current codec.
+        
+        Only BLOBs of exactly 8 * dimension bytes can be legacy float64, and
+        that depends on the dimension, which the schema migrations do not
+        know; so this runs once per database after migrating, and is
+        recorded in storage_state.
+        """
+        if self.conn.execute(
+            "SELECT 1 FROM storage_state WHERE key = 'legacy_embeddings_reencoded'"
+        ).fetchone():
+            return
+        
+        rewritten = 0
+        last_id = 0
+        with self._connections.transaction() as conn:
+            while True:
+                rows = conn.execute("""
+                    SELECT id, embedding
+                    FROM memories
+                    WHERE id > ? AND length(embedding) = ?
+                    ORDER BY id
+                    LIMIT ?
+                """, (last_id, 8 * self.dimension, batch_size)).fetchall()
+                if not rows:
+                    break
+                last_id = rows[-1][0]
+                embeddings, bad = EmbeddingCodec.decode_valid([row[1] for row in rows], self.dimension)
+                bad = set(bad)
+                ids = [row[0] for i, row in enumerate(rows) if i not in bad]
+                conn.executemany(
+                    "UPDATE memories SET embedding = ? WHERE id = ?",
+                    zip(self.codec.encode_many(embeddings), ids)
+                )
+                rewritten += len(ids)
+            conn.execute("INSERT OR REPLACE INTO storage_state (key, value) VALUES ('legacy_embeddings_reencoded', ?)",
+                         (str(rewritten),))
+        if rewritten:
+            logger.info(f"Re-encoded {rewritten} legacy float64 embeddings")
+    
     def store(self, content: str, embedding: np.ndarray, metadata: Dict, 
               memory_type: str = "general", importance: float = 1.0) -> int:
         """Store a new memory with its embedding.
@@ -80,178 +266,1441 @@ class HybridMemoryStorage:
             Memory ID
         """
         try:
-            # Store in SQLite
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            with self._write_lock, self._connections.transaction() as conn:
+                # Store in SQLite
+                blobs, offsets = self._encode_embeddings(np.asarray(embedding).reshape(1, -1))
+                cursor = conn.execute("""
+                    INSERT INTO memories (content, embedding, embedding_offset, metadata, type, importance)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """, (content, blobs[0], offsets[0], json.dumps(metadata), memory_type, importance))
+                
+                memory_id = cursor.lastrowid
+                
+                # Store in FAISS
+                self._add_new(
+                    np.array([embedding], dtype=np.float32),
+                    np.array([memory_id], dtype=np.int64),
+                    [memory_type]
+                )
             
-            cursor.execute("""
-                INSERT INTO memories (content, embedding, metadata, type, importance)
-                VALUES (?, ?, ?, ?, ?)
-            """, (content, embedding.tobytes(), json.dumps(metadata), memory_type, importance))
+            logger.debug(f"Stored new memory with ID {memory_id}")
+            return memory_id
+        except Exception as e:
+            logger.error("Error storing memory", exc_info=e)
+            raise
+    
+    def store_many(self, contents: Sequence[str], embeddings: np.ndarray,
+                   metadatas: Optional[Sequence[Dict]] = None,
+                   memory_types: Union[str, Sequence[str]] = "general",
+                   importances: Union[float, Sequence[float]] = 1.0) -> List[int]:
+        """Store a batch of memories in one transaction and one index add.
+        
+        Args:
+            contents: Memory contents
+            embeddings: Matrix of vector embeddings, one row per memory
+            metadatas: Optional metadata for each memory
+            memory_types: Type of every memory, or one type per memory
+            importances: Importance of every memory, or one score per memory
             
-            memory_id = cursor.lastrowid
+        Returns:
+            Memory IDs, in input order
+        """
+        try:
+            n = len(contents)
+            embeddings = np.ascontiguousarray(embeddings, dtype=np.float32).reshape(-1, self.dimension)
+            if len(embeddings) != n:
+                raise ValueError(f"Got {n} contents but {len(embeddings)} embeddings")
+            if n == 0:
+                return []
             
-            # Store in FAISS
-            self.index.add(np.array([embedding], dtype=np.float32))
-            self.vector_ids.append(memory_id)
+            metadatas = metadatas if metadatas is not None else [{}] * n
+            if isinstance(memory_types, str):
+                memory_types = [memory_types] * n
+            # numpy scalars count as single scores; SQLite only binds built-in floats
+            if isinstance(importances, numbers.Real):
+                importances = [float(importances)] * n
+            else:
+                importances = [float(importance) for importance in importances]
+            if not len(metadatas) == len(memory_types) == len(importances) == n:
+                raise ValueError("All per-memory sequences must have the same length")
             
-            conn.commit()
-            conn.close()
+            with self._write_lock, self._connections.transaction() as conn:
+                blobs, offsets = self._encode_embeddings(embeddings)
+                conn.executemany("""
+                    INSERT INTO memories (content, embedding, embedding_offset, metadata, type, importance)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """, zip(contents, blobs, offsets, map(json.dumps, metadatas), memory_types, importances))
+                
+                # The batch holds the write lock, so its AUTOINCREMENT IDs are contiguous
+                last_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+                ids = np.arange(last_id - n + 1, last_id + 1, dtype=np.int64)
+                
+                self._add_new(embeddings, ids, memory_types)
             
-            logger.debug(f"Stored new memory with ID {memory_id}")
-            return memory_id
+            logger.debug(f"Stored {n} memories with IDs {ids[0]}-{ids[-1]}")
+            return ids.tolist()
         except Exception as e:
-            logger.error("Error storing memory", exc_info=e)
+            logger.error("Error storing memories", exc_info=e)
             raise
     
+    def _add_new(self, embeddings: np.ndarray, ids: np.ndarray, memory_types: Sequence[str]) -> None:
+        """Add freshly stored memories to the hot tier, or the only index without tiering."""
+        embeddings = self._normalized(embeddings)
+        self.invalidate_cache()
+        with self._index_lock:
+            if self.hot_index is None:
+                self._writable_index().add_with_ids(embeddings, ids)
+            else:
+                self.hot_index.add_with_ids(embeddings, ids)
+            # Only once they are indexed, so a failed add is caught up later
+            if ids[0] == self._watermark + 1:
+                # No other process wrote in between, so the watermark can move past them
+                self._watermark = int(ids[-1])
+            else:
+                self._own_ids.update(ids.tolist())
+            if self.hot_index is None:
+                self._maybe_upgrade_index()
+            self.type_filter.add(ids, memory_types)
+        
+        if self.hot_index is not None and self.hot_index.ntotal > self.hot_capacity:
+            self._tier_worker.trigger()
+    
     def retrieve(self, query_embedding: np.ndarray, k: int = 5, 
-                memory_type: Optional[str] = None) -> List[Dict]:
+                memory_type: Optional[Union[str, Sequence[str]]] = None,
+                search_params: Optional[Dict] = None) -> List[Dict]:
         """Retrieve similar memories using vector search.
         
+        Type filtering happens inside the FAISS search, so a filtered query
+        still returns the k nearest memories of the requested types. With
+        the query cache enabled, a repeat of a recent query is answered
+        without searching, unless memories were stored or removed since.
+        
         Args:
             query_embedding: Query vector embedding
             k: Number of results to return
-            memory_type: Optional filter by memory type
+            memory_type: Optional filter by memory type, or list of types
+            search_params: Optional per-query knobs overriding the storage defaults
+            
+        Returns:
+            List of retrieved memories, nearest first
+        """
+        query = np.asarray(query_embedding, dtype=np.float32).reshape(1, -1)
+        search_key = (
+            k,
+            memory_type if memory_type is None or isinstance(memory_type, str) else tuple(memory_type),
+            tuple(sorted((search_params or {}).items()))
+        )
+        if self.query_cache is None:
+            return self._retrieve_one(query, search_key)
+        
+        # Refresh first so other processes' writes invalidate the cache
+        self._maybe_refresh()
+        key = (QueryCache.vector_key(query), *search_key)
+        cached = self.query_cache.get(key)
+        if cached is not None:
+            self.access_tracker.record([memory["id"] for memory in cached])
+            return [dict(memory) for memory in cached]
+        
+        generation = self.query_cache.generation
+        results = self._retrieve_one(query, search_key)
+        self.query_cache.put(key, [dict(memory) for memory in results], generation)
+        return results
+    
+    def _retrieve_one(self, query: np.ndarray, search_key: Tuple) -> List[Dict]:
+        """Search a single query, batched with concurrent callers in "batch" mode.
+        
+        Args:
+            query: Query embedding, shaped (1, dimension)
+            search_key: Hashable (k, memory type filter, sorted search params)
+            
+        Returns:
+            Retrieved memories, nearest first
+        """
+        if self._batcher is not None:
+            return self._batcher.submit(search_key, query[0])
+        return self._search_batch(search_key, query)[0]
+    
+    def _search_batch(self, search_key: Tuple, queries: np.ndarray) -> List[List[Dict]]:
+        """Run retrieve_many for a (k, memory type filter, sorted search params) key."""
+        k, memory_type, search_params = search_key
+        return self.retrieve_many(queries, k=k, memory_type=memory_type, search_params=dict(search_params))
+    
+    def invalidate_cache(self) -> None:
+        """Drop cached query results; call after changing memories outside this class."""
+        if self.query_cache is not None:
+            self.query_cache.invalidate()
+    
+    def retrieve_many(self, query_embeddings: np.ndarray, k: int = 5,
+                      memory_type: Optional[Union[str, Sequence[str]]] = None,
+                      search_params: Optional[Dict] = None) -> List[List[Dict]]:
+        """Retrieve similar memories for a batch of queries.
+        
+        All queries go through a single FAISS search, which lets FAISS use
+        BLAS and its thread pool across the batch, and the matched memories
+        are fetched from SQLite with one query over the union of their IDs.
+        
+        Args:
+            query_embeddings: Matrix of query embeddings, one row per query
+            k: Number of results to return per query
+            memory_type: Optional filter by memory type, or list of types
+            search_params: Optional per-query knobs overriding the storage defaults
             
         Returns:
-            List of retrieved memories
+            One list of retrieved memories per query, nearest first
         """
         try:
+            queries = np.ascontiguousarray(query_embeddings, dtype=np.float32).reshape(-1, self.dimension)
+            self._maybe_refresh()
+            
+            memory_types, sel = self._type_selector(memory_type)
+            if memory_types and sel is None:
+                logger.debug(f"No memories of type {memory_types} to search")
+                return [[] for _ in range(len(queries))]
+            
             # Search in FAISS
-            distances, indices = self.index.search(
-                np.array([query_embedding], dtype=np.float32), k
-            )
+            distances, indices = self._search(queries, k, {**self.search_params, **(search_params or {})}, sel)
             
-            # Check if we have any results
-            if len(indices[0]) == 0 or indices[0][0] == -1:
+            # Get memory IDs (FAISS pads missing results with -1)
+            memory_ids = np.unique(indices[indices >= 0]).tolist()
+            if not memory_ids:
                 logger.debug("No memories found in search")
+                return [[] for _ in range(len(queries))]
+            
+            rows = self._fetch_rows(self.conn, memory_ids)
+            
+            # Last accessed timestamps are written behind, in batches
+            self.access_tracker.record(memory_ids)
+            
+            # Format results per query, in distance order
+            results = []
+            for query_distances, query_ids in zip(distances, indices):
+                memories = []
+                for distance, memory_id in zip(query_distances, query_ids):
+                    row = rows.get(int(memory_id))
+                    if row is None:
+                        continue
+                    memory = {**self._row_to_dict(row), "distance": float(distance)}
+                    if self.metric != "l2":
+                        memory["similarity"] = self._from_distance(float(distance))
+                    memories.append(memory)
+                results.append(memories)
+            
+            logger.debug(f"Retrieved {len(memory_ids)} memories for {len(queries)} queries")
+            return results
+        except Exception as e:
+            logger.error("Error retrieving memories", exc_info=e)
+            raise
+    
+    def search_text(self, query: str, k: int = 5,
+                    memory_type: Optional[Union[str, Sequence[str]]] = None) -> List[Dict]:
+        """Retrieve memories whose content matches the query's words, ranked by BM25.
+        
+        This is the lexical fast path: it needs no query embedding, and it
+        finds exact terms such as names, product codes and error strings
+        that embeddings tend to blur.
+        
+        Args:
+            query: Query text
+            k: Number of results to return
+            memory_type: Optional filter by memory type, or list of types
+            
+        Returns:
+            List of retrieved memories, best match first, each with its "bm25"
+            score (lower is better)
+        """
+        return self.retrieve_hybrid(query, None, k=k, memory_type=memory_type)
+    
+    def retrieve_hybrid(self, query_text: str, query_embedding: Optional[np.ndarray] = None,
+                        k: int = 5, memory_type: Optional[Union[str, Sequence[str]]] = None,
+                        search_params: Optional[Dict] = None, candidates: Optional[int] = None,
+                        rrf_k: int = RRF_K) -> List[Dict]:
+        """Retrieve memories by fusing BM25 and vector rankings.
+        
+        The top candidates of a full-text search and of a FAISS search are
+        combined with reciprocal-rank fusion, so a memory ranked well by
+        either one surfaces. Without a query embedding only the full-text
+        ranking is used.
+        
+        Args:
+            query_text: Query text for the full-text search
+            query_embedding: Optional query vector embedding for the vector search
+            k: Number of results to return
+            memory_type: Optional filter by memory type, or list of types
+            search_params: Optional per-query knobs overriding the storage defaults
+            candidates: Candidates taken from each ranking (default: max(4 * k, 20))
+            rrf_k: Rank offset of the fusion
+            
+        Returns:
+            List of retrieved memories, best first, each with its "rrf_score" and
+            the "bm25" score and "distance" of the rankings it appeared in
+        """
+        try:
+            candidates = candidates or max(4 * k, 20)
+            self._maybe_refresh()
+            memory_types, sel = self._type_selector(memory_type)
+            if memory_types and sel is None:
+                logger.debug(f"No memories of type {memory_types} to search")
+                return []
+            
+            lexical = self._lexical_search(query_text, candidates, memory_types)
+            rankings = [[memory_id for memory_id, _ in lexical]]
+            vector = []
+            if query_embedding is not None:
+                query = np.asarray(query_embedding, dtype=np.float32).reshape(1, self.dimension)
+                distances, indices = self._search(
+                    query, candidates, {**self.search_params, **(search_params or {})}, sel
+                )
+                vector = [(int(i), float(d)) for d, i in zip(distances[0], indices[0]) if i >= 0]
+                rankings.append([memory_id for memory_id, _ in vector])
+            
+            fused = reciprocal_rank_fusion(rankings, rrf_k)[:k]
+            if not fused:
+                logger.debug("No memories found in hybrid search")
                 return []
+            rows = self._fetch_rows(self.conn, [memory_id for memory_id, _ in fused])
+            
+            bm25, vector = dict(lexical), dict(vector)
+            results = []
+            for memory_id, score in fused:
+                row = rows.get(memory_id)
+                if row is None:
+                    continue
+                memory = self._row_to_dict(row)
+                memory["rrf_score"] = score
+                if memory_id in bm25:
+                    memory["bm25"] = bm25[memory_id]
+                if memory_id in vector:
+                    memory["distance"] = vector[memory_id]
+                results.append(memory)
+            
+            self.access_tracker.record([memory["id"] for memory in results])
+            logger.debug(f"Retrieved {len(results)} memories by hybrid search")
+            return results
+        except Exception as e:
+            logger.error("Error in hybrid memory retrieval", exc_info=e)
+            raise
+    
+    def _type_selector(self, memory_type: Optional[Union[str, Sequence[str]]]
+                       ) -> Tuple[Optional[List[str]], Optional[faiss.IDSelector]]:
+        """Normalize a type filter and build its FAISS selector.
+        
+        Returns:
+            The list of types (None when unfiltered) and their selector, which
+            is None when unfiltered or when no indexed memory has those types
+        """
+        if not memory_type:
+            return None, None
+        memory_types = [memory_type] if isinstance(memory_type, str) else list(memory_type)
+        return memory_types, self.type_filter.selector(memory_types)
+    
+    def _lexical_search(self, query: str, n: int,
+                        memory_types: Optional[List[str]] = None) -> List[Tuple[int, float]]:
+        """Run a BM25-ranked full-text search.
+        
+        Args:
+            query: Query text
+            n: Maximum number of matches
+            memory_types: Optional types to keep
             
-            # Get memory IDs
-            memory_ids = [self.vector_ids[i] for i in indices[0]]
+        Returns:
+            (memory ID, bm25 score) pairs, best (lowest score) first
+        """
+        match = fts_query(query)
+        if match is None:
+            return []
+        type_clause = ""
+        params: List = [match]
+        if memory_types:
+            type_clause = "AND m.type IN ({})".format(','.join('?' * len(memory_types)))
+            params.extend(memory_types)
+        cursor = self.conn.execute(f"""
+            SELECT m.id, bm25(memories_fts) AS score
+            FROM memories_fts
+            JOIN memories m ON m.id = memories_fts.rowid
+            WHERE memories_fts MATCH ? {type_clause}
+            ORDER BY score
+            LIMIT ?
+        """, [*params, n])
+        return [(row[0], row[1]) for row in cursor.fetchall()]
+    
+    @staticmethod
+    def _row_to_dict(row: Tuple) -> Dict:
+        """Format an (id, content, metadata, type, importance, last_accessed) row."""
+        return {
+            "id": row[0],
+            "content": row[1],
+            "metadata": json.loads(row[2]),
+            "type": row[3],
+            "importance": row[4],
+            "last_accessed": row[5]
+        }
+    
+    def _search(self, queries: np.ndarray, k: int, params: Dict,
+                sel: Optional[faiss.IDSelector]) -> Tuple[np.ndarray, np.ndarray]:
+        """Search every tier and merge the results into the k nearest per query.
+        
+        Args:
+            queries: Matrix of query embeddings
+            k: Number of results per query
+            params: Search-time knobs, applied to each tier where they fit
+            sel: Optional selector restricting the search to some memory IDs
             
-            # Retrieve from SQLite
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+        Returns:
+            Distances (see _to_distance) and memory IDs, shaped (len(queries), k),
+            nearest first and padded with -1 IDs
+        """
+        with self._index_lock:
+            tiers = [self.index] if self.hot_index is None else [self.hot_index, self.index]
+            queries = self._normalized(queries)
+            found = [
+                tier.search(queries, k, params=search_parameters(tier, params, sel=sel))
+                for tier in tiers if tier.ntotal
+            ]
+        if not found:
+            return np.full((len(queries), k), np.inf, dtype=np.float32), np.full((len(queries), k), -1, dtype=np.int64)
+        
+        distances = self._to_distance(np.hstack([d for d, _ in found]))
+        indices = np.hstack([i for _, i in found])
+        distances[indices < 0] = np.inf
+        if len(found) == 1:
+            return distances, indices
+        order = np.argsort(distances, axis=1, kind="stable")[:, :k]
+        return np.take_along_axis(distances, order, axis=1), np.take_along_axis(indices, order, axis=1)
+    
+    def _normalized(self, embeddings: np.ndarray) -> np.ndarray:
+        """L2-normalize a float32 matrix in one vectorized pass when the metric is cosine."""
+        if self.metric != "cosine":
+            return embeddings
+        embeddings = np.array(embeddings, dtype=np.float32, order="C")
+        faiss.normalize_L2(embeddings)
+        return embeddings
+    
+    def _to_distance(self, scores: np.ndarray) -> np.ndarray:
+        """Convert raw FAISS scores into distances, where lower is nearer for every metric.
+        
+        Squared L2 is kept as is, inner products are negated and cosine
+        similarities become cosine distances (1 - similarity, in [0, 2]).
+        """
+        if self.metric == "ip":
+            return -scores
+        if self.metric == "cosine":
+            return 1.0 - scores
+        return scores
+    
+    def _from_distance(self, distance: float) -> float:
+        """Inverse of _to_distance for one value."""
+        if self.metric == "ip":
+            return -distance
+        if self.metric == "cosine":
+            return 1.0 - distance
+        return distance
+    
+    # SQLite builds before 3.32 cap a statement at 999 bound parameters
+    _MAX_SQL_PARAMS = 900
+    
+    @classmethod
+    def _chunks(cls, values: List) -> List[List]:
+        """Split values into chunks that fit in one SQL statement."""
+        return [values[i:i + cls._MAX_SQL_PARAMS] for i in range(0, len(values), cls._MAX_SQL_PARAMS)]
+    
+    def _fetch_rows(self, conn: sqlite3.Connection, memory_ids: List[int],
+                    include_compressed: bool = False) -> Dict[int, Tuple]:
+        """Fetch memory rows by ID.
+        
+        Vectors of memories compressed by another process stay in the index
+        until the next refresh, so compressed rows are left out by default.
+        
+        Args:
+            conn: Connection to query on
+            memory_ids: IDs of the memories to fetch
+            include_compressed: Also return rows that have been compressed
             
-            query = """
+        Returns:
+            Mapping of memory ID to its (id, content, metadata, type, importance,
+            last_accessed) row
+        """
+        active = "" if include_compressed else "AND content != '[COMPRESSED]'"
+        rows = {}
+        for chunk in self._chunks(memory_ids):
+            cursor = conn.execute("""
                 SELECT id, content, metadata, type, importance, last_accessed
                 FROM memories
-                WHERE id IN ({})
-            """.format(','.join('?' * len(memory_ids)))
+                WHERE id IN ({}) {}
+            """.format(','.join('?' * len(chunk)), active), chunk)
+            rows.update((row[0], row) for row in cursor.fetchall())
+        return rows
+    
+    def compress(self, threshold: float = 0.8, batch_size: int = 1000,
+                 dry_run: bool = False,
+                 progress: Optional[Callable[[int, int], None]] = None,
+                 dedup_radius: Optional[float] = None) -> Dict[str, int]:
+        """Compress memories by removing redundant or low-importance ones.
+        
+        Candidates are processed in ID order, batch_size at a time. Each
+        batch is one short transaction of set-based statements, so memory
+        use stays bounded and the write lock is released between batches.
+        With half_life_days set, the threshold applies to the decayed
+        importance rather than the stored value.
+        
+        Args:
+            threshold: Importance threshold for compression
+            batch_size: Number of memories compressed per transaction
+            dry_run: Only count the memories that would be compressed
+            progress: Optional callback receiving (compressed so far, total)
+            dedup_radius: If set, first merge near-duplicates within this
+                distance (see merge_duplicates)
+            
+        Returns:
+            Counts of compressed memories by reason, plus the total
+        """
+        try:
+            # Merging runs first so summed importance can keep a cluster alive
+            merged = 0
+            if dedup_radius is not None:
+                merged = self.merge_duplicates(dedup_radius, dry_run=dry_run)
+            
+            # The inactivity and decay rules need every buffered access on disk first
+            self.access_tracker.flush()
+            importance = self._importance_sql()
+            
+            total, low_importance = self.conn.execute("""
+                SELECT COUNT(*), COALESCE(SUM({0} < ?), 0)
+                FROM memories
+                WHERE content != '[COMPRESSED]'
+                  AND ({0} < ? OR last_accessed < datetime('now', '-30 days'))
+            """.format(importance), (threshold, threshold)).fetchone()
+            counts = {"low_importance": low_importance, "inactive": total - low_importance, "total": total}
+            if dedup_radius is not None:
+                counts["merged"] = merged
+                counts["total"] += merged
+            if dry_run or total == 0:
+                logger.info(f"Found {total} memories to compress" + (" (dry run)" if dry_run else ""))
+                return counts
+            
+            compressed_ids = []
+            last_id = 0
+            while True:
+                with self._connections.transaction() as conn:
+                    batch = [row[0] for row in conn.execute("""
+                        SELECT id
+                        FROM memories
+                        WHERE id > ?
+                          AND content != '[COMPRESSED]'
+                          AND ({} < ? OR last_accessed < datetime('now', '-30 days'))
+                        ORDER BY id
+                        LIMIT ?
+                    """.format(importance), (last_id, threshold, batch_size))]
+                    if not batch:
+                        break
+                    placeholders = ','.join('?' * len(batch))
+                    
+                    # Store compression records
+                    conn.execute("""
+                        INSERT INTO compression_history (memory_id, compression_type)
+                        SELECT id, CASE WHEN {} < ? THEN 'low_importance' ELSE 'inactive' END
+                        FROM memories
+                        WHERE id IN ({})
+                    """.format(importance, placeholders), [threshold, *batch])
+                    
+                    # Mark as compressed in SQLite
+                    conn.execute("""
+                        UPDATE memories
+                        SET content = '[COMPRESSED]',
+                            embedding = NULL,
+                            embedding_offset = NULL
+                        WHERE id IN ({})
+                    """.format(placeholders), batch)
+                
+                compressed_ids.extend(batch)
+                last_id = batch[-1]
+                if progress:
+                    progress(len(compressed_ids), total)
             
-            if memory_type:
-                query += " AND type = ?"
-                memory_ids.append(memory_type)
+            # Remove from FAISS in a single batch
+            self._remove_committed(compressed_ids)
+            
+            if self.persist_index:
+                self.save_index()
+            logger.info(f"Compressed {len(compressed_ids)} memories")
+            return counts
+        except Exception as e:
+            logger.error("Error compressing memories", exc_info=e)
+            raise
+    
+    def _importance_sql(self) -> str:
+        """SQL expression for a memory's importance, decayed when half-lives are configured.
+        
+        Without decay this is the bare column, so the partial importance
+        index still serves compress().
+        """
+        if self.decay.enabled:
+            return f"{SQL_FUNCTION}(importance, type, last_accessed)"
+        return "importance"
+    
+    def sweep_retention(self, batch_size: Optional[int] = None) -> Dict[str, int]:
+        """Delete memories older than their type's retention period.
+        
+        Unlike compress(), this removes the rows. Each batch is one short
+        transaction that records an "expired" entry in compression_history
+        (so other processes drop the vectors on refresh) and deletes the
+        rows; the vectors are then removed from FAISS in one batch, and
+        freed pages are returned to the filesystem with incremental vacuum.
+        Arena slots of deleted memories are reclaimed by compact_arena().
+        
+        Args:
+            batch_size: Memories deleted per transaction (default: retention_batch_size)
             
-            cursor.execute(query, memory_ids)
-            results = cursor.fetchall()
+        Returns:
+            Number of memories deleted per type
+        """
+        batch_size = batch_size or self.retention_batch_size
+        try:
+            deleted: Dict[str, int] = {}
+            deleted_ids = []
+            for memory_type, days in self.retention_days.items():
+                if days is None:
+                    continue
+                deleted[memory_type] = 0
+                while True:
+                    with self._connections.transaction() as conn:
+                        batch = [row[0] for row in conn.execute("""
+                            SELECT id
+                            FROM memories
+                            WHERE type = ? AND created_at < datetime('now', ?)
+                            ORDER BY created_at
+                            LIMIT ?
+                        """, (memory_type, f"-{days} days", batch_size))]
+                        if not batch:
+                            break
+                        conn.executemany("""
+                            INSERT INTO compression_history (memory_id, compression_type)
+                            VALUES (?, 'expired')
+                        """, ((memory_id,) for memory_id in batch))
+                        conn.execute("DELETE FROM memories WHERE id IN ({})".format(
+                            ','.join('?' * len(batch))), batch)
+                    deleted[memory_type] += len(batch)
+                    deleted_ids.extend(batch)
             
-            # Update last accessed timestamp
-            cursor.execute("""
-                UPDATE memories
-                SET last_accessed = CURRENT_TIMESTAMP
-                WHERE id IN ({})
-            """.format(','.join('?' * len(memory_ids))), memory_ids)
+            if deleted_ids:
+                self._remove_committed(deleted_ids)
+                if self.persist_index:
+                    self.save_index()
+                self.vacuum()
+                logger.info(f"Deleted {len(deleted_ids)} expired memories: {deleted}")
+            return deleted
+        except Exception as e:
+            logger.error("Error sweeping expired memories", exc_info=e)
+            raise
+    
+    def vacuum(self, pages_per_step: int = 1024) -> int:
+        """Return free database pages to the filesystem.
+        
+        Databases using incremental auto-vacuum (the default for new ones)
+        are shrunk a few pages per statement, so the write lock is never held
+        for long. Older databases need a one-time full VACUUM, which this
+        runs instead only when asked with pages_per_step=0.
+        
+        Args:
+            pages_per_step: Pages freed per incremental step, or 0 to convert the
+                database to incremental auto-vacuum with a full VACUUM
             
+        Returns:
+            Number of pages freed
+        """
+        conn = self.conn
+        before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        if pages_per_step == 0:
             conn.commit()
-            conn.close()
-            
-            # Format results
-            memories = []
-            for row in results:
-                memories.append({
-                    "id": row[0],
-                    "content": row[1],
-                    "metadata": json.loads(row[2]),
-                    "type": row[3],
-                    "importance": row[4],
-                    "last_accessed": row[5]
-                })
-            
-            logger.debug(f"Retrieved {len(memories)} memories")
-            return memories
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+        elif conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            logger.debug("Database does not use incremental auto-vacuum; run vacuum(0) once to convert it")
+            return 0
+        else:
+            remaining = before
+            while remaining:
+                conn.execute(f"PRAGMA incremental_vacuum({int(pages_per_step)})").fetchall()
+                left = conn.execute("PRAGMA freelist_count").fetchone()[0]
+                if left >= remaining:
+                    break
+                remaining = left
+        freed = before - conn.execute("PRAGMA freelist_count").fetchone()[0]
+        logger.debug(f"Vacuumed {freed} free pages")
+        return freed
+    
+    # Scalar columns written by export_memories, in row order
+    _EXPORT_COLUMNS = ("content", "metadata", "type", "importance", "created_at",
+                       "last_accessed", "access_count")
+    
+    def export_memories(self, target: Union[str, BinaryIO], chunk_size: int = 1000) -> int:
+        """Stream every live memory to a columnar export file.
+        
+        Memories are read chunk_size at a time in ID order and each chunk is
+        written as JSON columns plus a raw float32 embedding matrix (see
+        transfer.ExportWriter), so memory use does not grow with the store.
+        
+        Args:
+            target: File path or binary file object to write to
+            chunk_size: Memories per chunk
+            
+        Returns:
+            Number of memories exported
+        """
+        try:
+            with open_stream(target, "wb") as f:
+                writer = ExportWriter(f, self.dimension)
+                last_id = 0
+                while True:
+                    rows = self.conn.execute("""
+                        SELECT id, embedding, type, embedding_offset,
+                               content, metadata, importance, created_at, last_accessed, access_count
+                        FROM memories
+                        WHERE id > ?
+                          AND content != '[COMPRESSED]'
+                          AND (embedding IS NOT NULL OR embedding_offset IS NOT NULL)
+                        ORDER BY id
+                        LIMIT ?
+                    """, (last_id, chunk_size)).fetchall()
+                    if not rows:
+                        break
+                    last_id = rows[-1][0]
+                    _, embeddings, rows = self._decode_rows(rows, normalize=False)
+                    writer.write_chunk({
+                        "content": [row[4] for row in rows],
+                        "metadata": [json.loads(row[5] or "{}") for row in rows],
+                        "type": [row[2] for row in rows],
+                        "importance": [row[6] for row in rows],
+                        "created_at": [row[7] for row in rows],
+                        "last_accessed": [row[8] for row in rows],
+                        "access_count": [row[9] for row in rows]
+                    }, embeddings)
+                writer.close()
+            
+            logger.info(f"Exported {writer.rows} memories")
+            return writer.rows
         except Exception as e:
-            logger.error("Error retrieving memories", exc_info=e)
+            logger.error("Error exporting memories", exc_info=e)
             raise
     
-    def compress(self, threshold: float = 0.8) -> None:
-        """Compress memories by removing redundant or low-importance ones.
+    def import_memories(self, source: Union[str, BinaryIO]) -> int:
+        """Load memories from an export file written by export_memories.
+        
+        Each chunk is bulk-inserted in its own transaction, keeping its
+        timestamps and access counts, and the FAISS index is rebuilt once
+        at the end instead of growing chunk by chunk. Imported memories get
+        new IDs. Exports written by Neuromind.export_memories are accepted
+        too (their "timestamp" column becomes created_at).
         
         Args:
-            threshold: Importance threshold for compression
+            source: File path or binary file object to read from
+            
+        Returns:
+            Number of memories imported
         """
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            imported = 0
+            with open_stream(source, "rb") as f:
+                for columns, embeddings in read_export(f, self.dimension):
+                    n = len(embeddings)
+                    created = columns.get("created_at") or columns.get("timestamp") or [None] * n
+                    accessed = columns.get("last_accessed") or created
+                    with self._write_lock, self._connections.transaction() as conn:
+                        blobs, offsets = self._encode_embeddings(embeddings)
+                        conn.executemany("""
+                            INSERT INTO memories (content, embedding, embedding_offset, metadata, type,
+                                                  importance, created_at, last_accessed, access_count)
+                            VALUES (?, ?, ?, ?, ?, ?,
+                                    COALESCE(?, CURRENT_TIMESTAMP), COALESCE(?, CURRENT_TIMESTAMP), ?)
+                        """, zip(
+                            columns["content"], blobs, offsets,
+                            map(json.dumps, columns.get("metadata") or [{}] * n),
+                            columns.get("type") or ["general"] * n,
+                            columns.get("importance") or [1.0] * n,
+                            created, accessed,
+                            columns.get("access_count") or [0] * n
+                        ))
+                    imported += n
             
-            # Get memories to compress
-            cursor.execute("""
-                SELECT id, embedding, importance
-                FROM memories
-                WHERE importance < ? OR last_accessed < datetime('now', '-30 days')
-            """, (threshold,))
+            if imported:
+                self._rebuild_index()
+                self.invalidate_cache()
+                if self.persist_index:
+                    self.save_index()
+            logger.info(f"Imported {imported} memories")
+            return imported
+        except Exception as e:
+            logger.error("Error importing memories", exc_info=e)
+            raise
+    
+    def merge_duplicates(self, radius: float, memory_type: Optional[str] = None,
+                         batch_size: int = 1024, dry_run: bool = False) -> int:
+        """Merge clusters of near-duplicate memories into one representative each.
+        
+        Memories are compared only with others of the same type. Each type's
+        vectors go into a temporary flat index and are range-searched in
+        batches. Clusters are formed greedily in order of importance, so
+        every duplicate lies within radius of its representative. The
+        representative gains the summed importance of its cluster and the
+        union of its metadata (its own keys win, plus a "merged_ids" list).
+        The other members are compressed and recorded as "merged".
+        
+        Args:
+            radius: Distance threshold, in the units of retrieval's "distance"
+                (squared L2, negated inner product or cosine distance)
+            memory_type: Only deduplicate this type (default: every type)
+            batch_size: Number of query vectors per range search
+            dry_run: Only count the memories that would be merged away
+            
+        Returns:
+            Number of memories merged into a representative
+        """
+        try:
+            if memory_type is None:
+                memory_types = [row[0] for row in self.conn.execute("""
+                    SELECT DISTINCT type
+                    FROM memories
+                    WHERE embedding IS NOT NULL OR embedding_offset IS NOT NULL
+                """)]
+            else:
+                memory_types = [memory_type]
             
-            memories_to_compress = cursor.fetchall()
+            merged_ids = []
+            for current_type in memory_types:
+                clusters = self._duplicate_clusters(current_type, radius, batch_size)
+                merged_ids.extend(member for cluster in clusters for member in cluster[1:])
+                if not dry_run and clusters:
+                    self._merge_clusters(clusters)
             
-            for memory_id, embedding_bytes, importance in memories_to_compress:
-                # Store compression record
-                cursor.execute("""
-                    INSERT INTO compression_history (memory_id, compression_type)
-                    VALUES (?, ?)
-                """, (memory_id, "low_importance" if importance < threshold else "inactive"))
-                
-                # Remove from FAISS
-                if memory_id in self.vector_ids:
-                    idx = self.vector_ids.index(memory_id)
-                    self.vector_ids.pop(idx)
-                    # Note: FAISS doesn't support direct removal, so we'll rebuild the index
-                    self._rebuild_index()
+            if not dry_run and merged_ids:
+                self._remove_committed(merged_ids)
+                if self.persist_index:
+                    self.save_index()
+            logger.info(f"Merged {len(merged_ids)} near-duplicate memories"
+                        + (" (dry run)" if dry_run else ""))
+            return len(merged_ids)
+        except Exception as e:
+            logger.error("Error merging duplicate memories", exc_info=e)
+            raise
+    
+    def _duplicate_clusters(self, memory_type: Optional[str], radius: float,
+                            batch_size: int) -> List[List[int]]:
+        """Group one type's live memories into near-duplicate clusters.
+        
+        Returns:
+            Clusters of memory IDs with at least two members, representative first
+        """
+        rows = self.conn.execute("""
+            SELECT id, embedding, type, embedding_offset, importance
+            FROM memories
+            WHERE type IS ? AND (embedding IS NOT NULL OR embedding_offset IS NOT NULL)
+            ORDER BY importance DESC, id
+        """, (memory_type,)).fetchall()
+        if len(rows) < 2:
+            return []
+        
+        ids, embeddings, _ = self._decode_rows(rows)
+        index = faiss.IndexFlat(self.dimension, METRICS[self.metric])
+        index.add(embeddings)
+        # Range search keeps scores beyond the threshold: below it for L2, above it otherwise
+        threshold = self._from_distance(radius)
+        
+        # Greedy leader clustering in importance order: each unassigned
+        # memory claims its unassigned neighbours within the radius
+        assigned = np.zeros(len(ids), dtype=bool)
+        clusters = []
+        for start in range(0, len(ids), batch_size):
+            lims, _, neighbours = index.range_search(embeddings[start:start + batch_size], threshold)
+            for offset in range(len(lims) - 1):
+                leader = start + offset
+                if assigned[leader]:
+                    continue
+                assigned[leader] = True
+                members = neighbours[lims[offset]:lims[offset + 1]]
+                members = members[~assigned[members]]
+                if len(members):
+                    assigned[members] = True
+                    clusters.append([int(ids[leader])] + sorted(ids[members].tolist()))
+        return clusters
+    
+    def _merge_clusters(self, clusters: List[List[int]]) -> None:
+        """Fold each cluster into its representative and compress the rest.
+        
+        Args:
+            clusters: Clusters of memory IDs, representative first
+        """
+        for start in range(0, len(clusters), self._MAX_SQL_PARAMS):
+            batch = clusters[start:start + self._MAX_SQL_PARAMS]
+            with self._connections.transaction() as conn:
+                rows = self._fetch_rows(conn, [memory_id for cluster in batch for memory_id in cluster],
+                                        include_compressed=True)
+                updates = []
+                for cluster in batch:
+                    metadata = {}
+                    for memory_id in reversed(cluster):
+                        metadata.update(json.loads(rows[memory_id][2] or "{}"))
+                    metadata["merged_ids"] = metadata.get("merged_ids", []) + cluster[1:]
+                    importance = sum(rows[memory_id][4] or 0.0 for memory_id in cluster)
+                    updates.append((json.dumps(metadata), importance, cluster[0]))
                 
-                # Mark as compressed in SQLite
-                cursor.execute("""
+                conn.executemany(
+                    "UPDATE memories SET metadata = ?, importance = ? WHERE id = ?", updates
+                )
+                duplicates = [(memory_id,) for cluster in batch for memory_id in cluster[1:]]
+                conn.executemany("""
+                    INSERT INTO compression_history (memory_id, compression_type)
+                    VALUES (?, 'merged')
+                """, duplicates)
+                conn.executemany("""
                     UPDATE memories
                     SET content = '[COMPRESSED]',
-                        embedding = NULL
+                        embedding = NULL,
+                        embedding_offset = NULL
                     WHERE id = ?
-                """, (memory_id,))
+                """, duplicates)
+    
+    def _rebuild_index(self) -> None:
+        """Rebuild FAISS index from every active embedding in SQLite.
+        
+        The index type is resolved from the configured spec, and indexes
+        that need training are trained on a random sample of the stored
+        embeddings. Until there are enough embeddings to train on, an exact
+        flat index is used instead.
+        """
+        try:
+            with self._index_lock:
+                # Read the history first so compressions racing the scan replay later
+                history_seen = self._history_watermark()
+                cursor = self.conn.execute("""
+                    SELECT id, embedding, type, embedding_offset
+                    FROM memories
+                    WHERE embedding IS NOT NULL OR embedding_offset IS NOT NULL
+                    ORDER BY id
+                """)
+                rows = cursor.fetchall()
+                if rows:
+                    self._watermark = max(self._watermark, rows[-1][0])
+                ids, embeddings, rows = self._decode_rows(rows)
+                self._history_seen = max(self._history_seen, history_seen)
+                self._own_ids = {i for i in self._own_ids if i > self._watermark}
+                memory_types = [row[2] for row in rows]
+                self.type_filter.clear()
+                if rows:
+                    self.type_filter.add(ids, memory_types)
+                
+                # Memories in the hot tier stay out of the cold index
+                if self.hot_index is not None and self.hot_index.ntotal:
+                    cold = ~np.isin(ids, faiss.vector_to_array(self.hot_index.id_map))
+                    ids, embeddings = ids[cold], embeddings[cold]
+                
+                spec = self._resolve_index_spec(len(ids))
+                index = build_index(spec, self.dimension, self.metric)
+                if not index.is_trained:
+                    if len(ids) >= min_training_size(index):
+                        index.train(self._training_sample(embeddings))
+                    else:
+                        spec = DEFAULT_INDEX_SPEC
+                        index = build_index(spec, self.dimension, self.metric)
+                if len(ids):
+                    index.add_with_ids(embeddings, ids)
+                
+                self.index = index
+                self.active_spec = spec
             
-            conn.commit()
-            conn.close()
-            logger.info(f"Compressed {len(memories_to_compress)} memories")
+            logger.debug(f"Rebuilt {spec} FAISS index with {index.ntotal} vectors")
         except Exception as e:
-            logger.error("Error compressing memories", exc_info=e)
+            logger.error("Error rebuilding index", exc_info=e)
             raise
     
-    def _rebuild_index(self) -> None:
-        """Rebuild FAISS index after memory removal."""
+    def _resolve_index_spec(self, n_vectors: int) -> str:
+        """Index spec to use for a corpus of the given size."""
+        if self.index_spec == AUTO_INDEX_SPEC:
+            return choose_index_spec(n_vectors, self.dimension)
+        return self.index_spec
+    
+    def _training_sample(self, embeddings: np.ndarray) -> np.ndarray:
+        """Random subset of embeddings, bounded by train_sample_size."""
+        if len(embeddings) <= self.train_sample_size:
+            return embeddings
+        rows = np.random.default_rng().choice(len(embeddings), self.train_sample_size, replace=False)
+        return embeddings[np.sort(rows)]
+    
+    def _maybe_upgrade_index(self) -> None:
+        """Rebuild into the configured index type once the corpus allows it.
+        
+        Called after vectors are added. This trains the configured index as
+        soon as enough vectors exist and, for the "auto" spec, moves to a
+        larger index family when the corpus crosses a size threshold.
+        """
+        target = self._resolve_index_spec(self.index.ntotal)
+        if target == self.active_spec:
+            return
+        
+        if target not in self._training_sizes:
+            self._training_sizes[target] = min_training_size(build_index(target, self.dimension, self.metric))
+        if self.index.ntotal >= self._training_sizes[target]:
+            logger.info(f"Switching FAISS index from {self.active_spec} to {target}")
+            self._rebuild_index()
+    
+    def _encode_embeddings(self, embeddings: np.ndarray) -> Tuple[List, List]:
+        """Prepare embeddings for the embedding and embedding_offset columns.
+        
+        Args:
+            embeddings: Matrix with one embedding per row
+            
+        Returns:
+            Tuple of BLOBs and arena slots, one of which is all None
+        """
+        if self.embedding_storage == "arena":
+            return [None] * len(embeddings), self.arena.append(embeddings).tolist()
+        return self.codec.encode_many(embeddings), [None] * len(embeddings)
+    
+    def _decode_rows(self, rows: List[Tuple],
+                     normalize: bool = True) -> Tuple[np.ndarray, np.ndarray, List[Tuple]]:
+        """Decode (id, embedding, type, embedding_offset) rows into IDs and a matrix.
+        
+        Rows whose embedding lives in the arena are read from its memory map;
+        the rest are decoded from their BLOBs. Rows with a corrupt BLOB are
+        logged and skipped rather than failing the whole batch. With the
+        cosine metric the vectors are returned L2-normalized, ready to be indexed.
+        
+        Args:
+            rows: SQLite rows of memory ID, encoded embedding, type and arena slot
+            normalize: Whether to normalize for the cosine metric (False returns
+                the embeddings as stored)
+            
+        Returns:
+            Tuple of int64 memory IDs, a float32 matrix with one row per ID and
+            the decoded rows themselves, aligned with the IDs
+        """
+        embeddings = np.empty((len(rows), self.dimension), dtype=np.float32)
+        
+        blob_rows = [i for i, row in enumerate(rows) if row[1] is not None]
+        bad: List[int] = []
+        if blob_rows:
+            decoded, bad = EmbeddingCodec.decode_valid([rows[i][1] for i in blob_rows], self.dimension)
+            bad = [blob_rows[i] for i in bad]
+            embeddings[np.setdiff1d(blob_rows, bad)] = decoded
+        if len(blob_rows) < len(rows):
+            arena_rows = [i for i, row in enumerate(rows) if row[1] is None]
+            embeddings[arena_rows] = self.arena.read([rows[i][3] for i in arena_rows])
+        if bad:
+            logger.warning(f"Skipping {len(bad)} memories with undecodable embeddings: "
+                           f"{[rows[i][0] for i in bad]}")
+            embeddings = np.delete(embeddings, bad, axis=0)
+            bad_rows = set(bad)
+            rows = [row for i, row in enumerate(rows) if i not in bad_rows]
+        
+        ids = np.array([row[0] for row in rows], dtype=np.int64)
+        if normalize and self.metric == "cosine":
+            faiss.normalize_L2(embeddings)
+        return ids, embeddings, rows
+    
+    def _add_rows(self, rows: List[Tuple]) -> None:
+        """Decode (id, embedding, type, embedding_offset) rows and add them to the index.
+        
+        Args:
+            rows: SQLite rows of memory ID, encoded embedding, type and arena slot
+        """
+        if not rows:
+            return
+        
+        ids, embeddings, rows = self._decode_rows(rows)
+        with self._index_lock:
+            self._writable_index().add_with_ids(embeddings, ids)
+            self.type_filter.add(ids, [row[2] for row in rows])
+            self._maybe_upgrade_index()
+        self.invalidate_cache()
+    
+    def _remove_ids(self, memory_ids: List[int]) -> int:
+        """Remove vectors from the index in one batch.
+        
+        Index types without removal support (HNSW) are rebuilt from SQLite
+        once for the whole batch instead.
+        
+        Args:
+            memory_ids: IDs of the memories to remove
+            
+        Returns:
+            Number of vectors removed
+        """
+        if not memory_ids:
+            return 0
+        with self._index_lock:
+            removed = 0
+            if self.hot_index is not None:
+                removed += self.hot_index.remove_ids(np.array(memory_ids, dtype=np.int64))
+            self.type_filter.remove(memory_ids)
+            removed += self._remove_cold(memory_ids)
+        self.invalidate_cache()
+        logger.debug(f"Removed {removed} vectors from FAISS index")
+        return removed
+    
+    def _remove_committed(self, memory_ids: List[int]) -> int:
+        """Remove vectors of rows this process just deleted or compressed.
+        
+        Holds the write lock, like store(), so a rebuild of an index without
+        removal support (HNSW) never runs while a stored memory is indexed
+        but not yet committed: the rebuild would not see the row, yet the
+        watermark has already passed its ID.
+        """
+        with self._write_lock:
+            return self._remove_ids(memory_ids)
+    
+    def _writable_index(self) -> faiss.Index:
+        """The cold (or only) index, ready to be written to.
+        
+        A warm-started IVF snapshot is searched straight from its read-only
+        memory map; its inverted lists are copied into RAM before the first
+        write. Must be called with the index lock held.
+        """
+        if make_writable(self.index):
+            logger.info(f"Copied memory-mapped {self.active_spec} index into RAM for writing")
+        return self.index
+    
+    def _remove_cold(self, memory_ids: List[int]) -> int:
+        """Remove vectors from the cold (or only) index, rebuilding it if it cannot remove."""
+        with self._index_lock:
+            try:
+                return remove_ids(self._writable_index(), memory_ids)
+            except RuntimeError:
+                ntotal = self.index.ntotal
+                self._rebuild_index()
+                return ntotal - self.index.ntotal
+    
+    def rebalance_tiers(self) -> Dict[str, int]:
+        """Move memories between the hot and cold tiers.
+        
+        The hot tier should hold, up to hot_capacity, the most recently
+        accessed memories among those accessed within hot_window_days or at
+        least hot_importance important. Memories that qualify are promoted
+        from the cold index and the rest are demoted to it, with vectors
+        read back from SQLite or the arena. Runs periodically in the
+        background; calling it directly is safe.
+        
+        Returns:
+            Number of memories promoted and demoted
+        """
+        if self.hot_index is None:
+            return {"promoted": 0, "demoted": 0}
         try:
-            # Get all active embeddings from SQLite
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            # Recency is judged on every buffered access, not just flushed ones
+            self.access_tracker.flush()
             
-            cursor.execute("""
-                SELECT id, embedding
-                FROM memories
-                WHERE embedding IS NOT NULL
-            """)
+            # Holding the write lock keeps new memories from being demoted unseen
+            with self._write_lock:
+                desired = np.array([row[0] for row in self.conn.execute("""
+                    SELECT id
+                    FROM memories
+                    WHERE (embedding IS NOT NULL OR embedding_offset IS NOT NULL)
+                      AND (last_accessed >= datetime('now', ?) OR importance >= ?)
+                    ORDER BY last_accessed DESC, id DESC
+                    LIMIT ?
+                """, (f"-{self.hot_window_days} days", self.hot_importance, self.hot_capacity))], dtype=np.int64)
+                
+                with self._index_lock:
+                    current = faiss.vector_to_array(self.hot_index.id_map)
+                    promote = np.setdiff1d(desired, current).tolist()
+                    demote = np.setdiff1d(current, desired).tolist()
+                    
+                    # Add before removing so a cold-index rebuild never loses a vector
+                    if promote:
+                        ids, embeddings = self._load_vectors(promote)
+                        self.hot_index.add_with_ids(embeddings, ids)
+                        self._remove_cold(promote)
+                    if demote:
+                        ids, embeddings = self._load_vectors(demote)
+                        self.hot_index.remove_ids(ids)
+                        self._writable_index().add_with_ids(embeddings, ids)
+                        self._maybe_upgrade_index()
+            
+            logger.debug(f"Rebalanced tiers: promoted {len(promote)}, demoted {len(demote)}, "
+                         f"{self.hot_index.ntotal} hot, {self.index.ntotal} cold")
+            return {"promoted": len(promote), "demoted": len(demote)}
+        except Exception as e:
+            logger.error("Error rebalancing memory tiers", exc_info=e)
+            raise
+    
+    def _load_vectors(self, memory_ids: List[int]) -> Tuple[np.ndarray, np.ndarray]:
+        """Read the stored embeddings of live memories.
+        
+        Args:
+            memory_ids: IDs of the memories to read
             
-            embeddings = []
-            self.vector_ids = []
+        Returns:
+            Tuple of int64 memory IDs and a float32 matrix with one row per ID
+        """
+        rows = []
+        for chunk in self._chunks(memory_ids):
+            rows.extend(self.conn.execute("""
+                SELECT id, embedding, type, embedding_offset
+                FROM memories
+                WHERE id IN ({}) AND (embedding IS NOT NULL OR embedding_offset IS NOT NULL)
+            """.format(','.join('?' * len(chunk))), chunk).fetchall())
+        ids, embeddings, _ = self._decode_rows(rows)
+        return ids, embeddings
+    
+    def _open_arena(self) -> Optional[EmbeddingArena]:
+        """Open the embedding arena recorded in storage_state, creating it if needed.
+        
+        Returns:
+            The arena, or None when embeddings are kept in SQLite and no arena exists
+        """
+        row = self.conn.execute("SELECT value FROM storage_state WHERE key = 'arena_path'").fetchone()
+        if row is None and self.embedding_storage != "arena":
+            return None
+        
+        if row is None:
+            path = f"{self.db_path}.vec.0"
+            with self._connections.transaction() as conn:
+                conn.execute("INSERT INTO storage_state (key, value) VALUES ('arena_path', ?)", (path,))
+        else:
+            path = row[0]
+        return EmbeddingArena(path, self.dimension)
+    
+    def compact_arena(self) -> int:
+        """Reclaim arena slots left behind by compressed memories.
+        
+        Live vectors are copied into a new arena file with a bumped generation
+        suffix. The new slots and file name are committed to SQLite in one
+        transaction before the old file is deleted, so a crash at any point
+        leaves the database pointing at a complete arena. Other processes
+        must not write to the storage while it is compacted.
+        
+        Returns:
+            Number of slots reclaimed
+        """
+        if self.arena is None:
+            return 0
+        try:
+            with self._write_lock:
+                with self._connections.transaction() as conn:
+                    rows = conn.execute("""
+                        SELECT id, embedding_offset
+                        FROM memories
+                        WHERE embedding_offset IS NOT NULL
+                        ORDER BY embedding_offset
+                    """).fetchall()
+                    reclaimed = len(self.arena) - len(rows)
+                    if reclaimed == 0:
+                        return 0
+                    
+                    base, generation = self.arena.path.rsplit(".", 1)
+                    path = f"{base}.{int(generation) + 1}"
+                    compacted = self.arena.compact([row[1] for row in rows], path)
+                    conn.executemany(
+                        "UPDATE memories SET embedding_offset = ? WHERE id = ?",
+                        ((slot, row[0]) for slot, row in enumerate(rows))
+                    )
+                    conn.execute("UPDATE storage_state SET value = ? WHERE key = 'arena_path'", (path,))
+                
+                old = self.arena
+                self.arena = compacted
+                old.close()
+                os.remove(old.path)
+            logger.info(f"Compacted embedding arena, reclaimed {reclaimed} slots")
+            return reclaimed
+        except Exception as e:
+            logger.error("Error compacting embedding arena", exc_info=e)
+            raise
+    
+    def _indexed_ids(self) -> np.ndarray:
+        """Memory IDs currently held by the index, across both tiers."""
+        ids = faiss.vector_to_array(self.index.id_map)
+        if self.hot_index is not None:
+            ids = np.concatenate([ids, faiss.vector_to_array(self.hot_index.id_map)])
+        return ids
+    
+    def _hot_path(self) -> str:
+        """Path of the hot tier's snapshot."""
+        return f"{self.index_path}.hot"
+    
+    def _meta_path(self) -> str:
+        """Path of the snapshot's metadata file."""
+        return f"{self.index_path}.meta.json"
+    
+    def _history_watermark(self) -> int:
+        """Highest compression_history ID, used to detect removals since a snapshot."""
+        row = self.conn.execute("SELECT MAX(id) FROM compression_history").fetchone()
+        return row[0] or 0
+    
+    def save_index(self) -> None:
+        """Write the FAISS index and its rowid watermark to disk.
+        
+        Files are written under temporary names and renamed into place so a
+        crash mid-write never leaves a torn snapshot behind.
+        """
+        try:
+            meta_path = self._meta_path()
+            with self._index_lock:
+                # The catch-up state is saved as is: the highest indexed ID and
+                # the latest compression record can both run ahead of rows and
+                # records written by other processes that are not applied yet
+                meta = {
+                    "dimension": self.dimension,
+                    "index_spec": self.active_spec,
+                    "metric": self.metric,
+                    "ntotal": int(self.index.ntotal),
+                    "hot_ntotal": int(self.hot_index.ntotal) if self.hot_index is not None else 0,
+                    "watermark": self._watermark,
+                    "own_ids": sorted(self._own_ids),
+                    "history_watermark": self._history_seen
+                }
+                faiss.write_index(self.index, f"{self.index_path}.tmp")
+                if self.hot_index is not None:
+                    faiss.write_index(self.hot_index, f"{self._hot_path()}.tmp")
+            with open(f"{meta_path}.tmp", "w") as f:
+                json.dump(meta, f)
             
-            for memory_id, embedding_bytes in cursor.fetchall():
-                embedding = np.frombuffer(embedding_bytes, dtype=np.float32)
-                embeddings.append(embedding)
-                self.vector_ids.append(memory_id)
+            os.replace(f"{self.index_path}.tmp", self.index_path)
+            if self.hot_index is not None:
+                os.replace(f"{self._hot_path()}.tmp", self._hot_path())
+            elif os.path.exists(self._hot_path()):
+                os.remove(self._hot_path())
+            os.replace(f"{meta_path}.tmp", meta_path)
+            logger.debug(f"Saved FAISS index snapshot with {meta['ntotal']} vectors")
+        except Exception as e:
+            logger.error("Error saving index snapshot", exc_info=e)
+            raise
+    
+    def _load_index(self) -> None:
+        """Warm-start the FAISS index from its snapshot, or rebuild it from SQLite.
+        
+        The snapshot is memory-mapped and then caught up by adding only the
+        rows whose ID is above the snapshot's watermark and removing memories
+        compressed since it was taken. A snapshot that is missing or
+        unreadable falls back to a full rebuild.
+        """
+        meta_path = self._meta_path()
+        if not (self.persist_index and os.path.exists(meta_path)):
+            self._rebuild_index()
+            return
+        
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            if meta["dimension"] != self.dimension:
+                raise ValueError(f"Snapshot dimension {meta['dimension']} != {self.dimension}")
+            if meta.get("metric", "l2") != self.metric:
+                raise ValueError(f"Snapshot metric {meta.get('metric', 'l2')} != {self.metric}")
+            snapshot_spec = meta.get("index_spec", DEFAULT_INDEX_SPEC)
+            if self.index_spec not in (AUTO_INDEX_SPEC, snapshot_spec) and snapshot_spec != DEFAULT_INDEX_SPEC:
+                raise ValueError(f"Snapshot index type {snapshot_spec} != {self.index_spec}")
             
-            conn.close()
+            try:
+                index = faiss.read_index(self.index_path, faiss.IO_FLAG_MMAP)
+            except RuntimeError:
+                index = faiss.read_index(self.index_path)
+            if not isinstance(index, faiss.IndexIDMap2):
+                raise ValueError("Snapshot index is not keyed by memory ID")
             
-            # Rebuild index
-            if embeddings:
-                self.index = faiss.IndexFlatL2(self.dimension)
-                self.index.add(np.array(embeddings, dtype=np.float32))
+            # The hot tier is small and searched constantly, so it is read into RAM
+            hot = None
+            if meta.get("hot_ntotal", 0):
+                hot = faiss.read_index(self._hot_path())
+                if hot.ntotal != meta["hot_ntotal"]:
+                    raise ValueError("Hot tier snapshot does not match its metadata")
+        except Exception as e:
+            logger.warning(f"Discarding FAISS index snapshot: {e}")
+            self._rebuild_index()
+            return
+        
+        # The type filter is not part of the snapshot; rebuild it from SQLite
+        own_ids = meta.get("own_ids", [])
+        typed = self.conn.execute("""
+            SELECT id, type
+            FROM memories
+            WHERE id <= ? AND (embedding IS NOT NULL OR embedding_offset IS NOT NULL)
+        """, (meta["watermark"],)).fetchall()
+        for chunk in self._chunks(own_ids):
+            typed += self.conn.execute("""
+                SELECT id, type
+                FROM memories
+                WHERE id IN ({}) AND (embedding IS NOT NULL OR embedding_offset IS NOT NULL)
+            """.format(','.join('?' * len(chunk))), chunk).fetchall()
+        
+        with self._index_lock:
+            self.index = index
+            self.active_spec = snapshot_spec
+            if hot is not None and self.hot_index is not None:
+                self.hot_index = hot
+            elif hot is not None:
+                # Tiering was turned off; fold the hot tier into the single index
+                self._writable_index().add_with_ids(hot.index.reconstruct_n(0, hot.ntotal),
+                                                    faiss.vector_to_array(hot.id_map))
+            self.type_filter.clear()
+            if typed:
+                self.type_filter.add([row[0] for row in typed], [row[1] for row in typed])
             
-            logger.debug("Rebuilt FAISS index")
+            # Catch up with rows written and memories compressed after the snapshot
+            self._watermark = meta["watermark"]
+            self._own_ids = set(own_ids)
+            self._history_seen = meta["history_watermark"]
+            added, removed = self._catch_up()
+            self._maybe_upgrade_index()
+        
+        logger.info(f"Loaded FAISS index snapshot with {meta['ntotal'] + meta.get('hot_ntotal', 0)} vectors, "
+                    f"caught up {added} new and {removed} compressed memories from SQLite")
+    
+    def refresh(self) -> Dict[str, int]:
+        """Pull in memories written and compressed by other processes.
+        
+        Only rows above the highest memory ID already indexed and
+        compression records above the last one applied are read, so a
+        refresh with nothing new costs two primary-key lookups.
+        
+        Returns:
+            Number of memories added to and removed from the index
+        """
+        try:
+            with self._index_lock:
+                added, removed = self._catch_up()
+                self._last_refresh = time.monotonic()
+            if added or removed:
+                logger.debug(f"Refreshed index: {added} added, {removed} removed")
+            return {"added": added, "removed": removed}
         except Exception as e:
-            logger.error("Error rebuilding index", exc_info=e)
-            raise 
\ No newline at end of file
+            logger.error("Error refreshing index", exc_info=e)
+            raise
+    
+    def _maybe_refresh(self) -> None:
+        """Refresh before a search if refresh_interval has elapsed."""
+        if self.refresh_interval is not None and \
+                time.monotonic() - self._last_refresh >= self.refresh_interval:
+            self.refresh()
+    
+    def _catch_up(self) -> Tuple[int, int]:
+        """Index rows above the watermark and apply compression records above the history mark.
+        
+        Returns:
+            Number of vectors added and removed
+        """
+        with self._index_lock:
+            rows = self.conn.execute("""
+                SELECT id, embedding, type, embedding_offset
+                FROM memories
+                WHERE id > ? AND (embedding IS NOT NULL OR embedding_offset IS NOT NULL)
+                ORDER BY id
+            """, (self._watermark,)).fetchall()
+            history = self.conn.execute("""
+                SELECT id, memory_id
+                FROM compression_history
+                WHERE id > ?
+                ORDER BY id
+            """, (self._history_seen,)).fetchall()
+            
+            # Memories this process stored itself are already indexed
+            new_rows = [row for row in rows if row[0] not in self._own_ids]
+            self._add_rows(new_rows)
+            if rows:
+                self._watermark = rows[-1][0]
+                self._own_ids = {i for i in self._own_ids if i > self._watermark}
+            
+            # Only remove what is indexed, so indexes without removal support
+            # are not rebuilt for records this process already applied
+            removed = 0
+            if history:
+                self._history_seen = history[-1][0]
+                compressed = np.array([row[1] for row in history], dtype=np.int64)
+                compressed = compressed[np.isin(compressed, self._indexed_ids())]
+                removed = self._remove_ids(compressed.tolist())
+        return len(new_rows), removed
@@ -0,0 +1,189 @@
+import math
+from typing import Dict, Optional, Sequence
+import faiss
+import numpy as np
+
+AUTO_INDEX_SPEC = "auto"
+"""Index spec that picks an index type from the current corpus size."""
+
+DEFAULT_INDEX_SPEC = "Flat"
+"""Exact brute-force search; the behaviour of the original storage."""
+
+METRICS: Dict[str, int] = {
+    "l2": faiss.METRIC_L2,
+    "ip": faiss.METRIC_INNER_PRODUCT,
+    "cosine": faiss.METRIC_INNER_PRODUCT,  # Inner product over L2-normalized vectors
+}
+"""Supported similarity metrics and the FAISS metric each one searches with."""
+
+# Corpus sizes at which the automatic spec moves to the next index family
+AUTO_FLAT_LIMIT = 50_000
+AUTO_HNSW_LIMIT = 1_000_000
+
+
+def choose_index_spec(n_vectors: int, dimension: int) -> str:
+    """Pick an index spec suited to a corpus size.
+
+    Small corpora stay on exact search, mid-sized ones use HNSW graphs and
+    very large ones use IVF with product quantization to bound memory.
+
+    Args:
+        n_vectors: Number of vectors the index will hold
+        dimension: Dimension of vector embeddings
+
+    Returns:
+        FAISS index factory string
+    """
+    if n_vectors <= AUTO_FLAT_LIMIT:
+        return "Flat"
+    if n_vectors <= AUTO_HNSW_LIMIT:
+        return "HNSW32"
+
+    # Roughly 4 * sqrt(n) lists, rounded to a power of two
+    nlist = 2 ** round(math.log2(4 * math.sqrt(n_vectors)))
+    # Largest sub-quantizer count dividing the dimension, capped at 64 bytes per code
+    m = max(m for m in range(1, min(64, dimension) + 1) if dimension % m == 0)
+    return f"IVF{nlist},PQ{m}"
+
+
+def build_index(spec: str, dimension: int, metric: str = "l2") -> faiss.Index:
+    """Create an empty index from a factory spec, keyed by memory ID.
+
+    Args:
+        spec: FAISS index factory string such as "Flat", "HNSW32" or "IVF4096,PQ64"
+        dimension: Dimension of vector embeddings
+        metric: Similarity metric, one of METRICS
+
+    Returns:
+        IndexIDMap2 wrapping the requested index
+    """
+    return faiss.IndexIDMap2(faiss.index_factory(dimension, spec, METRICS[metric]))
+
+
+def min_training_size(index: faiss.Index) -> int:
+    """Number of vectors needed to train an index without degenerate clusters.
+
+    Args:
+        index: Untrained index as returned by build_index
+
+    Returns:
+        Minimum training set size (0 if the index needs no training)
+    """
+    if index.is_trained:
+        return 0
+
+    inner = faiss.downcast_index(index.index)
+    size = 1
+    ivf = faiss.try_extract_index_ivf(inner)
+    if ivf is not None:
+        size = max(size, 39 * ivf.nlist)
+    if hasattr(inner, "pq"):
+        size = max(size, 39 * (1 << inner.pq.nbits))
+    return size
+
+
+def make_writable(index: faiss.Index) -> bool:
+    """Copy memory-mapped inverted lists into RAM so the index accepts writes.
+
+    Reading an IVF index with IO_FLAG_MMAP maps its inverted lists as
+    read-only OnDiskInvertedLists. Other index types are read into writable
+    memory and are left unchanged.
+
+    Args:
+        index: Index as returned by build_index or faiss.read_index
+
+    Returns:
+        Whether inverted lists were copied
+    """
+    ivf = faiss.try_extract_index_ivf(faiss.downcast_index(index.index))
+    if ivf is None or not isinstance(faiss.downcast_InvertedLists(ivf.invlists), faiss.OnDiskInvertedLists):
+        return False
+
+    mapped = ivf.invlists
+    lists = faiss.ArrayInvertedLists(mapped.nlist, mapped.code_size)
+    for list_no in range(mapped.nlist):
+        size = mapped.list_size(list_no)
+        if size:
+            lists.add_entries(list_no, size, mapped.get_ids(list_no), mapped.get_codes(list_no))
+    # The index takes ownership of the copy and frees the mapped lists
+    ivf.replace_invlists(lists, True)
+    lists.this.disown()
+    return True
+
+
+def remove_ids(index: faiss.Index, memory_ids: Sequence[int]) -> int:
+    """Remove vectors by memory ID.
+
+    IndexIDMap2 expects the wrapped index to renumber the vectors left after
+    a removal, which IVF indexes do not: their inverted lists keep the old
+    positions, so searches would return -1 labels. For IVF indexes those
+    positions are rewritten to match the compacted ID map.
+
+    Args:
+        index: Index as returned by build_index, with writable inverted lists
+        memory_ids: IDs of the vectors to remove
+
+    Returns:
+        Number of vectors removed
+
+    Raises:
+        RuntimeError: If the index type does not support removal (HNSW)
+    """
+    ivf = faiss.try_extract_index_ivf(faiss.downcast_index(index.index))
+    if ivf is None:
+        return index.remove_ids(np.asarray(memory_ids, dtype=np.int64))
+
+    id_map = faiss.vector_to_array(index.id_map)
+    removed = np.isin(id_map, np.asarray(memory_ids, dtype=np.int64))
+    if not removed.any():
+        return 0
+    ivf.remove_ids(faiss.IDSelectorBatch(np.flatnonzero(removed).astype(np.int64)))
+
+    # New position of every kept vector, written back into the inverted lists
+    positions = np.cumsum(~removed, dtype=np.int64) - 1
+    lists = ivf.invlists
+    for list_no in range(lists.nlist):
+        size = lists.list_size(list_no)
+        if size:
+            ids = positions[faiss.rev_swig_ptr(lists.get_ids(list_no), size)]
+            codes = faiss.rev_swig_ptr(lists.get_codes(list_no), size * lists.code_size).copy()
+            lists.update_entries(list_no, 0, size, faiss.swig_ptr(ids), faiss.swig_ptr(codes))
+    faiss.copy_array_to_vector(id_map[~removed], index.id_map)
+    index.construct_rev_map()
+    index.ntotal = ivf.ntotal
+    return int(removed.sum())
+
+
+def search_parameters(index: faiss.Index, params: Optional[Dict] = None,
+                      sel: Optional[faiss.IDSelector] = None) -> Optional[faiss.SearchParameters]:
+    """Build per-query search parameters for an index.
+
+    Knobs that do not apply to the index type are ignored, so callers can
+    pass the same settings regardless of the configured spec.
+
+    Args:
+        index: Index as returned by build_index
+        params: Search-time knobs such as {"nprobe": 32, "efSearch": 128}
+        sel: Optional selector restricting the search to some memory IDs
+
+    Returns:
+        Search parameters, or None when there is nothing to set
+    """
+    params = params or {}
+    inner = faiss.downcast_index(index.index)
+
+    ivf = faiss.try_extract_index_ivf(inner)
+    if ivf is not None:
+        search_params = faiss.SearchParametersIVF()
+        search_params.nprobe = int(params.get("nprobe", ivf.nprobe))
+    elif isinstance(inner, faiss.IndexHNSW):
+        search_params = faiss.SearchParametersHNSW()
+        search_params.efSearch = int(params.get("efSearch", inner.hnsw.efSearch))
+    elif sel is not None:
+        search_params = faiss.SearchParameters()
+    else:
+        return None
+
+    if sel is not None:
+        search_params.sel = sel
+    return search_params
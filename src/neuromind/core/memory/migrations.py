@@ -0,0 +1,195 @@
+import sqlite3
+from typing import Callable, List, Sequence
+from neuromind.utils.logging import logger
+
+Migration = Callable[[sqlite3.Connection], None]
+"""One schema step; migration N (1-based) moves a database to user_version N."""
+
+
+def migrate(conn: sqlite3.Connection, migrations: Sequence[Migration]) -> int:
+    """Bring a database's schema up to date.
+
+    The schema version is tracked in PRAGMA user_version. Every pending
+    migration runs in its own IMMEDIATE transaction together with the
+    version bump, so an interrupted upgrade resumes where it stopped and
+    concurrent openers of the same database migrate it only once.
+
+    Args:
+        conn: Connection to the database to upgrade
+        migrations: Ordered migrations; the list index plus one is the version
+
+    Returns:
+        Schema version after migrating
+
+    Raises:
+        RuntimeError: If the database was written by a newer schema version
+    """
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    while version < len(migrations):
+        conn.commit()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Re-read under the write lock in case another connection migrated first
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version < len(migrations):
+                migrations[version](conn)
+                version += 1
+                conn.execute(f"PRAGMA user_version = {version}")
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Error migrating database schema to version {version + 1}", exc_info=e)
+            raise
+        logger.info(f"Migrated database schema to version {version}")
+
+    if version > len(migrations):
+        raise RuntimeError(f"Database schema version {version} is newer than supported "
+                           f"version {len(migrations)}")
+    return version
+
+
+def column_names(conn: sqlite3.Connection, table: str) -> List[str]:
+    """Names of a table's columns.
+
+    Args:
+        conn: Connection to query on
+        table: Table name
+
+    Returns:
+        Column names in declaration order
+    """
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def _create_storage_tables(conn: sqlite3.Connection) -> None:
+    """Version 1: the original memories and compression history tables."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS memories (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            content TEXT NOT NULL,
+            embedding BLOB,
+            metadata TEXT,
+            type TEXT,
+            importance FLOAT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_accessed TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS compression_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            memory_id INTEGER,
+            compression_type TEXT,
+            compressed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (memory_id) REFERENCES memories (id)
+        )
+    """)
+
+
+def _add_access_and_arena_columns(conn: sqlite3.Connection) -> None:
+    """Version 2: access counts, arena slots and the storage state table.
+
+    Databases created before versioning may already have some of these, so
+    each column is only added when missing.
+    """
+    columns = column_names(conn, "memories")
+    if "access_count" not in columns:
+        conn.execute("ALTER TABLE memories ADD COLUMN access_count INTEGER DEFAULT 0")
+    if "embedding_offset" not in columns:
+        conn.execute("ALTER TABLE memories ADD COLUMN embedding_offset INTEGER")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS storage_state (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        )
+    """)
+
+
+def _add_storage_indexes(conn: sqlite3.Connection) -> None:
+    """Version 3: secondary indexes for compression, listing and deduplication.
+
+    The importance and last_accessed indexes are partial over live rows, so
+    compressed memories cost nothing to skip and the indexes shrink as the
+    store is compressed. compress() scans only live rows through them, and
+    list_memories() walks the last_accessed one instead of sorting.
+    """
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_memories_live_importance
+        ON memories (importance)
+        WHERE content != '[COMPRESSED]'
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_memories_live_last_accessed
+        ON memories (last_accessed)
+        WHERE content != '[COMPRESSED]'
+    """)
+    # Per-type scans in importance order (merge_duplicates)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_memories_type_importance
+        ON memories (type, importance)
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_compression_history_memory_id
+        ON compression_history (memory_id)
+    """)
+
+
+def _add_full_text_index(conn: sqlite3.Connection) -> None:
+    """Version 4: FTS5 index over live memory content, kept in sync by triggers.
+
+    The FTS table reads its text from memories (external content), so the
+    content is not stored twice. Compressed rows are left out of the index,
+    so the triggers only pass live content to it; an external-content
+    delete must repeat exactly the text that was indexed.
+    """
+    conn.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS memories_fts
+        USING fts5(content, content='memories', content_rowid='id')
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS memories_fts_insert AFTER INSERT ON memories
+        WHEN new.content != '[COMPRESSED]'
+        BEGIN
+            INSERT INTO memories_fts (rowid, content) VALUES (new.id, new.content);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS memories_fts_delete AFTER DELETE ON memories
+        WHEN old.content != '[COMPRESSED]'
+        BEGIN
+            INSERT INTO memories_fts (memories_fts, rowid, content) VALUES ('delete', old.id, old.content);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS memories_fts_update AFTER UPDATE OF content ON memories
+        BEGIN
+            INSERT INTO memories_fts (memories_fts, rowid, content)
+            SELECT 'delete', old.id, old.content WHERE old.content != '[COMPRESSED]';
+            INSERT INTO memories_fts (rowid, content)
+            SELECT new.id, new.content WHERE new.content != '[COMPRESSED]';
+        END
+    """)
+    conn.execute("""
+        INSERT INTO memories_fts (rowid, content)
+        SELECT id, content
+        FROM memories
+        WHERE content != '[COMPRESSED]'
+    """)
+
+
+def _add_retention_index(conn: sqlite3.Connection) -> None:
+    """Version 5: per-type age index for the retention sweeper."""
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_memories_type_created_at
+        ON memories (type, created_at)
+    """)
+
+
+STORAGE_MIGRATIONS: List[Migration] = [
+    _create_storage_tables,
+    _add_access_and_arena_columns,
+    _add_storage_indexes,
+    _add_full_text_index,
+    _add_retention_index,
+]
+"""Schema history of the HybridMemoryStorage database."""
@@ -0,0 +1,103 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+import numpy as np
+
+
+class QueryCache:
+    """Thread-safe LRU cache of query results with a TTL and write-aware invalidation.
+
+    Every write that can change query results calls invalidate(), which
+    bumps a generation counter and drops all entries. Callers read the
+    generation before running a query and pass it to put(), so a result
+    computed while a write happened is never cached.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 60.0):
+        """Initialize the cache.
+
+        Args:
+            max_entries: Maximum number of cached queries
+            ttl: Seconds a cached result stays valid
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def vector_key(vector: np.ndarray) -> bytes:
+        """Quantize a query vector into a cache key.
+
+        The vector is rounded to float16, so repeats of the same query whose
+        embeddings differ only by floating-point noise share an entry.
+
+        Args:
+            vector: Query embedding
+
+        Returns:
+            Hashable key bytes
+        """
+        return np.asarray(vector, dtype=np.float16).tobytes()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Look up a cached result.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            The cached result, or None on a miss or when it has expired
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] <= self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, value: Any, generation: int) -> None:
+        """Cache a result unless a write invalidated the cache since it was computed.
+
+        Args:
+            key: Cache key
+            value: Result to cache
+            generation: The generation read before the result was computed
+        """
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self) -> None:
+        """Drop every cached result and start a new generation."""
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        """Hit-rate statistics.
+
+        Returns:
+            Hits, misses, hit rate, current size and generation
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "size": len(self._entries),
+                "generation": self.generation
+            }
@@ -0,0 +1,280 @@
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+from urllib.parse import quote, unquote
+import numpy as np
+from neuromind.utils.logging import logger
+from .hybrid_storage import HybridMemoryStorage
+
+_SHARD_SUFFIX = ".db"
+
+
+class ShardedMemoryStorage:
+    """Memory storage partitioned into one HybridMemoryStorage shard per tenant.
+
+    Each tenant (user, team, ...) gets its own SQLite file and FAISS index
+    under a root directory, so a tenant's searches cost only as much as its
+    own memories. Queries for one tenant go to its shard alone; queries over
+    several tenants fan out over a thread pool and the per-shard top-k lists
+    are merged by distance. At most max_open_shards shards are kept open;
+    the least recently used idle shard is closed (saving its index snapshot)
+    when another one has to be opened.
+    """
+
+    def __init__(self, root: str, dimension: int = 1536, max_open_shards: int = 32,
+                 max_workers: Optional[int] = None, **storage_kwargs):
+        """Initialize the sharded storage.
+
+        Args:
+            root: Directory holding one database (plus index files) per tenant
+            dimension: Dimension of vector embeddings
+            max_open_shards: Maximum number of shards kept open at once
+            max_workers: Threads used for cross-tenant fan-out (default: ThreadPoolExecutor's)
+            **storage_kwargs: Extra HybridMemoryStorage arguments applied to every shard
+        """
+        if max_open_shards < 1:
+            raise ValueError("max_open_shards must be at least 1")
+        os.makedirs(root, exist_ok=True)
+        self.root = root
+        self.dimension = dimension
+        self.max_open_shards = max_open_shards
+        self.storage_kwargs = storage_kwargs
+
+        self._shards: "OrderedDict[str, HybridMemoryStorage]" = OrderedDict()
+        self._in_use: Dict[str, int] = {}
+        # Tenants whose shard is being opened or closed outside the lock
+        self._pending: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="neuromind-shard")
+        logger.info(f"Initialized sharded memory storage in {root}")
+
+    def tenants(self) -> List[str]:
+        """Tenants that have a shard on disk.
+
+        Returns:
+            Tenant IDs, sorted
+        """
+        return sorted(
+            unquote(name[:-len(_SHARD_SUFFIX)])
+            for name in os.listdir(self.root) if name.endswith(_SHARD_SUFFIX)
+        )
+
+    def store(self, tenant: str, content: str, embedding: np.ndarray, metadata: Dict,
+              memory_type: str = "general", importance: float = 1.0) -> int:
+        """Store a new memory in a tenant's shard.
+
+        Args:
+            tenant: Tenant the memory belongs to
+            content: Memory content
+            embedding: Vector embedding of the content
+            metadata: Additional metadata
+            memory_type: Type of memory
+            importance: Importance score (0.0 to 1.0)
+
+        Returns:
+            Memory ID, unique within the tenant's shard
+        """
+        with self._use(tenant) as shard:
+            return shard.store(content, embedding, metadata, memory_type, importance)
+
+    def store_many(self, tenant: str, contents: Sequence[str], embeddings: np.ndarray,
+                   metadatas: Optional[Sequence[Dict]] = None,
+                   memory_types: Union[str, Sequence[str]] = "general",
+                   importances: Union[float, Sequence[float]] = 1.0) -> List[int]:
+        """Store a batch of memories in a tenant's shard.
+
+        Args:
+            tenant: Tenant the memories belong to
+            contents: Memory contents
+            embeddings: Matrix of vector embeddings, one row per memory
+            metadatas: Optional metadata for each memory
+            memory_types: Type of every memory, or one type per memory
+            importances: Importance of every memory, or one score per memory
+
+        Returns:
+            Memory IDs, in input order
+        """
+        with self._use(tenant) as shard:
+            return shard.store_many(contents, embeddings, metadatas, memory_types, importances)
+
+    def retrieve(self, query_embedding: np.ndarray, k: int = 5,
+                 tenant: Optional[Union[str, Sequence[str]]] = None,
+                 memory_type: Optional[Union[str, Sequence[str]]] = None,
+                 search_params: Optional[Dict] = None) -> List[Dict]:
+        """Retrieve similar memories from one tenant, several, or all of them.
+
+        Args:
+            query_embedding: Query vector embedding
+            k: Number of results to return
+            tenant: Tenant to search, list of tenants, or None for every tenant
+            memory_type: Optional filter by memory type, or list of types
+            search_params: Optional per-query knobs overriding the storage defaults
+
+        Returns:
+            List of retrieved memories, nearest first, each tagged with its "tenant";
+            tenants that never stored a memory have no shard and match nothing
+        """
+        try:
+            if isinstance(tenant, str):
+                tenants = [tenant]
+            else:
+                tenants = self.tenants() if tenant is None else list(tenant)
+            # Searching must not create (and open) an empty shard
+            tenants = [name for name in tenants if self._has_shard(name)]
+            if not tenants:
+                return []
+
+            def search(name: str) -> List[Dict]:
+                with self._use(name) as shard:
+                    memories = shard.retrieve(query_embedding, k, memory_type, search_params)
+                return [{**memory, "tenant": name} for memory in memories]
+
+            if len(tenants) == 1:
+                return search(tenants[0])
+            merged = [memory for memories in self._executor.map(search, tenants) for memory in memories]
+            merged.sort(key=lambda memory: memory["distance"])
+
+            logger.debug(f"Searched {len(tenants)} shards for {k} memories")
+            return merged[:k]
+        except Exception as e:
+            logger.error("Error retrieving memories from shards", exc_info=e)
+            raise
+
+    def compress(self, threshold: float = 0.8, tenant: Optional[str] = None,
+                 **compress_kwargs) -> Dict[str, int]:
+        """Compress one tenant's shard, or every shard in turn.
+
+        Args:
+            threshold: Importance threshold for compression
+            tenant: Tenant to compress, or None for every tenant
+            **compress_kwargs: Extra HybridMemoryStorage.compress arguments
+
+        Returns:
+            Counts of compressed memories by reason, summed over the shards
+        """
+        totals: Dict[str, int] = {}
+        for name in ([tenant] if tenant is not None else self.tenants()):
+            if not self._has_shard(name):
+                continue
+            with self._use(name) as shard:
+                counts = shard.compress(threshold, **compress_kwargs)
+            for reason, count in counts.items():
+                totals[reason] = totals.get(reason, 0) + count
+        return totals
+
+    def close(self) -> None:
+        """Close every open shard and the fan-out thread pool."""
+        self._executor.shutdown(wait=True)
+        while True:
+            with self._lock:
+                pending = list(self._pending.values())
+                if not pending:
+                    shards, self._shards = list(self._shards.values()), OrderedDict()
+                    break
+            wait(pending)
+        for shard in shards:
+            shard.close()
+        logger.info("Closed sharded memory storage")
+
+    def _shard_path(self, tenant: str) -> str:
+        """Database path of a tenant's shard (tenant IDs are percent-encoded)."""
+        if not tenant:
+            raise ValueError("Tenant ID must not be empty")
+        return os.path.join(self.root, quote(tenant, safe="") + _SHARD_SUFFIX)
+
+    def _has_shard(self, tenant: str) -> bool:
+        """Whether a tenant has a shard on disk; only storing creates one."""
+        return os.path.exists(self._shard_path(tenant))
+
+    @contextmanager
+    def _use(self, tenant: str) -> Iterator[HybridMemoryStorage]:
+        """Open (or reuse) a tenant's shard and pin it open while it is used.
+
+        Yields:
+            The tenant's storage
+        """
+        shard = self._acquire(tenant)
+        try:
+            yield shard
+        finally:
+            with self._lock:
+                self._in_use[tenant] -= 1
+                if not self._in_use[tenant]:
+                    del self._in_use[tenant]
+
+    def _acquire(self, tenant: str) -> HybridMemoryStorage:
+        """Pin a tenant's shard, opening it first if needed.
+
+        Shards are opened and closed outside the lock, so a slow open (index
+        load or rebuild) or close (index snapshot) only blocks callers of
+        that tenant. They wait on the pending open or close and try again.
+
+        Returns:
+            The tenant's storage
+        """
+        path = self._shard_path(tenant)
+        while True:
+            with self._lock:
+                shard = self._shards.get(tenant)
+                if shard is not None:
+                    self._shards.move_to_end(tenant)
+                    self._in_use[tenant] = self._in_use.get(tenant, 0) + 1
+                    return shard
+                pending = self._pending.get(tenant)
+                if pending is None:
+                    opened = self._pending[tenant] = Future()
+                    break
+            wait([pending])
+
+        try:
+            shard = HybridMemoryStorage(path, self.dimension, **self.storage_kwargs)
+        except BaseException as e:
+            with self._lock:
+                del self._pending[tenant]
+            opened.set_exception(e)
+            raise
+        with self._lock:
+            del self._pending[tenant]
+            self._shards[tenant] = shard
+            self._in_use[tenant] = self._in_use.get(tenant, 0) + 1
+            evicted = self._evict()
+        opened.set_result(shard)
+        self._close_evicted(evicted)
+        return shard
+
+    def _evict(self) -> List[Tuple[str, HybridMemoryStorage, Future]]:
+        """Pick least recently used idle shards to close until within max_open_shards.
+
+        Must be called with the lock held. The shards are only unregistered;
+        _close_evicted closes them after the lock is released. Shards pinned
+        by _use are skipped, so the limit can be exceeded briefly under heavy
+        concurrency.
+
+        Returns:
+            (tenant, shard, future) of each evicted shard
+        """
+        evicted = []
+        for name in list(self._shards):
+            if len(self._shards) <= self.max_open_shards:
+                break
+            if name in self._in_use or name == next(reversed(self._shards)):
+                continue
+            closing = self._pending[name] = Future()
+            evicted.append((name, self._shards.pop(name), closing))
+        return evicted
+
+    def _close_evicted(self, evicted: List[Tuple[str, HybridMemoryStorage, Future]]) -> None:
+        """Close evicted shards, then let waiting callers reopen them."""
+        for name, shard, closing in evicted:
+            try:
+                shard.close()
+                logger.debug(f"Evicted idle shard for tenant {name}")
+            except Exception as e:
+                logger.error(f"Error closing shard for tenant {name}", exc_info=e)
+            finally:
+                with self._lock:
+                    del self._pending[name]
+                closing.set_result(None)
@@ -0,0 +1,112 @@
+import json
+import struct
+from contextlib import contextmanager
+from typing import BinaryIO, Dict, Iterator, List, Tuple, Union
+import numpy as np
+
+# File header: magic, dimension. Chunk header: row count, JSON column bytes.
+_FILE_HEADER = struct.Struct("<8sI")
+_CHUNK_HEADER = struct.Struct("<II")
+_MAGIC = b"NMEXPRT1"
+
+Columns = Dict[str, List]
+"""Column name -> one value per row."""
+
+
+class ExportWriter:
+    """Writes a memory export as a stream of columnar chunks.
+
+    Each chunk holds its scalar columns (content, metadata, type, ...) as
+    one JSON object of lists, followed by the chunk's embeddings as a raw
+    little-endian float32 matrix, so vectors never pass through Python
+    floats. A chunk with zero rows marks the end of the stream.
+    """
+
+    def __init__(self, file: BinaryIO, dimension: int):
+        """Start an export stream.
+
+        Args:
+            file: Binary file opened for writing
+            dimension: Dimension of the exported embeddings
+        """
+        self.file = file
+        self.dimension = dimension
+        self.rows = 0
+        file.write(_FILE_HEADER.pack(_MAGIC, dimension))
+
+    def write_chunk(self, columns: Columns, embeddings: np.ndarray) -> None:
+        """Append one chunk of rows.
+
+        Args:
+            columns: Scalar columns, each with one value per row
+            embeddings: Matrix with one embedding per row
+        """
+        embeddings = np.ascontiguousarray(embeddings, dtype="<f4").reshape(-1, self.dimension)
+        if not len(embeddings):
+            return
+        if any(len(values) != len(embeddings) for values in columns.values()):
+            raise ValueError("Every column needs one value per embedding")
+        payload = json.dumps(columns).encode("utf-8")
+        self.file.write(_CHUNK_HEADER.pack(len(embeddings), len(payload)))
+        self.file.write(payload)
+        self.file.write(embeddings.tobytes())
+        self.rows += len(embeddings)
+
+    def close(self) -> None:
+        """Write the end-of-stream marker."""
+        self.file.write(_CHUNK_HEADER.pack(0, 0))
+
+
+def read_export(file: BinaryIO, dimension: int) -> Iterator[Tuple[Columns, np.ndarray]]:
+    """Read a memory export one chunk at a time.
+
+    Args:
+        file: Binary file opened for reading
+        dimension: Expected embedding dimension
+
+    Yields:
+        Scalar columns and the float32 embedding matrix of each chunk
+
+    Raises:
+        ValueError: If the file is not an export, has another dimension or is truncated
+    """
+    header = file.read(_FILE_HEADER.size)
+    if len(header) != _FILE_HEADER.size:
+        raise ValueError("Not a memory export: file too short")
+    magic, file_dimension = _FILE_HEADER.unpack(header)
+    if magic != _MAGIC:
+        raise ValueError("Not a memory export")
+    if file_dimension != dimension:
+        raise ValueError(f"Export dimension {file_dimension} != {dimension}")
+
+    while True:
+        header = file.read(_CHUNK_HEADER.size)
+        if len(header) != _CHUNK_HEADER.size:
+            raise ValueError("Truncated memory export: missing end marker")
+        rows, payload_size = _CHUNK_HEADER.unpack(header)
+        if rows == 0:
+            return
+        payload = file.read(payload_size)
+        matrix = file.read(rows * dimension * 4)
+        if len(payload) != payload_size or len(matrix) != rows * dimension * 4:
+            raise ValueError("Truncated memory export chunk")
+        columns = json.loads(payload.decode("utf-8"))
+        yield columns, np.frombuffer(matrix, dtype="<f4").reshape(rows, dimension).astype(np.float32)
+
+
+@contextmanager
+def open_stream(target: Union[str, BinaryIO], mode: str) -> Iterator[BinaryIO]:
+    """Open a path in binary mode, or pass an already open file through untouched.
+
+    Args:
+        target: File path or binary file object
+        mode: "rb" or "wb"
+
+    Yields:
+        Binary file object
+    """
+    if isinstance(target, str):
+        with open(target, mode) as f:
+            yield f
+    else:
+        yield target
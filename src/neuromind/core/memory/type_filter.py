@@ -0,0 +1,87 @@
+import threading
+from typing import Dict, Iterable, Optional, Sequence
+import numpy as np
+import faiss
+
+
+class TypeFilter:
+    """Per-memory-type bitmaps over memory IDs for filtered vector search.
+
+    Each memory type owns a bitmap with one bit per memory ID. Filtering on
+    several types ORs their bitmaps into a single FAISS IDSelectorBitmap, so
+    the search visits only matching vectors and a multi-type query still
+    costs one pass over the index.
+    """
+
+    def __init__(self):
+        """Initialize an empty filter."""
+        self._bitmaps: Dict[str, np.ndarray] = {}
+        self._lock = threading.Lock()
+
+    def clear(self) -> None:
+        """Forget every indexed memory."""
+        with self._lock:
+            self._bitmaps = {}
+
+    def add(self, memory_ids: np.ndarray, memory_types: Sequence[str]) -> None:
+        """Mark memory IDs as belonging to their types.
+
+        Args:
+            memory_ids: IDs of the memories added to the index
+            memory_types: Type of each memory, aligned with memory_ids
+        """
+        memory_ids = np.asarray(memory_ids, dtype=np.int64)
+        memory_types = np.asarray(memory_types, dtype=object)
+        with self._lock:
+            for memory_type in set(memory_types.tolist()):
+                ids = memory_ids[memory_types == memory_type]
+                bitmap = self._grow(memory_type, int(ids.max()))
+                np.bitwise_or.at(bitmap, ids >> 3, (1 << (ids & 7)).astype(np.uint8))
+
+    def remove(self, memory_ids: Iterable[int]) -> None:
+        """Unmark memory IDs from every type.
+
+        Args:
+            memory_ids: IDs of the memories removed from the index
+        """
+        memory_ids = np.asarray(list(memory_ids), dtype=np.int64)
+        if not len(memory_ids):
+            return
+        with self._lock:
+            for bitmap in self._bitmaps.values():
+                ids = memory_ids[(memory_ids >> 3) < len(bitmap)]
+                np.bitwise_and.at(bitmap, ids >> 3, ~(1 << (ids & 7)).astype(np.uint8))
+
+    def selector(self, memory_types: Sequence[str]) -> Optional[faiss.IDSelector]:
+        """Build a selector matching memories of any of the given types.
+
+        Args:
+            memory_types: Memory types to keep
+
+        Returns:
+            FAISS ID selector, or None if no indexed memory has those types
+        """
+        with self._lock:
+            bitmaps = [self._bitmaps[t] for t in memory_types if t in self._bitmaps]
+            if not bitmaps:
+                return None
+            combined = np.zeros(max(len(b) for b in bitmaps), dtype=np.uint8)
+            for bitmap in bitmaps:
+                combined[:len(bitmap)] |= bitmap
+
+        if not combined.any():
+            return None
+        # FAISS takes the bitmap's size in bytes; IDs past its end are not members
+        sel = faiss.IDSelectorBitmap(len(combined), faiss.swig_ptr(combined))
+        sel.referenced_objects = [combined]  # Keep the bitmap alive while FAISS uses it
+        return sel
+
+    def _grow(self, memory_type: str, max_id: int) -> np.ndarray:
+        """Get a type's bitmap, enlarged to hold max_id (amortized doubling)."""
+        bitmap = self._bitmaps.get(memory_type, np.zeros(0, dtype=np.uint8))
+        needed = (max_id >> 3) + 1
+        if needed > len(bitmap):
+            grown = np.zeros(max(needed, 2 * len(bitmap)), dtype=np.uint8)
+            grown[:len(bitmap)] = bitmap
+            bitmap = self._bitmaps[memory_type] = grown
+        return bitmap
@@ -1,14 +1,101 @@
 import os
 import json
+import time
 import numpy as np
+import faiss
 from datetime import datetime
-from typing import List, Dict, Any, Optional, Tuple
+from typing import BinaryIO, List, Dict, Any, Optional, Tuple, Union
 from langchain_core.embeddings import Embeddings
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_community.vectorstores import FAISS
+from langchain_community.vectorstores.utils import DistanceStrategy
 from langchain_huggingface import HuggingFaceEmbeddings
 import sqlite3
 from ..core.memory_types import MemoryType
 from ..core.memory import Memory
+from ..core.memory.codec import EmbeddingCodec
+from ..core.memory.decay import ImportanceDecay, ages_in_days
+from ..core.memory.execution import ExecutionPolicy
+from ..core.memory.fusion import fts_query, reciprocal_rank_fusion
+from ..core.memory.migrations import Migration, migrate
+from ..core.memory.query_cache import QueryCache
+from ..core.memory.transfer import ExportWriter, open_stream, read_export
+from .rows import MEMORY_TYPES, import_types, memory_metadata, split_rows
+
+
+# Memories read per query while loading the vector stores
+_LOAD_CHUNK_SIZE = 5000
+
+
+def _create_tables(conn: sqlite3.Connection):
+    """Version 1: memories, memory index and user profile tables."""
+    c = conn.cursor()
+    
+    # Create unified memories table
+    c.execute('''CREATE TABLE IF NOT EXISTS memories
+                (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                 user_id TEXT,
+                 content TEXT,
+                 type TEXT,
+                 timestamp datetime,
+                 importance REAL,
+                 metadata TEXT,
+                 embedding BLOB)''')
+    
+    # Create memory index table
+    c.execute('''CREATE TABLE IF NOT EXISTS memory_index
+                (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                 memory_id INTEGER,
+                 embedding_key TEXT,
+                 last_accessed datetime,
+                 access_count INTEGER,
+                 FOREIGN KEY(memory_id) REFERENCES memories(id))''')
+    
+    # Create user profiles table
+    c.execute('''CREATE TABLE IF NOT EXISTS user_profiles
+                (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                 user_id TEXT UNIQUE,
+                 preferences TEXT,
+                 last_interaction datetime)''')
+
+
+def _add_indexes(conn: sqlite3.Connection):
+    """Version 2: indexes for per-user and per-type lookups in time order."""
+    c = conn.cursor()
+    c.execute('''CREATE INDEX IF NOT EXISTS idx_memories_user_timestamp
+                ON memories (user_id, timestamp)''')
+    c.execute('''CREATE INDEX IF NOT EXISTS idx_memories_type_timestamp
+                ON memories (type, timestamp)''')
+    c.execute('''CREATE INDEX IF NOT EXISTS idx_memory_index_memory_id
+                ON memory_index (memory_id)''')
+
+
+def _add_full_text_index(conn: sqlite3.Connection):
+    """Version 3: FTS5 index over memory content, kept in sync by triggers."""
+    c = conn.cursor()
+    c.execute('''CREATE VIRTUAL TABLE IF NOT EXISTS memories_fts
+                USING fts5(content, content='memories', content_rowid='id')''')
+    c.execute('''CREATE TRIGGER IF NOT EXISTS memories_fts_insert AFTER INSERT ON memories
+                BEGIN
+                    INSERT INTO memories_fts (rowid, content) VALUES (new.id, new.content);
+                END''')
+    c.execute('''CREATE TRIGGER IF NOT EXISTS memories_fts_delete AFTER DELETE ON memories
+                BEGIN
+                    INSERT INTO memories_fts (memories_fts, rowid, content)
+                    VALUES ('delete', old.id, old.content);
+                END''')
+    c.execute('''CREATE TRIGGER IF NOT EXISTS memories_fts_update AFTER UPDATE OF content ON memories
+                BEGIN
+                    INSERT INTO memories_fts (memories_fts, rowid, content)
+                    VALUES ('delete', old.id, old.content);
+                    INSERT INTO memories_fts (rowid, content) VALUES (new.id, new.content);
+                END''')
+    c.execute("INSERT INTO memories_fts (rowid, content) SELECT id, content FROM memories")
+
+
+# Schema history of the Neuromind database; entry N-1 upgrades to version N
+SCHEMA_MIGRATIONS: List[Migration] = [_create_tables, _add_indexes, _add_full_text_index]
+
 
 class Neuromind:
     """Core memory management system for AI agents.
@@ -17,28 +104,69 @@ class Neuromind:
     of memories, including storage, retrieval, and vector similarity search.
     """
     
-    def __init__(self, db_path: str = "neuromind.db"):
+    def __init__(self, db_path: str = "neuromind.db", embedding_codec: str = "float32",
+                 refresh_interval: Optional[float] = None, metric: str = "l2",
+                 query_cache_size: int = 0, query_cache_ttl: float = 60.0,
+                 half_life_days: Optional[Dict[str, float]] = None,
+                 execution_policy: Optional[ExecutionPolicy] = None,
+                 embedding_cache_size: int = 1024):
         """Initialize the memory management system.
         
         Args:
             db_path: Path to the SQLite database file.
+            embedding_codec: On-disk embedding format ("float32", "float16" or "int8").
+            refresh_interval: If set, searches first load memories added by other
+                processes when this many seconds have passed since the last
+                refresh (0 refreshes before every search).
+            metric: Vector similarity metric: "l2", "ip" (inner product) or
+                "cosine" (inner product over embeddings normalized on insert).
+            query_cache_size: Number of search results to cache by query text
+                (0 disables caching).
+            query_cache_ttl: Seconds a cached search result stays valid.
+            half_life_days: Importance half-life in days per memory type
+                (e.g. {"short_term": 7}); reranking uses the decayed value.
+            execution_policy: Optional FAISS threading policy, applied to the
+                whole process. The vector stores search one query at a time,
+                so only its OpenMP thread count applies.
+            embedding_cache_size: Number of text embeddings kept in an LRU
+                cache shared by searches and add_memory (0 disables it).
         """
+        if metric not in ("l2", "ip", "cosine"):
+            raise ValueError(f"Invalid metric: {metric}. Must be 'l2', 'ip' or 'cosine'")
         self.db_path = db_path
-        self.embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-        self.embedding_dim = len(self.embeddings.embed_query("test"))
+        self.codec = EmbeddingCodec(embedding_codec)
+        self.refresh_interval = refresh_interval
+        self.metric = metric
+        self.query_cache = QueryCache(query_cache_size, query_cache_ttl) if query_cache_size else None
+        self.decay = ImportanceDecay(half_life_days)
+        if execution_policy is not None:
+            execution_policy.apply()
         
-        # Initialize vector stores
-        self.vector_store = FAISS.from_texts(
-            ["Initial memory"],
-            self.embeddings,
-            metadatas=[{"type": "short_term", "timestamp": datetime.now().isoformat()}]
+        # Text -> embedding; embeddings never go stale, so entries only age out by LRU
+        self.embedding_cache = (
+            QueryCache(embedding_cache_size, ttl=float("inf")) if embedding_cache_size else None
         )
         
-        self.long_term_vector_store = FAISS.from_texts(
-            ["Initial long-term memory"],
-            self.embeddings,
-            metadatas=[{"type": "long_term", "timestamp": datetime.now().isoformat()}]
-        )
+        # Inner-product stores score higher-is-better; cosine additionally has
+        # FAISS normalize every vector and query in batch as it is added
+        self._store_options = {}
+        if metric != "l2":
+            self._store_options = {
+                "distance_strategy": DistanceStrategy.MAX_INNER_PRODUCT,
+                "normalize_L2": metric == "cosine"
+            }
+        
+        # Highest memory ID loaded into the vector stores, plus IDs above it
+        # that this process added itself
+        self._watermark = 0
+        self._own_ids = set()
+        self._last_refresh = time.monotonic()
+        self.embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+        self.embedding_dim = len(self.embeddings.embed_query("test"))
+        
+        # One short-term and one long-term vector store per user, keyed by
+        # (user_id, is long-term), so a user's searches only scan their own memories
+        self.vector_stores: Dict[Tuple[str, bool], FAISS] = {}
         
         # Initialize database
         self.init_db()
@@ -52,39 +180,12 @@ class Neuromind:
         self.load_memories()
     
     def init_db(self):
-        """Initialize the database with required tables."""
+        """Initialize the database, creating or upgrading its tables and indexes."""
         conn = sqlite3.connect(self.db_path, detect_types=sqlite3.PARSE_DECLTYPES)
-        c = conn.cursor()
-        
-        # Create unified memories table
-        c.execute('''CREATE TABLE IF NOT EXISTS memories
-                    (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                     user_id TEXT,
-                     content TEXT,
-                     type TEXT,
-                     timestamp datetime,
-                     importance REAL,
-                     metadata TEXT,
-                     embedding BLOB)''')
-        
-        # Create memory index table
-        c.execute('''CREATE TABLE IF NOT EXISTS memory_index
-                    (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                     memory_id INTEGER,
-                     embedding_key TEXT,
-                     last_accessed datetime,
-                     access_count INTEGER,
-                     FOREIGN KEY(memory_id) REFERENCES memories(id))''')
-        
-        # Create user profiles table
-        c.execute('''CREATE TABLE IF NOT EXISTS user_profiles
-                    (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                     user_id TEXT UNIQUE,
-                     preferences TEXT,
-                     last_interaction datetime)''')
-        
-        conn.commit()
-        conn.close()
+        try:
+            migrate(conn, SCHEMA_MIGRATIONS)
+        finally:
+            conn.close()
     
     def add_memory(self, memory: Memory, user_id: str = "default") -> int:
         """Add a new memory to the system.
@@ -99,10 +200,7 @@ class Neuromind:
         try:
             # Generate embedding if not provided
             if memory.embedding is None:
-                memory.embedding = np.array(
-                    self.embeddings.embed_query(memory.content),
-                    dtype=np.float32
-                )
+                memory.embedding = self._embed(memory.content)
             
             # Store in database
             conn = sqlite3.connect(self.db_path, detect_types=sqlite3.PARSE_DECLTYPES)
@@ -113,137 +211,251 @@ class Neuromind:
                         VALUES (?, ?, ?, ?, ?, ?, ?)""",
                      (user_id, memory.content, memory.type.value, memory.timestamp,
                       memory.importance, json.dumps(memory.metadata),
-                      memory.embedding.tobytes()))
+                      self.codec.encode(memory.embedding)))
             
             memory_id = c.lastrowid
+            if memory_id == self._watermark + 1:
+                self._watermark = memory_id
+            else:
+                self._own_ids.add(memory_id)
             
             # Update vector store
-            store = self.long_term_vector_store if memory.type == MemoryType.LONG_TERM else self.vector_store
-            store.add_texts(
-                [memory.content],
-                metadatas=[{**memory.metadata, "id": memory_id}],
-                embeddings=[memory.embedding]
+            store = self._store(user_id, memory.type == MemoryType.LONG_TERM)
+            store.add_embeddings(
+                [(memory.content, memory.embedding)],
+                metadatas=[{**memory_metadata(memory.metadata, memory.timestamp, memory.importance),
+                            "id": memory_id, "user_id": user_id}]
             )
             
             conn.commit()
             conn.close()
             
+            if self.query_cache is not None:
+                self.query_cache.invalidate()
             return memory_id
             
         except Exception as e:
             print(f"Error adding memory: {str(e)}")
             return -1
     
-    def search_memories(self, query: str, k: int = 5, user_id: Optional[str] = None) -> List[Memory]:
+    def search_memories(self, query: str, k: int = 5, user_id: Optional[str] = None,
+                        mode: str = "vector") -> List[Memory]:
         """Search memories using vector similarity and reranking.
         
         Args:
             query: The search query.
             k: Number of results to return.
             user_id: Optional user ID to filter results.
+            mode: "vector" for embedding similarity, "lexical" for BM25 full-text
+                search (no embedding call), or "hybrid" to fuse both rankings
+                with reciprocal-rank fusion.
             
         Returns:
             List of matching Memory objects.
         """
+        if mode not in ("vector", "lexical", "hybrid"):
+            raise ValueError(f"Invalid search mode: {mode}. Must be 'vector', 'lexical' or 'hybrid'")
+        if self.refresh_interval is not None and time.monotonic() - self._last_refresh >= self.refresh_interval:
+            self.refresh()
+        if self.query_cache is None:
+            return self._search_memories(query, k, user_id, mode)
+        
+        # Repeated queries skip the embedding call and both searches
+        key = (query, k, user_id, mode)
+        cached = self.query_cache.get(key)
+        if cached is not None:
+            return list(cached)
+        generation = self.query_cache.generation
+        memories = self._search_memories(query, k, user_id, mode)
+        self.query_cache.put(key, list(memories), generation)
+        return memories
+    
+    def _search_memories(self, query: str, k: int, user_id: Optional[str], mode: str) -> List[Memory]:
+        """Run a search_memories query without the cache."""
         try:
-            query_embedding = np.array(self.embeddings.embed_query(query), dtype=np.float32)
+            if mode == "lexical":
+                return [self._result_to_memory(r) for r in self._lexical_results(query, k, user_id)]
+            
+            # Embed once; both stores are searched by vector
+            query_embedding = self._embed(query)
+            query_vector = query_embedding.tolist()
             k_search = min(k * 2, 20)
             
-            # Search both stores
+            # Search the user's long-term and short-term stores (every user's without one)
+            keys = [(user_id, True), (user_id, False)] if user_id is not None else list(self.vector_stores)
             results = []
-            
-            # Search long-term memories
-            try:
-                long_term = self.long_term_vector_store.similarity_search_with_score(
-                    query, k=k_search)
-                for doc, score in long_term:
-                    results.append({
-                        "content": doc.page_content,
-                        "score": float(score),
-                        "type": "long_term",
-                        "embedding": query_embedding,
-                        "metadata": doc.metadata
-                    })
-            except Exception as e:
-                print(f"Error searching long-term memories: {str(e)}")
-            
-            # Search short-term memories
-            try:
-                short_term = self.vector_store.similarity_search_with_score(
-                    query, k=k_search)
-                for doc, score in short_term:
-                    results.append({
-                        "content": doc.page_content,
-                        "score": float(score),
-                        "type": "short_term",
-                        "embedding": query_embedding,
-                        "metadata": doc.metadata
-                    })
-            except Exception as e:
-                print(f"Error searching short-term memories: {str(e)}")
+            for owner, long_term in keys:
+                store = self.vector_stores.get((owner, long_term))
+                if store is None:
+                    continue
+                memory_type = "long_term" if long_term else "short_term"
+                try:
+                    for doc, score in store.similarity_search_with_score_by_vector(query_vector, k=k_search):
+                        results.append({
+                            "content": doc.page_content,
+                            "score": float(score),
+                            "type": memory_type,
+                            "embedding": query_embedding,
+                            "metadata": doc.metadata
+                        })
+                except Exception as e:
+                    print(f"Error searching {memory_type.replace('_', '-')} memories: {str(e)}")
+            if user_id is None:
+                # Cap the candidates over all users at what one user's search reranks
+                results.sort(key=lambda r: r["score"], reverse=self.metric != "l2")
+                results = results[:2 * k_search]
             
             # Rerank results
-            if results:
-                reranked = self._rerank_results(results, query_embedding)
-                return [self._result_to_memory(r) for r in reranked[:k]]
-            
-            return []
+            reranked = self._rerank_results(results, query_embedding) if results else []
+            if mode == "hybrid":
+                reranked = self._fuse_results(reranked, self._lexical_results(query, k_search, user_id))
+            return [self._result_to_memory(r) for r in reranked[:k]]
             
         except Exception as e:
             print(f"Error in search_memories: {str(e)}")
             return []
     
+    def _embed(self, text: str) -> np.ndarray:
+        """Embed a text, reusing the cached embedding of a recently seen text.
+        
+        Args:
+            text: Text to embed.
+            
+        Returns:
+            float32 embedding; a copy, so callers may modify it.
+        """
+        if self.embedding_cache is None:
+            return np.array(self.embeddings.embed_query(text), dtype=np.float32)
+        cached = self.embedding_cache.get(text)
+        if cached is None:
+            generation = self.embedding_cache.generation
+            cached = np.array(self.embeddings.embed_query(text), dtype=np.float32)
+            self.embedding_cache.put(text, cached, generation)
+        return cached.copy()
+    
+    def _lexical_results(self, query: str, k: int, user_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Full-text search over memory content, ranked by BM25.
+        
+        Returns results shaped like the vector search results, with the BM25
+        score (lower is better) as "score" and the stored embedding.
+        """
+        match = fts_query(query)
+        if match is None:
+            return []
+        
+        conn = sqlite3.connect(self.db_path)
+        try:
+            c = conn.cursor()
+            c.execute("""SELECT m.id, m.user_id, m.content, m.type, m.timestamp, m.importance,
+                               m.metadata, m.embedding, bm25(memories_fts) AS score
+                        FROM memories_fts
+                        JOIN memories m ON m.id = memories_fts.rowid
+                        WHERE memories_fts MATCH ? AND (? IS NULL OR m.user_id = ?)
+                        ORDER BY score
+                        LIMIT ?""", (match, user_id, user_id, k))
+            rows = c.fetchall()
+        finally:
+            conn.close()
+        
+        results = []
+        for memory_id, owner, content, type_, timestamp, importance, metadata_json, blob, score in rows:
+            if type_ not in MEMORY_TYPES:
+                continue
+            metadata = {"timestamp": str(timestamp), "importance": importance,
+                        **json.loads(metadata_json or "{}"), "id": memory_id, "user_id": owner}
+            results.append({
+                "content": content,
+                "score": float(score),
+                "type": type_,
+                "embedding": EmbeddingCodec.decode(blob, self.embedding_dim) if blob is not None else None,
+                "metadata": metadata
+            })
+        return results
+    
+    def _fuse_results(self, vector_results: List[Dict[str, Any]],
+                      lexical_results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Merge reranked vector results and BM25 results with reciprocal-rank fusion."""
+        def key(result):
+            return result["metadata"].get("id", result["content"])
+        
+        by_key = {}
+        for result in vector_results + lexical_results:
+            by_key.setdefault(key(result), result)
+        fused = reciprocal_rank_fusion([
+            [key(r) for r in vector_results],
+            [key(r) for r in lexical_results]
+        ])
+        return [{**by_key[k], "rrf_score": score} for k, score in fused]
+    
+    def _vector_score(self, score: float) -> float:
+        """Map a raw vector store score onto a 0-1 similarity, higher is better.
+        
+        Cosine similarity is used directly (clipped at 0), an unbounded
+        inner product goes through a logistic curve and an L2 distance
+        through 1 / (1 + distance).
+        """
+        if self.metric == "cosine":
+            return max(0.0, min(1.0, score))
+        if self.metric == "ip":
+            return float(1 / (1 + np.exp(-score)))
+        return 1 / (1 + score)
+    
     def _rerank_results(self, results: List[Dict[str, Any]], query_embedding: np.ndarray) -> List[Dict[str, Any]]:
-        """Rerank search results using multiple factors."""
+        """Rerank search results using multiple factors, scored for all results at once."""
         try:
             now = datetime.now()
-            scored_results = []
-            
-            for result in results:
-                # Base vector similarity score (0-1)
-                vector_score = 1 / (1 + result["score"])
-                
-                # Calculate recency score (0-1)
-                timestamp = result.get("metadata", {}).get("timestamp")
-                if timestamp:
-                    try:
-                        age_hours = (now - datetime.fromisoformat(timestamp)).total_seconds() / 3600
-                        recency_score = 1 / (1 + (age_hours / 24))
-                    except:
-                        recency_score = 0.5
-                else:
-                    recency_score = 0.5
-                
-                # Get importance score (0-1)
-                importance = float(result.get("metadata", {}).get("importance", 0.5))
-                
-                # Calculate final score with weights
-                final_score = (
-                    0.6 * vector_score +    # Vector similarity is most important
-                    0.2 * recency_score +   # Recent memories get a boost
-                    0.2 * importance        # Important memories get a boost
-                )
-                
-                scored_results.append({
-                    **result,
-                    "final_score": final_score,
-                    "vector_score": vector_score,
-                    "recency_score": recency_score,
-                    "importance": importance
-                })
+            metadatas = [result.get("metadata", {}) for result in results]
+            timestamps = [metadata.get("timestamp") for metadata in metadatas]
+            
+            # Base vector similarity score (0-1)
+            vector_scores = np.array([self._vector_score(result["score"]) for result in results])
+            
+            # Recency score (0-1); missing or unparseable timestamps score 0.5
+            ages = ages_in_days(timestamps, now)
+            recency_scores = np.nan_to_num(1 / (1 + ages), nan=0.5)
+            
+            # Importance score (0-1), decayed by each memory type's half-life
+            importances = self.decay.effective(
+                [float(metadata.get("importance", 0.5)) for metadata in metadatas],
+                timestamps,
+                [result["type"] for result in results],
+                now
+            )
+            
+            # Calculate final score with weights
+            final_scores = (
+                0.6 * vector_scores +    # Vector similarity is most important
+                0.2 * recency_scores +   # Recent memories get a boost
+                0.2 * importances        # Important memories get a boost
+            )
+            
+            scored_results = [{
+                **result,
+                "final_score": float(final_scores[i]),
+                "vector_score": float(vector_scores[i]),
+                "recency_score": float(recency_scores[i]),
+                "importance": float(importances[i])
+            } for i, result in enumerate(results)]
             
             return sorted(scored_results, key=lambda x: x["final_score"], reverse=True)
             
         except Exception as e:
             print(f"Error in _rerank_results: {str(e)}")
-            return sorted(results, key=lambda x: x["score"])
+            return sorted(results, key=lambda x: self._vector_score(x["score"]), reverse=True)
     
     def _result_to_memory(self, result: Dict[str, Any]) -> Memory:
-        """Convert a search result to a Memory object."""
+        """Convert a search result to a Memory object.
+        
+        A missing or unparseable timestamp falls back to the current time.
+        """
+        try:
+            timestamp = datetime.fromisoformat(str(result["metadata"]["timestamp"]))
+        except (KeyError, ValueError):
+            timestamp = datetime.now()
         return Memory(
             content=result["content"],
             type=MemoryType.from_string(result["type"]),
-            timestamp=datetime.fromisoformat(result["metadata"]["timestamp"]),
+            timestamp=timestamp,
             importance=float(result["metadata"].get("importance", 0.5)),
             embedding=result["embedding"],
             metadata=result["metadata"]
@@ -290,58 +502,224 @@ class Neuromind:
             print(f"Error getting user profile: {str(e)}")
             return {}
     
-    def load_memories(self):
-        """Load existing memories from database into vector stores."""
+    def export_memories(self, target: Union[str, BinaryIO], chunk_size: int = 1000) -> int:
+        """Stream every memory to a columnar export file.
+        
+        Memories are read chunk_size at a time in ID order, so memory use
+        does not grow with the database. The file format is shared with
+        HybridMemoryStorage.export_memories.
+        
+        Args:
+            target: File path or binary file object to write to.
+            chunk_size: Memories per chunk.
+            
+        Returns:
+            Number of memories exported, or -1 on error.
+        """
         try:
             conn = sqlite3.connect(self.db_path, detect_types=sqlite3.PARSE_DECLTYPES)
-            c = conn.cursor()
-            
-            c.execute("""SELECT content, type, metadata, embedding 
-                        FROM memories""")
-            rows = c.fetchall()
-            
-            # Clear existing vector stores
-            self.vector_store = FAISS.from_texts(
-                ["Initial memory"],
-                self.embeddings,
-                metadatas=[{"type": "short_term", "timestamp": datetime.now().isoformat()}]
-            )
-            
-            self.long_term_vector_store = FAISS.from_texts(
-                ["Initial long-term memory"],
-                self.embeddings,
-                metadatas=[{"type": "long_term", "timestamp": datetime.now().isoformat()}]
-            )
+            try:
+                with open_stream(target, "wb") as f:
+                    writer = ExportWriter(f, self.embedding_dim)
+                    last_id = 0
+                    while True:
+                        rows = conn.execute("""SELECT id, user_id, content, type, timestamp,
+                                                      importance, metadata, embedding
+                                               FROM memories
+                                               WHERE id > ? AND embedding IS NOT NULL
+                                               ORDER BY id
+                                               LIMIT ?""", (last_id, chunk_size)).fetchall()
+                        if not rows:
+                            break
+                        last_id = rows[-1][0]
+                        embeddings, bad = EmbeddingCodec.decode_valid([row[7] for row in rows], self.embedding_dim)
+                        if bad:
+                            print(f"Skipping {len(bad)} memories with undecodable embeddings: {[rows[i][0] for i in bad]}")
+                            bad = set(bad)
+                            rows = [row for i, row in enumerate(rows) if i not in bad]
+                        writer.write_chunk({
+                            "user_id": [row[1] for row in rows],
+                            "content": [row[2] for row in rows],
+                            "type": [row[3] for row in rows],
+                            "timestamp": [
+                                row[4].isoformat() if isinstance(row[4], datetime) else row[4]
+                                for row in rows
+                            ],
+                            "importance": [row[5] for row in rows],
+                            "metadata": [json.loads(row[6] or "{}") for row in rows]
+                        }, embeddings)
+                    writer.close()
+            finally:
+                conn.close()
+            return writer.rows
+        except Exception as e:
+            print(f"Error exporting memories: {str(e)}")
+            return -1
+    
+    def import_memories(self, source: Union[str, BinaryIO]) -> int:
+        """Load memories from an export file.
+        
+        Each chunk is bulk-inserted with a single executemany, and the
+        vector stores are rebuilt once at the end rather than growing one
+        memory at a time. Exports from HybridMemoryStorage are accepted too;
+        their created_at becomes the timestamp, user_id defaults to "default",
+        and types that are not MemoryType values are imported as short-term.
+        
+        Args:
+            source: File path or binary file object to read from.
             
-            # Add memories to appropriate vector store
-            for content, type_, metadata_json, embedding_bytes in rows:
-                try:
-                    metadata = json.loads(metadata_json)
-                    embedding = np.frombuffer(embedding_bytes, dtype=np.float32)
-                    
-                    store = self.long_term_vector_store if type_ == MemoryType.LONG_TERM.value else self.vector_store
-                    store.add_texts(
-                        [content],
-                        metadatas=[metadata],
-                        embeddings=[embedding]
-                    )
-                except Exception as e:
-                    print(f"Error loading memory: {str(e)}")
-                    continue
+        Returns:
+            Number of memories imported, or -1 on error.
+        """
+        try:
+            imported = 0
+            conn = sqlite3.connect(self.db_path, detect_types=sqlite3.PARSE_DECLTYPES)
+            try:
+                with open_stream(source, "rb") as f:
+                    for columns, embeddings in read_export(f, self.embedding_dim):
+                        n = len(embeddings)
+                        timestamps = columns.get("timestamp") or columns.get("created_at") or [None] * n
+                        conn.executemany("""INSERT INTO memories
+                                            (user_id, content, type, timestamp, importance, metadata, embedding)
+                                            VALUES (?, ?, ?, ?, ?, ?, ?)""", zip(
+                            columns.get("user_id") or ["default"] * n,
+                            columns["content"],
+                            import_types(columns.get("type") or [MemoryType.SHORT_TERM.value] * n),
+                            [t or datetime.now().isoformat() for t in timestamps],
+                            columns.get("importance") or [0.5] * n,
+                            map(json.dumps, columns.get("metadata") or [{}] * n),
+                            self.codec.encode_many(embeddings)
+                        ))
+                        conn.commit()
+                        imported += n
+            finally:
+                conn.close()
+            
+            if imported:
+                self.load_memories()
+            return imported
+        except Exception as e:
+            print(f"Error importing memories: {str(e)}")
+            return -1
+    
+    def _add_rows(self, rows: List[Tuple]) -> int:
+        """Add (id, user_id, content, type, timestamp, importance, metadata, embedding) rows to the vector stores.
+        
+        Returns:
+            Number of memories added.
+        """
+        # Add memories to appropriate vector store, reusing the stored embeddings
+        added = 0
+        for (user_id, long_term), (contents, metadatas, embeddings) in split_rows(rows, self.embedding_dim).items():
+            self._store(user_id, long_term).add_embeddings(list(zip(contents, embeddings)), metadatas=metadatas)
+            added += len(contents)
+        return added
+    
+    def _store(self, user_id: str, long_term: bool) -> FAISS:
+        """A user's short-term or long-term vector store, created empty on first use."""
+        store = self.vector_stores.get((user_id, long_term))
+        if store is None:
+            store = self.vector_stores[user_id, long_term] = self._empty_store()
+        return store
+    
+    def _empty_store(self) -> FAISS:
+        """Create an empty vector store without calling the embedding model."""
+        index = faiss.IndexFlatL2(self.embedding_dim) if self.metric == "l2" else faiss.IndexFlatIP(self.embedding_dim)
+        return FAISS(self.embeddings, index, InMemoryDocstore(), {}, **self._store_options)
+    
+    def _build_store(self, contents: List[str], metadatas: List[Dict[str, Any]],
+                     embedding_chunks: List[np.ndarray]) -> FAISS:
+        """Build a vector store from all its memories in one FAISS.from_embeddings call.
+        
+        Args:
+            contents: Memory contents.
+            metadatas: Metadata of each memory.
+            embedding_chunks: Embedding matrices, together one row per memory.
             
-            conn.close()
+        Returns:
+            The vector store (empty when there are no memories).
+        """
+        if not contents:
+            return self._empty_store()
+        embeddings = np.vstack(embedding_chunks)
+        return FAISS.from_embeddings(
+            list(zip(contents, embeddings)), self.embeddings, metadatas=metadatas, **self._store_options
+        )
+    
+    def refresh(self) -> int:
+        """Load memories added to the database by other processes.
+        
+        Only rows above the highest memory ID already loaded are read, so
+        a refresh with nothing new costs a single primary-key lookup.
+        
+        Returns:
+            Number of memories added to the vector stores.
+        """
+        try:
+            conn = sqlite3.connect(self.db_path, detect_types=sqlite3.PARSE_DECLTYPES)
+            try:
+                c = conn.cursor()
+                c.execute("""SELECT id, user_id, content, type, timestamp, importance, metadata, embedding
+                            FROM memories
+                            WHERE id > ?
+                            ORDER BY id""", (self._watermark,))
+                rows = c.fetchall()
+            finally:
+                conn.close()
+            
+            # Memories this process added itself are already in the stores
+            added = self._add_rows([row for row in rows if row[0] not in self._own_ids])
+            if added and self.query_cache is not None:
+                self.query_cache.invalidate()
+            if rows:
+                self._watermark = rows[-1][0]
+                self._own_ids = {i for i in self._own_ids if i > self._watermark}
+            self._last_refresh = time.monotonic()
+            return added
+        except Exception as e:
+            print(f"Error refreshing memories: {str(e)}")
+            return 0
+    
+    def load_memories(self):
+        """Load existing memories from database into vector stores.
+        
+        Rows are read _LOAD_CHUNK_SIZE at a time and their embeddings decoded
+        per chunk; each user's stores are then built from one embedding matrix
+        with a single FAISS.from_embeddings call, instead of one add per memory.
+        """
+        try:
+            # Contents, metadatas and embedding chunks, keyed by (user_id, is long-term)
+            parts = {}
+            last_id = 0
+            conn = sqlite3.connect(self.db_path, detect_types=sqlite3.PARSE_DECLTYPES)
+            try:
+                while True:
+                    rows = conn.execute("""SELECT id, user_id, content, type, timestamp, importance,
+                                                  metadata, embedding
+                                           FROM memories
+                                           WHERE id > ?
+                                           ORDER BY id
+                                           LIMIT ?""", (last_id, _LOAD_CHUNK_SIZE)).fetchall()
+                    if not rows:
+                        break
+                    for key, (contents, metadatas, embeddings) in split_rows(rows, self.embedding_dim).items():
+                        part = parts.setdefault(key, ([], [], []))
+                        part[0].extend(contents)
+                        part[1].extend(metadatas)
+                        part[2].append(embeddings)
+                    last_id = rows[-1][0]
+            finally:
+                conn.close()
+            
+            # Replace the vector stores
+            self.vector_stores = {key: self._build_store(*part) for key, part in parts.items()}
+            if self.query_cache is not None:
+                self.query_cache.invalidate()
+            self._watermark = last_id
+            self._own_ids = set()
+            self._last_refresh = time.monotonic()
             
         except Exception as e:
             print(f"Error loading memories from database: {str(e)}")
-            # Initialize with empty stores if loading fails
-            self.vector_store = FAISS.from_texts(
-                ["Initial memory"],
-                self.embeddings,
-                metadatas=[{"type": "short_term", "timestamp": datetime.now().isoformat()}]
-            )
-            
-            self.long_term_vector_store = FAISS.from_texts(
-                ["Initial long-term memory"],
-                self.embeddings,
-                metadatas=[{"type": "long_term", "timestamp": datetime.now().isoformat()}]
-            ) 
\ No newline at end of file
+            # Start with no stores if loading fails
+            self.vector_stores = {}
@@ -0,0 +1,91 @@
+import json
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from ..core.memory.codec import EmbeddingCodec
+from ..core.memory_types import MemoryType
+
+MEMORY_TYPES = frozenset(memory_type.value for memory_type in MemoryType)
+
+
+def split_rows(rows: Sequence[Tuple], dimension: int) -> Dict[Tuple[str, bool], Tuple[List[str], List[Dict[str, Any]], np.ndarray]]:
+    """Decode (id, user_id, content, type, timestamp, importance, metadata, embedding) rows for the vector stores.
+
+    Embeddings are decoded in one pass; a row whose embedding or metadata
+    cannot be decoded, or whose type is not a MemoryType, is skipped on its
+    own instead of failing the chunk.
+    The timestamp and importance go into each memory's metadata, where
+    reranking reads them.
+
+    Args:
+        rows: Memory rows in ID order.
+        dimension: Embedding dimension.
+
+    Returns:
+        Contents, metadatas and a float32 embedding matrix, keyed by the
+        memories' (user_id, is long-term) vector store.
+    """
+    unknown = [row[0] for row in rows if row[3] not in MEMORY_TYPES]
+    if unknown:
+        print(f"Skipping {len(unknown)} memories with unknown types: {unknown}")
+    rows = [row for row in rows if row[7] is not None and row[3] in MEMORY_TYPES]
+    embeddings, bad = EmbeddingCodec.decode_valid([row[7] for row in rows], dimension)
+    if bad:
+        print(f"Skipping {len(bad)} memories with undecodable embeddings: {[rows[i][0] for i in bad]}")
+        bad = set(bad)
+        rows = [row for i, row in enumerate(rows) if i not in bad]
+
+    split = {}
+    for i, (memory_id, user_id, content, type_, timestamp, importance, metadata_json, _) in enumerate(rows):
+        try:
+            metadata = {**memory_metadata(json.loads(metadata_json), timestamp, importance),
+                        "id": memory_id, "user_id": user_id}
+        except Exception as e:
+            print(f"Error loading memory: {str(e)}")
+            continue
+        contents, metadatas, positions = split.setdefault(
+            (user_id, type_ == MemoryType.LONG_TERM.value), ([], [], [])
+        )
+        contents.append(content)
+        metadatas.append(metadata)
+        positions.append(i)
+    return {
+        key: (contents, metadatas, embeddings[positions].reshape(-1, dimension))
+        for key, (contents, metadatas, positions) in split.items()
+    }
+
+
+def memory_metadata(metadata: Dict[str, Any], timestamp: Any, importance: Optional[float]) -> Dict[str, Any]:
+    """Vector store metadata of a memory: its own metadata plus timestamp and importance.
+
+    Args:
+        metadata: The memory's stored metadata.
+        timestamp: Creation time, as a datetime or the string SQLite returns.
+        importance: Stored (base) importance.
+
+    Returns:
+        Metadata with "timestamp" as text and "importance" (each left out
+        when missing); keys already set in metadata take precedence, as in
+        lexical search results.
+    """
+    stored = {"timestamp": str(timestamp) if timestamp is not None else None, "importance": importance}
+    return {**{key: value for key, value in stored.items() if value is not None}, **metadata}
+
+
+def import_types(types: Sequence[Optional[str]]) -> List[str]:
+    """Map imported memory types onto MemoryType values.
+
+    Types from other storages (such as HybridMemoryStorage's "general")
+    become short-term memories, so every imported row can be loaded.
+
+    Args:
+        types: Memory types from an export file, in any case.
+
+    Returns:
+        MemoryType values, one per input type.
+    """
+    mapped = [(memory_type or "").lower() for memory_type in types]
+    unknown = sorted({memory_type for memory_type in mapped if memory_type not in MEMORY_TYPES})
+    if unknown:
+        print(f"Importing memories of unknown types {unknown} as {MemoryType.SHORT_TERM.value}")
+    return [memory_type if memory_type in MEMORY_TYPES else MemoryType.SHORT_TERM.value
+            for memory_type in mapped]
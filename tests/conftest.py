@@ -0,0 +1,11 @@
+import numpy as np
+import pytest
+
+DIM = 8
+
+@pytest.fixture
+def random_embeddings():
+    """Factory of reproducible random float32 embedding matrices."""
+    def make(n, seed=0, dimension=DIM):
+        return np.random.default_rng(seed).random((n, dimension), dtype=np.float32)
+    return make
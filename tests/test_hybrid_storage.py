@@ -0,0 +1,782 @@
+import gc
+import json
+import multiprocessing
+import sqlite3
+import threading
+import weakref
+import numpy as np
+import pytest
+from neuromind.core.memory import ExecutionPolicy, HybridMemoryStorage
+from neuromind.core.memory.access_tracker import AccessTracker
+from neuromind.core.memory.arena import EmbeddingArena
+from neuromind.core.memory.codec import EmbeddingCodec
+from neuromind.core.memory.migrations import STORAGE_MIGRATIONS
+
+DIM = 8
+
+def make_storage(tmp_path, **kwargs):
+    return HybridMemoryStorage(str(tmp_path / "memories.db"), DIM, **kwargs)
+
+def test_store_and_retrieve(tmp_path, random_embeddings):
+    storage = make_storage(tmp_path)
+    embeddings = random_embeddings(3)
+    ids = [
+        storage.store(f"memory {i}", embeddings[i], {"n": i}, memory_type="fact")
+        for i in range(3)
+    ]
+
+    results = storage.retrieve(embeddings[1], k=1)
+    assert results[0]["id"] == ids[1]
+    assert results[0]["metadata"] == {"n": 1}
+    storage.close()
+
+def test_connection_uses_wal_and_is_per_thread(tmp_path):
+    storage = make_storage(tmp_path)
+    journal_mode = storage.conn.execute("PRAGMA journal_mode").fetchone()[0]
+    assert journal_mode.lower() == "wal"
+    assert storage.conn is storage.conn
+
+    other = []
+    thread = threading.Thread(target=lambda: other.append(storage.conn))
+    thread.start()
+    thread.join()
+    assert other[0] is not storage.conn
+    storage.close()
+
+def test_connections_close_when_their_thread_exits(tmp_path):
+    storage = make_storage(tmp_path)
+    storage.conn.execute("SELECT 1")
+    for _ in range(50):
+        thread = threading.Thread(target=lambda: storage.conn.execute("SELECT COUNT(*) FROM memories"))
+        thread.start()
+        thread.join()
+    assert len(storage._connections._connections) == 1
+
+    storage.close()
+    storage.close()
+    assert storage._connections._connections == []
+    with pytest.raises(sqlite3.ProgrammingError):
+        storage._connections.get()
+
+def test_index_snapshot_warm_start_catches_up(tmp_path, random_embeddings):
+    embeddings = random_embeddings(4)
+    storage = make_storage(tmp_path)
+    first_id = storage.store("before snapshot", embeddings[0], {})
+    storage.close()
+
+    # A row written by another process after the snapshot was taken
+    writer = make_storage(tmp_path, persist_index=False)
+    second_id = writer.store("after snapshot", embeddings[1], {})
+    writer.close()
+
+    restarted = make_storage(tmp_path)
+    assert restarted.index.ntotal == 2
+    assert restarted.retrieve(embeddings[0], k=1)[0]["id"] == first_id
+    assert restarted.retrieve(embeddings[1], k=1)[0]["id"] == second_id
+    restarted.close()
+
+def test_snapshot_keeps_other_writers_rows_and_compressions_it_has_not_applied(tmp_path, random_embeddings):
+    embeddings = random_embeddings(4)
+    storage = make_storage(tmp_path)
+    writer = make_storage(tmp_path, persist_index=False)
+    first_id = storage.store("first", embeddings[0], {}, importance=0.1)
+    other_id = writer.store("other process", embeddings[1], {})
+    writer.compress(threshold=0.5)
+    third_id = storage.store("third", embeddings[2], {})
+
+    # The compressed vector is still indexed here but never returned
+    assert first_id not in {r["id"] for r in storage.retrieve(embeddings[0], k=3)}
+    storage.save_index()
+    storage.close()
+    writer.close()
+
+    restarted = make_storage(tmp_path)
+    assert sorted(restarted._indexed_ids().tolist()) == [other_id, third_id]
+    assert restarted.retrieve(embeddings[1], k=1)[0]["id"] == other_id
+    restarted.close()
+
+def test_compress_removes_vectors_by_id(tmp_path, random_embeddings):
+    storage = make_storage(tmp_path)
+    embeddings = random_embeddings(3)
+    low = storage.store("unimportant", embeddings[0], {}, importance=0.1)
+    kept = [storage.store(f"kept {i}", embeddings[i], {}) for i in (1, 2)]
+
+    storage.compress(threshold=0.5)
+
+    assert storage.index.ntotal == 2
+    assert sorted(storage._indexed_ids().tolist()) == kept
+    assert low not in [m["id"] for m in storage.retrieve(embeddings[0], k=3)]
+    storage.close()
+
+    # Compression recorded after the last snapshot is replayed on warm start
+    restarted = make_storage(tmp_path)
+    assert restarted.index.ntotal == 2
+    restarted.close()
+
+def test_trained_index_spec_switches_over_once_enough_vectors(tmp_path, random_embeddings):
+    storage = make_storage(tmp_path, index_spec="IVF2,Flat", search_params={"nprobe": 2})
+    embeddings = random_embeddings(100)
+    ids = [storage.store(f"memory {i}", embeddings[i], {}) for i in range(100)]
+
+    assert storage.active_spec == "IVF2,Flat"
+    assert storage.index.ntotal == 100
+    assert storage.retrieve(embeddings[42], k=1)[0]["id"] == ids[42]
+    storage.close()
+
+    restarted = make_storage(tmp_path, index_spec="IVF2,Flat")
+    assert restarted.active_spec == "IVF2,Flat"
+    assert restarted.index.ntotal == 100
+    restarted.close()
+
+@pytest.mark.parametrize("spec", ["IVF2,Flat", "IVF2,PQ2x4"])
+def test_warm_started_trained_index_accepts_writes(tmp_path, random_embeddings, spec):
+    embeddings = random_embeddings(702)
+    storage = make_storage(tmp_path, index_spec=spec, search_params={"nprobe": 2})
+    storage.store_many([f"memory {i}" for i in range(700)], embeddings[:700], importances=0.1)
+    assert storage.active_spec == spec
+    storage.close()
+
+    restarted = make_storage(tmp_path, index_spec=spec, search_params={"nprobe": 2})
+    one = restarted.store("after restart", embeddings[700], {})
+    many = restarted.store_many(["batch after restart"], embeddings[700:701] + 1.0)
+    assert restarted.index.ntotal == 702
+    assert restarted.compress(threshold=0.5)["low_importance"] == 700
+    assert sorted(restarted._indexed_ids().tolist()) == [one] + many
+    assert {r["id"] for r in restarted.retrieve(embeddings[700], k=5)} == {one, *many}
+    restarted.close()
+
+def test_failed_index_add_does_not_advance_the_watermark(tmp_path, random_embeddings, monkeypatch):
+    embeddings = random_embeddings(2)
+    storage = make_storage(tmp_path, persist_index=False)
+    writer = make_storage(tmp_path, persist_index=False)
+
+    def fail():
+        raise RuntimeError("index unavailable")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(storage, "_writable_index", fail)
+        with pytest.raises(RuntimeError):
+            storage.store("rolled back", embeddings[0], {})
+
+    # The rolled-back ID is reused by another process and still caught up
+    other_id = writer.store("other process", embeddings[1], {})
+    assert storage.refresh() == {"added": 1, "removed": 0}
+    assert storage.retrieve(embeddings[1], k=1)[0]["id"] == other_id
+    storage.close()
+    writer.close()
+
+def test_hnsw_compress_falls_back_to_batch_rebuild(tmp_path, random_embeddings):
+    storage = make_storage(tmp_path, index_spec="HNSW8")
+    embeddings = random_embeddings(10)
+    for i in range(10):
+        storage.store(f"memory {i}", embeddings[i], {}, importance=0.1 if i < 3 else 1.0)
+
+    storage.compress(threshold=0.5)
+    assert storage.active_spec == "HNSW8"
+    assert storage.index.ntotal == 7
+    storage.close()
+
+def test_type_filter_returns_k_matches_in_one_search(tmp_path, random_embeddings):
+    storage = make_storage(tmp_path)
+    embeddings = random_embeddings(30)
+    types = ["conversation", "fact", "preference"]
+    for i in range(30):
+        storage.store(f"memory {i}", embeddings[i], {}, memory_type=types[i % 3])
+
+    facts = storage.retrieve(embeddings[0], k=5, memory_type="fact")
+    assert len(facts) == 5
+    assert {m["type"] for m in facts} == {"fact"}
+
+    mixed = storage.retrieve(embeddings[0], k=8, memory_type=["fact", "preference"])
+    assert len(mixed) == 8
+    assert {m["type"] for m in mixed} <= {"fact", "preference"}
+
+    assert storage.retrieve(embeddings[0], k=5, memory_type="unknown") == []
+    storage.close()
+
+    restarted = make_storage(tmp_path)
+    assert len(restarted.retrieve(embeddings[0], k=5, memory_type="fact")) == 5
+    restarted.close()
+
+def test_type_filter_ignores_ids_past_a_smaller_types_bitmap(tmp_path, random_embeddings):
+    storage = make_storage(tmp_path)
+    embeddings = random_embeddings(2000)
+    storage.store_many([f"a {i}" for i in range(10)], embeddings[:10], memory_types="a")
+    storage.store_many([f"b {i}" for i in range(1990)], embeddings[10:], memory_types="b")
+
+    for query in embeddings[::100]:
+        results = storage.retrieve(query, k=10, memory_type="a")
+        assert len(results) == 10
+        assert {m["type"] for m in results} == {"a"}
+    storage.close()
+
+def test_store_many_assigns_contiguous_ids(tmp_path, random_embeddings):
+    storage = make_storage(tmp_path)
+    first = storage.store("single", random_embeddings(1, seed=1)[0], {})
+    embeddings = random_embeddings(5)
+    ids = storage.store_many(
+        [f"memory {i}" for i in range(5)], embeddings,
+        metadatas=[{"n": i} for i in range(5)],
+        memory_types=["fact", "note", "fact", "note", "fact"],
+        importances=0.5
+    )
+
+    assert ids == list(range(first + 1, first + 6))
+    assert storage.index.ntotal == 6
+    match = storage.retrieve(embeddings[3], k=1, memory_type="note")[0]
+    assert match["id"] == ids[3]
+    assert match["metadata"] == {"n": 3}
+    assert match["importance"] == 0.5
+
+    # numpy scalars and arrays work as importances too
+    more = storage.store_many(["a", "b"], random_embeddings(2, seed=2), importances=np.float32(0.25))
+    more += storage.store_many(["c", "d"], random_embeddings(2, seed=3), importances=np.array([0.75, 1.0], dtype=np.float32))
+    rows = storage.conn.execute(
+        f"SELECT importance FROM memories WHERE id IN ({','.join('?' * 4)}) ORDER BY id", more).fetchall()
+    assert [row[0] for row in rows] == [0.25, 0.25, 0.75, 1.0]
+    storage.close()
+
+def test_retrieve_many_returns_results_per_query(tmp_path, random_embeddings):
+    storage = make_storage(tmp_path)
+    embeddings = random_embeddings(20)
+    ids = storage.store_many([f"memory {i}" for i in range(20)], embeddings)
+
+    results = storage.retrieve_many(embeddings[[4, 11, 17]], k=3)
+    assert len(results) == 3
+    assert [r[0]["id"] for r in results] == [ids[4], ids[11], ids[17]]
+    assert all(len(r) == 3 for r in results)
+    assert all(r[0]["distance"] <= r[1]["distance"] <= r[2]["distance"] for r in results)
+    storage.close()
+
+def test_retrieve_buffers_access_updates_until_flush(tmp_path, random_embeddings):
+    storage = make_storage(tmp_path, access_flush_interval=3600)
+    embeddings = random_embeddings(2)
+    memory_id = storage.store("memory", embeddings[0], {})
+    storage.conn.execute("UPDATE memories SET last_accessed = '2000-01-01 00:00:00'")
+    storage.conn.commit()
+
+    storage.retrieve(embeddings[0], k=1)
+    storage.retrieve(embeddings[0], k=1)
+    row = storage.conn.execute(
+        "SELECT last_accessed, access_count FROM memories WHERE id = ?", (memory_id,)
+    ).fetchone()
+    assert row == ("2000-01-01 00:00:00", 0)
+
+    # compress() flushes first, so recently read memories are not "inactive"
+    storage.compress(threshold=0.5)
+    row = storage.conn.execute(
+        "SELECT content, access_count FROM memories WHERE id = ?", (memory_id,)
+    ).fetchone()
+    assert row == ("memory", 2)
+    storage.close()
+
+def test_access_trackers_are_not_kept_alive_until_exit(tmp_path):
+    storage = make_storage(tmp_path)
+    closed = weakref.ref(storage.access_tracker)
+    tracker = AccessTracker(storage._connections, flush_interval=3600)
+    abandoned, thread = weakref.ref(tracker), tracker._thread
+    storage.close()
+
+    # A tracker dropped without close() is collected and stops its flush thread
+    del storage, tracker
+    gc.collect()
+    thread.join(timeout=10)
+    assert closed() is None and abandoned() is None
+    assert not thread.is_alive()
+
+@pytest.mark.parametrize("codec, max_error", [("float32", 0.0), ("float16", 1e-3), ("int8", 1e-2)])
+def test_embedding_codecs_round_trip_through_rebuild(tmp_path, codec, max_error, random_embeddings):
+    storage = make_storage(tmp_path, embedding_codec=codec, persist_index=False)
+    embeddings = random_embeddings(4)
+    storage.store_many([f"memory {i}" for i in range(4)], embeddings)
+    storage._rebuild_index()
+
+    restored = storage.index.index.reconstruct_n(0, 4)
+    assert np.abs(restored - embeddings).max() <= max_error
+    storage.close()
+
+def test_legacy_raw_float32_blobs_still_load(tmp_path, random_embeddings):
+    storage = make_storage(tmp_path, persist_index=False)
+    embedding = random_embeddings(1)[0]
+    storage.conn.execute(
+        "INSERT INTO memories (content, embedding, metadata, type, importance) VALUES (?, ?, ?, ?, ?)",
+        ("legacy", embedding.tobytes(), "{}", "general", 1.0)
+    )
+    storage.conn.commit()
+    storage._rebuild_index()
+    assert storage.retrieve(embedding, k=1)[0]["content"] == "legacy"
+    storage.close()
+
+def test_decode_valid_skips_corrupt_blobs_in_a_mixed_batch(random_embeddings):
+    embeddings = random_embeddings(4)
+    blobs = [
+        embeddings[0].tobytes(),                            # legacy headerless float32
+        EmbeddingCodec("float16").encode(embeddings[1]),
+        embeddings[2].astype(np.float64).tobytes(),         # legacy headerless float64
+        EmbeddingCodec("int8").encode(embeddings[3]),
+        b"NM",                                              # truncated
+        b"XX" + bytes(4 * DIM),                             # unknown header
+    ]
+    with pytest.raises(ValueError):
+        EmbeddingCodec.decode_many(blobs, DIM)
+
+    decoded, bad = EmbeddingCodec.decode_valid(blobs, DIM)
+    assert bad == [4, 5]
+    assert decoded.shape == (4, DIM)
+    np.testing.assert_allclose(decoded, embeddings, atol=0.01)
+
+def test_corrupt_embedding_rows_are_skipped_on_rebuild_and_export(tmp_path, random_embeddings):
+    storage = make_storage(tmp_path, persist_index=False)
+    embeddings = random_embeddings(3)
+    ids = storage.store_many(["a", "b", "c"], embeddings)
+    storage.conn.execute("UPDATE memories SET embedding = ? WHERE id = ?",
+                         (b"XX" + bytes(4 * DIM), ids[1]))
+    storage.conn.commit()
+
+    storage._rebuild_index()
+    assert storage.index.ntotal == 2
+    assert storage.export_memories(str(tmp_path / "export.nmx")) == 2
+    storage.close()
+
+def test_arena_storage_rebuild_and_compaction(tmp_path, random_embeddings):
+    storage = make_storage(tmp_path, embedding_storage="arena")
+    embeddings = random_embeddings(6)
+    ids = storage.store_many(
+        [f"memory {i}" for i in range(6)], embeddings,
+        importances=[0.1, 1.0, 0.1, 1.0, 1.0, 1.0]
+    )
+    blob = storage.conn.execute("SELECT embedding FROM memories WHERE id = ?", (ids[1],)).fetchone()[0]
+    assert blob is None
+    assert len(storage.arena) == 6
+
+    storage.compress(threshold=0.5)
+    assert storage.compact_arena() == 2
+    assert len(storage.arena) == 4
+    np.testing.assert_array_equal(storage.arena.matrix(), embeddings[[1, 3, 4, 5]])
+
+    storage._rebuild_index()
+    assert storage.retrieve(embeddings[4], k=1)[0]["id"] == ids[4]
+    storage.close()
+
+    restarted = make_storage(tmp_path, persist_index=False)
+    assert restarted.arena.path.endswith(".vec.1")
+    assert restarted.index.ntotal == 4
+    restarted.close()
+
+def _append_to_arena(path, value, rounds, results):
+    arena = EmbeddingArena(path, DIM)
+    slots = [arena.append(np.full((3, DIM), value, dtype=np.float32)) for _ in range(rounds)]
+    results.put((value, np.concatenate(slots).tolist()))
+
+def test_arena_appends_from_several_processes_get_distinct_slots(tmp_path):
+    path = str(tmp_path / "shared.vec")
+    EmbeddingArena(path, DIM)
+    ctx = multiprocessing.get_context("fork")
+    results = ctx.Queue()
+    workers = [ctx.Process(target=_append_to_arena, args=(path, value, 400, results)) for value in (1.0, 2.0, 3.0)]
+    for worker in workers:
+        worker.start()
+    slots = dict(results.get(timeout=30) for _ in workers)
+    for worker in workers:
+        worker.join()
+
+    matrix = EmbeddingArena(path, DIM).matrix()
+    assert len(matrix) == 3 * 400 * 3
+    assert sorted(sum(slots.values(), [])) == list(range(len(matrix)))
+    for value, own in slots.items():
+        assert (matrix[own] == value).all()
+
+def test_compress_dry_run_and_batched_progress(tmp_path, random_embeddings):
+    storage = make_storage(tmp_path)
+    embeddings = random_embeddings(10)
+    storage.store_many(
+        [f"memory {i}" for i in range(10)], embeddings,
+        importances=[0.1] * 7 + [1.0] * 3
+    )
+    storage.conn.execute(
+        "UPDATE memories SET last_accessed = '2000-01-01 00:00:00' WHERE id = (SELECT MAX(id) FROM memories)"
+    )
+    storage.conn.commit()
+
+    expected = {"low_importance": 7, "inactive": 1, "total": 8}
+    assert storage.compress(threshold=0.5, dry_run=True) == expected
+    assert storage.index.ntotal == 10
+
+    calls = []
+    assert storage.compress(threshold=0.5, batch_size=3, progress=lambda done, total: calls.append(done)) == expected
+    assert calls == [3, 6, 8]
+    assert storage.index.ntotal == 2
+    history = storage.conn.execute("SELECT COUNT(*) FROM compression_history").fetchone()[0]
+    assert history == 8
+
+    # Already compressed memories are not compressed again
+    assert storage.compress(threshold=0.5)["total"] == 0
+    storage.close()
+
+def test_merge_duplicates_keeps_one_representative_per_cluster(tmp_path, random_embeddings):
+    storage = make_storage(tmp_path)
+    base = random_embeddings(3, seed=7) * 10
+    embeddings = np.vstack([base[0], base[0] + 0.001, base[0] - 0.001, base[1], base[2], base[2] + 0.001])
+    ids = storage.store_many(
+        [f"memory {i}" for i in range(6)], embeddings,
+        metadatas=[{"source": i} for i in range(6)],
+        memory_types=["conversation"] * 5 + ["fact"],
+        importances=[0.2, 0.5, 0.3, 1.0, 0.4, 0.4]
+    )
+
+    assert storage.merge_duplicates(radius=0.01, dry_run=True) == 2
+    counts = storage.compress(threshold=0.0, dedup_radius=0.01)
+    assert counts["merged"] == 2
+    assert storage.index.ntotal == 4
+
+    # The most important member represents the cluster with summed importance
+    row = storage.conn.execute(
+        "SELECT importance, metadata FROM memories WHERE id = ?", (ids[1],)
+    ).fetchone()
+    assert row[0] == pytest.approx(1.0)
+    assert json.loads(row[1]) == {"source": 1, "merged_ids": [ids[0], ids[2]]}
+
+    # Near-identical vectors of different types are not merged
+    types = {m["type"] for m in storage.retrieve(embeddings[5], k=4)}
+    assert types == {"conversation", "fact"}
+    merged = storage.conn.execute(
+        "SELECT COUNT(*) FROM compression_history WHERE compression_type = 'merged'"
+    ).fetchone()[0]
+    assert merged == 2
+    storage.close()
+
+def test_hot_tier_promotes_and_demotes_and_merges_search(tmp_path, random_embeddings):
+    storage = make_storage(tmp_path, hot_capacity=3, tier_interval=3600)
+    embeddings = random_embeddings(6)
+    ids = storage.store_many([f"memory {i}" for i in range(6)], embeddings, importances=0.5)
+    storage.rebalance_tiers()
+    assert storage.hot_index.ntotal == 3
+    assert storage.index.ntotal == 3
+
+    # Age half the memories out of the window; the important one stays hot
+    storage.conn.execute("""
+        UPDATE memories SET last_accessed = datetime('now', '-30 days') WHERE id IN (?, ?, ?)
+    """, ids[3:])
+    storage.conn.execute("UPDATE memories SET importance = 0.95 WHERE id = ?", (ids[0],))
+    storage.conn.commit()
+    storage.rebalance_tiers()
+    hot = set(storage.hot_index.id_map.at(i) for i in range(storage.hot_index.ntotal))
+    assert hot == {ids[0], ids[1], ids[2]}
+
+    # Every memory is still found, whichever tier it is in
+    for i, embedding in enumerate(embeddings):
+        assert storage.retrieve(embedding, k=1)[0]["id"] == ids[i]
+    results = storage.retrieve(embeddings[4], k=6)
+    distances = [r["distance"] for r in results]
+    assert len(results) == 6 and distances == sorted(distances)
+
+    storage.compress(threshold=0.6)
+    storage.close()
+
+    reopened = make_storage(tmp_path, hot_capacity=3, tier_interval=3600)
+    reopened.rebalance_tiers()
+    assert reopened.hot_index.ntotal == 1
+    assert reopened.retrieve(embeddings[0], k=1)[0]["id"] == ids[0]
+    reopened.close()
+
+    untiered = make_storage(tmp_path)
+    assert untiered.index.ntotal == 1
+    untiered.close()
+
+def test_hot_tier_demotes_into_a_warm_started_ivf_cold_tier(tmp_path, random_embeddings):
+    embeddings = random_embeddings(220)
+    options = dict(index_spec="IVF2,Flat", search_params={"nprobe": 2}, hot_capacity=10, tier_interval=3600)
+    storage = make_storage(tmp_path, **options)
+    storage.store_many([f"memory {i}" for i in range(200)], embeddings[:200], importances=0.5)
+    storage.rebalance_tiers()
+    assert (storage.hot_index.ntotal, storage.index.ntotal) == (10, 190)
+    assert storage.active_spec == "IVF2,Flat"
+    storage.close()
+
+    reopened = make_storage(tmp_path, **options)
+    ids = reopened.store_many([f"new {i}" for i in range(20)], embeddings[200:], importances=0.5)
+    # The background worker may have demoted already; either way the cold tier takes them
+    reopened.rebalance_tiers()
+    assert (reopened.hot_index.ntotal, reopened.index.ntotal) == (10, 210)
+    assert reopened.retrieve(embeddings[205], k=1)[0]["id"] == ids[5]
+    reopened.close()
+
+def test_migrations_upgrade_legacy_database_in_place(tmp_path, random_embeddings):
+    import sqlite3
+    db_path = tmp_path / "memories.db"
+    legacy = sqlite3.connect(db_path)
+    legacy.execute("""
+        CREATE TABLE memories (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            content TEXT NOT NULL,
+            embedding BLOB,
+            metadata TEXT,
+            type TEXT,
+            importance FLOAT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_accessed TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    # The original storage wrote embedding.tobytes() of whatever dtype it was given
+    embeddings = random_embeddings(2)
+    legacy.executemany(
+        "INSERT INTO memories (content, embedding, metadata, type, importance) VALUES (?, ?, ?, ?, ?)",
+        [("old", embeddings[0].tobytes(), "{}", "fact", 0.5),
+         ("old float64", embeddings[1].astype(np.float64).tobytes(), "{}", "fact", 0.5)]
+    )
+    legacy.commit()
+    legacy.close()
+
+    storage = make_storage(tmp_path)
+    conn = storage.conn
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == len(STORAGE_MIGRATIONS)
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(memories)")]
+    assert "access_count" in columns and "embedding_offset" in columns
+    assert storage.index.ntotal == 2
+    assert storage.retrieve(embeddings[1], k=1)[0]["content"] == "old float64"
+    blob = conn.execute("SELECT embedding FROM memories WHERE content = 'old float64'").fetchone()[0]
+    assert blob == EmbeddingCodec("float32").encode(embeddings[1])
+
+    plan = " ".join(row[3] for row in conn.execute("""
+        EXPLAIN QUERY PLAN
+        SELECT id FROM memories
+        WHERE content != '[COMPRESSED]'
+          AND (importance < 0.8 OR last_accessed < datetime('now', '-30 days'))
+    """))
+    assert "USING INDEX idx_memories_live_" in plan
+
+    plan = " ".join(row[3] for row in conn.execute("""
+        EXPLAIN QUERY PLAN
+        SELECT id FROM memories
+        WHERE content != '[COMPRESSED]'
+        ORDER BY last_accessed DESC
+    """))
+    assert "idx_memories_live_last_accessed" in plan and "TEMP B-TREE" not in plan
+    storage.close()
+
+    # Reopening is a no-op
+    reopened = make_storage(tmp_path)
+    assert reopened.conn.execute("PRAGMA user_version").fetchone()[0] == len(STORAGE_MIGRATIONS)
+    reopened.close()
+
+def test_full_text_and_hybrid_retrieval(tmp_path, random_embeddings):
+    storage = make_storage(tmp_path)
+    embeddings = random_embeddings(4)
+    ids = storage.store_many(
+        ["deploy failed with ERR-404 on node7", "the cat sat on the mat",
+         "ERR-500 while deploying", "quarterly report draft"],
+        embeddings, memory_types=["log", "note", "log", "note"], importances=[1.0, 1.0, 0.1, 1.0]
+    )
+
+    results = storage.search_text("ERR-404")
+    assert [r["id"] for r in results] == [ids[0]]
+    assert "bm25" in results[0] and "distance" not in results[0]
+    assert [r["id"] for r in storage.search_text("deploy", memory_type="note")] == []
+
+    # The lexical match and the nearest vector both make the fused top 2
+    results = storage.retrieve_hybrid("ERR-404", embeddings[3], k=2)
+    assert {r["id"] for r in results} == {ids[0], ids[3]}
+    assert all("rrf_score" in r for r in results)
+
+    # Compressed and rewritten content leaves the full-text index
+    storage.compress(threshold=0.5)
+    assert storage.search_text("ERR-500") == []
+    storage.conn.execute("UPDATE memories SET content = 'renamed' WHERE id = ?", (ids[1],))
+    storage.conn.commit()
+    assert storage.search_text("cat") == []
+    assert [r["id"] for r in storage.search_text("renamed")] == [ids[1]]
+    storage.close()
+
+def test_refresh_pulls_in_other_writers_rows_and_tombstones(tmp_path, random_embeddings):
+    embeddings = random_embeddings(4)
+    writer = make_storage(tmp_path, persist_index=False)
+    reader = make_storage(tmp_path, persist_index=False, refresh_interval=0)
+    writer_ids = writer.store_many(["w0", "w1"], embeddings[:2], importances=[1.0, 0.1])
+    reader_id = reader.store("r0", embeddings[2], {})
+
+    # The reader refreshes before searching and sees the writer's memories
+    assert reader.retrieve(embeddings[0], k=1)[0]["id"] == writer_ids[0]
+    assert reader.index.ntotal == 3
+
+    # Compression in the writer reaches the reader through its tombstones
+    writer.compress(threshold=0.5)
+    assert reader.refresh() == {"added": 0, "removed": 1}
+    assert writer_ids[1] not in {r["id"] for r in reader.retrieve(embeddings[1], k=3)}
+    assert reader.refresh() == {"added": 0, "removed": 0}
+
+    # The writer only refreshes on demand
+    assert writer.index.ntotal == 1
+    assert writer.refresh() == {"added": 1, "removed": 0}
+    assert writer.retrieve(embeddings[2], k=1)[0]["id"] == reader_id
+    writer.close()
+    reader.close()
+
+def test_cosine_metric_normalizes_and_reports_similarity(tmp_path, random_embeddings):
+    storage = make_storage(tmp_path, metric="cosine")
+    embeddings = random_embeddings(3)
+    ids = storage.store_many(["a", "b", "c"], embeddings * np.array([[1.0], [10.0], [100.0]], dtype=np.float32))
+
+    # Scale does not matter, only direction
+    results = storage.retrieve(embeddings[1] * 0.01, k=3)
+    assert results[0]["id"] == ids[1]
+    assert results[0]["similarity"] == pytest.approx(1.0, abs=1e-5)
+    assert results[0]["distance"] == pytest.approx(0.0, abs=1e-5)
+    assert [r["distance"] for r in results] == sorted(r["distance"] for r in results)
+    storage.close()
+
+    # The snapshot is rebuilt when reopened with another metric
+    l2 = make_storage(tmp_path, metric="l2")
+    assert l2.retrieve(embeddings[0], k=1)[0]["id"] == ids[0]
+    assert "similarity" not in l2.retrieve(embeddings[0], k=1)[0]
+    l2.close()
+
+def test_query_cache_hits_and_invalidates_on_writes(tmp_path, random_embeddings):
+    storage = make_storage(tmp_path, query_cache_size=8)
+    embeddings = random_embeddings(3)
+    ids = storage.store_many(["a", "b"], embeddings[:2])
+
+    first = storage.retrieve(embeddings[0], k=1)
+    first[0]["content"] = "mutated by caller"
+    assert storage.retrieve(embeddings[0], k=1)[0]["content"] == "a"
+    assert storage.retrieve(embeddings[0], k=1, memory_type="general")[0]["id"] == ids[0]
+    stats = storage.query_cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 2)
+
+    # A new, nearer memory must not be hidden by the cached result
+    new_id = storage.store("c", embeddings[0], {})
+    assert storage.retrieve(embeddings[0], k=2)[0]["id"] in (ids[0], new_id)
+    assert len(storage.retrieve(embeddings[0], k=2)) == 2
+    assert storage.query_cache.stats()["generation"] == 2
+    storage.close()
+
+def test_retention_sweep_deletes_expired_rows_and_vacuums(tmp_path, random_embeddings):
+    storage = make_storage(tmp_path, retention_days={"conversation": 90, "fact": None},
+                           retention_interval=3600)
+    assert storage.conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+    embeddings = random_embeddings(6)
+    ids = storage.store_many(
+        [f"memory {i} " + "padding " * 500 for i in range(6)], embeddings,
+        memory_types=["conversation"] * 4 + ["fact"] * 2
+    )
+    storage.conn.execute(
+        "UPDATE memories SET created_at = datetime('now', '-120 days') WHERE id IN (?, ?, ?, ?, ?)",
+        ids[:3] + ids[4:]
+    )
+    storage.conn.commit()
+
+    assert storage.sweep_retention(batch_size=2) == {"conversation": 3}
+    remaining = [row[0] for row in storage.conn.execute("SELECT id FROM memories ORDER BY id")]
+    assert remaining == [ids[3], ids[4], ids[5]]
+    assert storage.index.ntotal == 3
+    assert len(storage.search_text("memory", k=10)) == 3
+    assert storage.conn.execute("PRAGMA freelist_count").fetchone()[0] == 0
+    assert storage.sweep_retention() == {"conversation": 0}
+    storage.close()
+
+def test_retention_sweep_rebuild_waits_for_an_uncommitted_store(tmp_path, random_embeddings, monkeypatch):
+    storage = make_storage(tmp_path, index_spec="HNSW8", retention_days={"conversation": 90})
+    embeddings = random_embeddings(2)
+    expired = storage.store("expired", embeddings[0], {}, memory_type="conversation")
+    storage.conn.execute("UPDATE memories SET created_at = datetime('now', '-120 days') WHERE id = ?",
+                         (expired,))
+    storage.conn.commit()
+
+    # Hold the sweep just before its HNSW rebuild while a memory is stored
+    removing, indexed = threading.Event(), threading.Event()
+    remove_ids, add_new = storage._remove_ids, storage._add_new
+
+    def remove_after_store(memory_ids):
+        removing.set()
+        indexed.wait(timeout=0.5)
+        return remove_ids(memory_ids)
+
+    def add_then_wait(*args, **kwargs):
+        add_new(*args, **kwargs)
+        indexed.set()
+        sweeper.join(timeout=0.5)
+
+    monkeypatch.setattr(storage, "_remove_ids", remove_after_store)
+    monkeypatch.setattr(storage, "_add_new", add_then_wait)
+    sweeper = threading.Thread(target=storage.sweep_retention)
+    sweeper.start()
+    removing.wait()
+    fresh = storage.store("fresh", embeddings[1], {})
+    sweeper.join()
+
+    assert storage._indexed_ids().tolist() == [fresh]
+    assert storage.retrieve(embeddings[1], k=1)[0]["id"] == fresh
+    storage.close()
+
+
+def test_export_import_round_trip_in_chunks(tmp_path, random_embeddings):
+    (tmp_path / "source").mkdir()
+    (tmp_path / "target").mkdir()
+    source = make_storage(tmp_path / "source", metric="cosine")
+    embeddings = random_embeddings(7)
+    source.store_many([f"memory {i}" for i in range(7)], embeddings,
+                            metadatas=[{"n": i} for i in range(7)],
+                            memory_types=["fact", "conversation"] * 3 + ["fact"])
+    export_path = str(tmp_path / "memories.nmx")
+    assert source.export_memories(export_path, chunk_size=3) == 7
+
+    target = make_storage(tmp_path / "target", metric="cosine")
+    assert target.import_memories(export_path) == 7
+    assert target.index.ntotal == 7
+    rows = target.conn.execute("SELECT content, metadata, type FROM memories ORDER BY id").fetchall()
+    assert [(row[0], json.loads(row[1])["n"], row[2]) for row in rows] == [
+        (f"memory {i}", i, "fact" if i % 2 == 0 else "conversation") for i in range(7)
+    ]
+    # Raw (unnormalized) vectors survive the round trip
+    _, stored, _ = target._decode_rows(target.conn.execute(
+        "SELECT id, embedding, type, embedding_offset FROM memories ORDER BY id").fetchall(), normalize=False)
+    np.testing.assert_allclose(stored, embeddings, rtol=1e-6)
+    assert target.retrieve(embeddings[4], k=1)[0]["content"] == "memory 4"
+    assert len(target.search_text("memory", k=10, memory_type="fact")) == 4
+    source.close()
+    target.close()
+
+
+def test_importance_decays_by_type_half_life_at_query_time(tmp_path, random_embeddings):
+    storage = make_storage(tmp_path, half_life_days={"conversation": 10})
+    ids = storage.store_many(["chat", "fact"], random_embeddings(2), memory_types=["conversation", "fact"])
+    storage.conn.execute("UPDATE memories SET last_accessed = datetime('now', '-20 days')")
+    storage.conn.commit()
+
+    effective = storage.decay.effective([1.0, 1.0], ["2000-01-01 00:00:00", None], ["conversation", "conversation"])
+    assert effective[0] < 1e-6 and effective[1] == 1.0
+    decayed = storage.conn.execute(
+        "SELECT effective_importance(importance, type, last_accessed) FROM memories ORDER BY id").fetchall()
+    assert decayed[0][0] == pytest.approx(0.25, rel=1e-3) and decayed[1][0] == 1.0
+
+    # Stored importance is untouched; only the decayed conversation falls below the threshold
+    counts = storage.compress(threshold=0.5, dry_run=True)
+    assert counts["low_importance"] == 1
+    assert [row[0] for row in storage.conn.execute("SELECT importance FROM memories")] == [1.0, 1.0]
+    storage.compress(threshold=0.5)
+    assert storage.conn.execute("SELECT content FROM memories WHERE id = ?", (ids[1],)).fetchone()[0] == "fact"
+    storage.close()
+
+
+def test_batch_execution_policy_coalesces_concurrent_retrievals(tmp_path, random_embeddings):
+    policy = ExecutionPolicy("batch", omp_threads=1, batch_window=0.05, max_batch=4)
+    storage = make_storage(tmp_path, execution_policy=policy)
+    embeddings = random_embeddings(8)
+    storage.store_many([f"memory {i}" for i in range(8)], embeddings)
+    searched = []
+    search_batch = storage._search_batch
+    storage._batcher.run = lambda key, queries: searched.append(len(queries)) or search_batch(key, queries)
+
+    results = [None] * 4
+    def client(i):
+        results[i] = storage.retrieve(embeddings[i], k=2)
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert [memories[0]["content"] for memories in results] == [f"memory {i}" for i in range(4)]
+    assert sum(searched) == 4 and len(searched) < 4
+    with pytest.raises(ValueError):
+        ExecutionPolicy("parallel")
+    storage.close()
@@ -0,0 +1,78 @@
+import json
+from datetime import datetime, timedelta
+import numpy as np
+import pytest
+from neuromind.core.memory import Memory
+from neuromind.core.memory.codec import EmbeddingCodec
+from neuromind.core.memory.decay import ImportanceDecay
+from neuromind.core.memory_types import MemoryType
+from neuromind.memory.rows import import_types, split_rows
+
+DIM = 8
+NOW = "2026-10-17 12:00:00"
+
+def test_split_rows_skips_only_the_corrupt_row_and_groups_by_user(random_embeddings):
+    embeddings = random_embeddings(4)
+    codec = EmbeddingCodec("float32")
+    short, long = MemoryType.SHORT_TERM.value, MemoryType.LONG_TERM.value
+    rows = [
+        (1, "alice", "encoded", short, NOW, 0.7, "{}", codec.encode(embeddings[0])),
+        (2, "alice", "corrupt", short, NOW, 0.7, "{}", b"\x00\x01\x02"),
+        (3, "bob", "legacy", long, NOW, None, json.dumps({"topic": "x"}), embeddings[2].tobytes()),
+        (4, "bob", "no embedding", short, NOW, 0.7, "{}", None),
+        (5, "alice", "bad metadata", short, NOW, 0.7, "{", codec.encode(embeddings[3])),
+    ]
+
+    split = split_rows(rows, DIM)
+
+    assert set(split) == {("alice", False), ("bob", True)}
+    contents, metadatas, short_term = split["alice", False]
+    assert contents == ["encoded"]
+    assert metadatas == [{"timestamp": NOW, "importance": 0.7, "id": 1, "user_id": "alice"}]
+    np.testing.assert_array_equal(short_term, embeddings[:1])
+    contents, metadatas, long_term = split["bob", True]
+    assert contents == ["legacy"]
+    assert metadatas == [{"timestamp": NOW, "topic": "x", "id": 3, "user_id": "bob"}]
+    np.testing.assert_array_equal(long_term, embeddings[2:3])
+
+def test_rows_of_unknown_types_are_skipped_and_imported_types_mapped(random_embeddings):
+    embeddings = random_embeddings(2)
+    rows = [
+        (1, "alice", "hybrid storage type", "general", NOW, 0.5, "{}", embeddings[0].tobytes()),
+        (2, "alice", "episodic", MemoryType.EPISODIC.value, NOW, 0.5, "{}", embeddings[1].tobytes()),
+    ]
+
+    assert split_rows(rows, DIM)["alice", False][0] == ["episodic"]
+    assert import_types(["general", "LONG_TERM", None, "reflective"]) == [
+        "short_term", "long_term", "short_term", "reflective"
+    ]
+
+def test_memory_is_importable_from_the_memory_package():
+    memory = Memory("hello", MemoryType.SHORT_TERM, embedding=np.zeros(DIM))
+    assert Memory.from_dict(memory.to_dict()).content == "hello"
+
+def test_decayed_older_memory_ranks_below_a_fresh_one(random_embeddings):
+    pytest.importorskip("langchain_community")
+    from neuromind.memory.manager import Neuromind
+
+    # Only the reranking state is needed; skip loading the embedding model
+    neuromind = Neuromind.__new__(Neuromind)
+    neuromind.metric = "l2"
+    neuromind.decay = ImportanceDecay({"short_term": 7})
+    embeddings = random_embeddings(2)
+    now = datetime.now()
+    rows = [
+        (1, "alice", "old but closer", MemoryType.SHORT_TERM.value, now - timedelta(days=30), 1.0, "{}",
+         embeddings[0].tobytes()),
+        (2, "alice", "fresh", MemoryType.SHORT_TERM.value, now, 1.0, "{}", embeddings[1].tobytes()),
+    ]
+    contents, metadatas, _ = split_rows(rows, DIM)["alice", False]
+    results = [
+        {"content": content, "score": score, "type": "short_term", "embedding": None, "metadata": metadata}
+        for content, metadata, score in zip(contents, metadatas, [0.0, 0.6])
+    ]
+
+    reranked = neuromind._rerank_results(results, embeddings[0])
+    assert [r["content"] for r in reranked] == ["fresh", "old but closer"]
+    assert reranked[1]["importance"] < 0.1
+    assert neuromind._result_to_memory({**results[0], "metadata": {}}).content == "old but closer"
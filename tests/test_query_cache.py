@@ -0,0 +1,56 @@
+import numpy as np
+from neuromind.core.memory import query_cache
+from neuromind.core.memory.query_cache import QueryCache
+
+def test_hits_and_misses_are_counted():
+    cache = QueryCache(max_entries=4)
+    assert cache.get("q") is None
+    cache.put("q", ["result"], cache.generation)
+    assert cache.get("q") == ["result"]
+    assert cache.get("q") == ["result"]
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (2, 1, 1)
+    assert stats["hit_rate"] == 2 / 3
+
+def test_least_recently_used_entry_is_evicted():
+    cache = QueryCache(max_entries=2)
+    cache.put("a", 1, cache.generation)
+    cache.put("b", 2, cache.generation)
+    assert cache.get("a") == 1
+    cache.put("c", 3, cache.generation)
+
+    # "b" was the least recently used once "a" was read
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["size"] == 2
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(query_cache.time, "monotonic", lambda: now[0])
+    cache = QueryCache(max_entries=4, ttl=10.0)
+    cache.put("q", "result", cache.generation)
+
+    now[0] += 10.0
+    assert cache.get("q") == "result"
+    now[0] += 0.1
+    assert cache.get("q") is None
+    assert cache.stats()["size"] == 0
+
+def test_results_computed_across_an_invalidation_are_not_cached():
+    cache = QueryCache(max_entries=4)
+    cache.put("old", 1, cache.generation)
+    generation = cache.generation
+    cache.invalidate()
+
+    assert cache.get("old") is None
+    cache.put("q", "stale", generation)
+    assert cache.get("q") is None
+    cache.put("q", "fresh", cache.generation)
+    assert cache.get("q") == "fresh"
+
+def test_vector_key_ignores_floating_point_noise():
+    vector = np.random.default_rng(0).random(8, dtype=np.float32)
+    assert QueryCache.vector_key(vector) == QueryCache.vector_key(vector + 1e-6)
+    assert QueryCache.vector_key(vector) != QueryCache.vector_key(vector + 0.1)
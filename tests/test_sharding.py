@@ -0,0 +1,77 @@
+import os
+import threading
+from neuromind.core.memory import HybridMemoryStorage, ShardedMemoryStorage
+from neuromind.core.memory import sharding
+
+DIM = 8
+
+def test_routes_per_tenant_and_merges_fan_out(tmp_path, random_embeddings):
+    storage = ShardedMemoryStorage(str(tmp_path / "shards"), DIM, max_open_shards=2)
+    embeddings = random_embeddings(6)
+    storage.store_many("alice", ["a0", "a1"], embeddings[:2])
+    storage.store_many("bob/eng", ["b0", "b1"], embeddings[2:4])
+    storage.store_many("carol", ["c0", "c1"], embeddings[4:])
+    assert storage.tenants() == ["alice", "bob/eng", "carol"]
+
+    # Only the two most recently used shards stay open
+    assert list(storage._shards) == ["bob/eng", "carol"]
+
+    # A single-tenant query never sees other tenants' memories
+    results = storage.retrieve(embeddings[2], k=3, tenant="alice")
+    assert {r["content"] for r in results} == {"a0", "a1"}
+    assert all(r["tenant"] == "alice" for r in results)
+
+    # A cross-tenant query returns the global nearest neighbours
+    results = storage.retrieve(embeddings[4], k=3)
+    distances = [r["distance"] for r in results]
+    assert results[0]["content"] == "c0" and results[0]["tenant"] == "carol"
+    assert distances == sorted(distances) and len(results) == 3
+    storage.close()
+
+    # Evicted and closed shards reopen from disk
+    reopened = ShardedMemoryStorage(str(tmp_path / "shards"), DIM)
+    assert reopened.retrieve(embeddings[1], k=1, tenant="alice")[0]["content"] == "a1"
+    reopened.close()
+
+def test_slow_shard_open_does_not_block_other_tenants(tmp_path, random_embeddings, monkeypatch):
+    opening = threading.Event()
+    release = threading.Event()
+
+    def open_shard(path, *args, **kwargs):
+        if os.path.basename(path) == "slow.db":
+            opening.set()
+            assert release.wait(timeout=10)
+        return HybridMemoryStorage(path, *args, **kwargs)
+
+    monkeypatch.setattr(sharding, "HybridMemoryStorage", open_shard)
+    storage = ShardedMemoryStorage(str(tmp_path / "shards"), DIM, max_open_shards=1)
+    embeddings = random_embeddings(3)
+    slow = threading.Thread(target=storage.store, args=("slow", "s0", embeddings[0], {}))
+    slow.start()
+    assert opening.wait(timeout=10)
+
+    # Other tenants open, and evict each other, while "slow" is still opening
+    storage.store("fast", "f0", embeddings[1], {})
+    storage.store("other", "o0", embeddings[2], {})
+    assert storage.retrieve(embeddings[1], k=1, tenant="fast")[0]["content"] == "f0"
+    release.set()
+    slow.join(timeout=10)
+
+    assert storage.retrieve(embeddings[0], k=1, tenant="slow")[0]["content"] == "s0"
+    storage.close()
+
+def test_reads_for_unknown_tenants_do_not_create_shards(tmp_path, random_embeddings):
+    root = tmp_path / "shards"
+    storage = ShardedMemoryStorage(str(root), DIM, max_open_shards=1)
+    embeddings = random_embeddings(2)
+    storage.store("alice", "a0", embeddings[0], {})
+
+    assert storage.retrieve(embeddings[0], k=1, tenant="mallory") == []
+    assert [r["tenant"] for r in storage.retrieve(embeddings[0], k=2, tenant=["alice", "mallory"])] == ["alice"]
+    assert storage.compress(tenant="mallory") == {}
+
+    # No files were created and the open shard was not evicted
+    assert storage.tenants() == ["alice"]
+    assert all(name.startswith("alice") for name in os.listdir(root))
+    assert list(storage._shards) == ["alice"]
+    storage.close()